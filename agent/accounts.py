@@ -0,0 +1,199 @@
+import functools
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from .config_loader import load_yaml_with_env
+from .globals import BASE, REQUIRED_SCOPES, get_context
+from .scheduler import build_scheduler
+from .utils import clean_site_url_for_display
+
+logger = logging.getLogger("pinterest-agent")
+
+DEFAULT_BOARDS_FILE = "boards.yml"
+
+
+class Account:
+    """
+    One Pinterest account posting for one site: its own token, boards,
+    daily quota and action scheduler, which paces (rate-limits) only this
+    account's writes. The HTTP connection pool, image and generation caches,
+    image store and DB are shared by every account of the process.
+    """
+
+    def __init__(
+        self,
+        name,
+        site_url,
+        boards,
+        token,
+        daily_pins,
+        schedule=None,
+        boards_file=None,
+    ):
+        self.name = name
+        self.site_url = site_url
+        self.clean_site_url = clean_site_url_for_display(site_url or "")
+        self.boards = boards
+        self.boards_file = boards_file
+        self.token = token
+        self.daily_pins = dict(daily_pins)
+        self.schedule = schedule
+        self.scheduler = None
+        self._board_matcher = None
+        self._seed = random.getrandbits(64)
+
+    def __repr__(self):
+        return f"Account({self.name!r}, {self.site_url!r})"
+
+    def rng(self, task):
+        """
+        A random generator for one of the account's tasks, so accounts and
+        tasks running in parallel threads do not interleave their draws
+        (a seeded run picks the same boards and posts every time).
+        """
+        return random.Random(f"{self._seed}:{task}")
+
+    def fetch_token(self, margin=None):
+        """
+        Fetches the token unless it is loaded and known to be valid for
+        margin more seconds; returns True if it fetched. A token that can
+        be refreshed is then kept fresh in the background.
+        """
+        from .tokens import keep_fresh, token_settings
+
+        settings = token_settings()
+        if margin is None:
+            margin = float(settings["refresh_margin_minutes"]) * 60
+        fetched = False
+        if not (self.token.access_token and self.token.is_fresh(margin)):
+            self.token.fetch(scopes=REQUIRED_SCOPES, margin=margin)
+            fetched = True
+        keep_fresh(self.token, settings)
+        return fetched
+
+    @property
+    def board_matcher(self):
+        """This account's boards compiled for matching posts (built once)."""
+        if self._board_matcher is None:
+            from .board_matcher import BoardMatcher
+
+            settings = get_context().config.get("board_matching")
+            self._board_matcher = BoardMatcher(self.boards, settings)
+        return self._board_matcher
+
+    def start(self, **kwargs):
+        """Opens today's action timeline for this account's repins and new pins."""
+        self.scheduler = build_scheduler(self.schedule, **kwargs)
+        self.scheduler.plan(self.daily_pins["repins"] + self.daily_pins["new_pins"])
+        return self.scheduler
+
+    def close(self):
+        if self.scheduler is not None:
+            self.scheduler.close()
+
+    def scheduled(self, fn):
+        """Wraps a pinterest_api write to run in this account's next slot."""
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            kwargs.setdefault("token", self.token)
+            kwargs.setdefault("site_url", self.site_url)
+            return self.scheduler.run(fn, *args, **kwargs)
+
+        return wrapper
+
+
+def _boards_path(name):
+    return os.path.join(BASE, name)
+
+
+def _load_boards(path):
+    return load_yaml_with_env(path)["boards"]
+
+
+def default_account(config=None):
+    """The single account configured by SITE_URL, boards.yml and ACCESS_TOKEN."""
+    context = get_context()
+    config = config or context.config
+    path = _boards_path(DEFAULT_BOARDS_FILE)
+    return Account(
+        "default",
+        os.getenv("SITE_URL") or config.get("site"),
+        _load_boards(path),
+        context.access_token,
+        config["daily_pins"],
+        config.get("schedule"),
+        boards_file=path,
+    )
+
+
+def load_accounts(config=None):
+    """
+    Accounts from the `accounts` config section, or the default account
+    when there is none. Entries inherit daily_pins and schedule from the
+    top level; an entry's token names the AccessToken to use, read from
+    the environment variable of that name in upper case or from
+    <token>.json in the OAuth token directory.
+    """
+    from auth_api.access_token import AccessToken
+
+    context = get_context()
+    config = config or context.config
+    entries = config.get("accounts") or []
+    if not entries:
+        return [default_account(config)]
+
+    accounts = []
+    for entry in entries:
+        name = entry["name"]
+        token_name = entry.get("token") or f"access_token_{name}"
+        if token_name == context.access_token.name:
+            token = context.access_token
+        else:
+            token = AccessToken(context.api_config, name=token_name)
+        daily_pins = dict(config["daily_pins"])
+        daily_pins.update(entry.get("daily_pins") or {})
+        schedule = dict(config.get("schedule") or {})
+        schedule.update(entry.get("schedule") or {})
+        path = _boards_path(entry.get("boards") or DEFAULT_BOARDS_FILE)
+        accounts.append(
+            Account(
+                name,
+                entry.get("site"),
+                _load_boards(path),
+                token,
+                daily_pins,
+                schedule,
+                boards_file=path,
+            )
+        )
+    return accounts
+
+
+def run_shards(accounts, jobs, workers=None):
+    """
+    Runs job(account) for every account and job on one shared thread pool
+    and returns {account.name: {job.__name__: result}}. Shards are queued
+    job by job, so every account gets its first job started before any
+    account starts its second. A failed shard is logged and yields None.
+    """
+    shards = [(job, account) for job in jobs for account in accounts]
+    results = {account.name: {} for account in accounts}
+    if not shards:
+        return results
+
+    workers = max(1, min(int(workers or len(shards)), len(shards)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard") as pool:
+        futures = [(job, account, pool.submit(job, account)) for job, account in shards]
+        for job, account, fut in futures:
+            try:
+                result = fut.result()
+            except Exception as e:
+                logger.error(
+                    "%s failed for account %s: %s", job.__name__, account.name, e
+                )
+                result = None
+            results[account.name][job.__name__] = result
+    return results
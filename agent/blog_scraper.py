@@ -4,6 +4,8 @@ from urllib.parse import urljoin
 import time
 import logging
 
+from .image_probe import collect_image_candidates
+
 logger = logging.getLogger("pinterest-agent")
 logger.setLevel(logging.DEBUG)
 
@@ -114,6 +116,7 @@ def extract_post_meta(post_url):
         "description": description,
         "keywords": keywords,
         "image": image,
+        "images": collect_image_candidates(soup, post_url),
         "url": post_url,
         "fetched_at": int(time.time()),
     }
@@ -0,0 +1,144 @@
+"""
+Picks the board for a blog post. The keywords of boards.yml (and each
+board's own name) are compiled once into an inverted index of normalized
+terms: single words and whole phrases such as "healthy recipes". A post's
+title and description are scanned once, and every board is scored by the
+TF-IDF weight of the terms it shares with the post, so a word used by
+every board counts for little and a board-specific phrase for a lot.
+
+Posts sharing no term with any board fall back to the trigram similarity
+of their words to board words (catching typos and inflections), then to
+the default board.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+_JOINERS = re.compile(r"(?<=\w)[-'’](?=\w)")  # K-Drama -> kdrama
+_WORD = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be best by for from how in into is it its my new of"
+    " on or our the this to top vs what when why with you your".split()
+)
+DEFAULTS = {
+    "title_weight": 2.0,
+    "description_weight": 1.0,
+    "fuzzy_min_score": 0.5,
+    "default_board": None,
+}
+
+
+def _stem(word):
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lower-cased word tokens with joined hyphenations and plain plurals."""
+    text = _JOINERS.sub("", (text or "").lower())
+    return [_stem(w) for w in _WORD.findall(text)]
+
+
+def _trigrams(word):
+    padded = f" {word} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+class BoardMatcher:
+    """Scores posts against boards ({key: {"keywords": [...]}}); see module doc."""
+
+    def __init__(self, boards, settings=None):
+        cfg = dict(DEFAULTS)
+        cfg.update({k: v for k, v in (settings or {}).items() if v is not None})
+        self.settings = cfg
+        self.board_keys = list(boards)
+        if not self.board_keys:
+            raise ValueError("BoardMatcher needs at least one board.")
+
+        counts = defaultdict(Counter)  # term -> {board: occurrences}
+        vocabulary = defaultdict(set)  # board -> words
+        for key, board in boards.items():
+            phrases = [key.replace("_", " ")] + list(board.get("keywords") or [])
+            for phrase in phrases:
+                words = tuple(tokenize(phrase))
+                if len(words) > 1:
+                    counts[words][key] += 1
+                for w in words:
+                    if w not in STOPWORDS:
+                        counts[(w,)][key] += 1
+                        vocabulary[key].add(w)
+
+        n = len(self.board_keys)
+        self.weights = {}  # term -> {board: tf-idf weight}
+        norms = Counter()
+        for term, per_board in counts.items():
+            idf = math.log((1 + n) / (1 + len(per_board))) + 1
+            # A phrase is as specific as all of its words together.
+            self.weights[term] = {
+                key: tf * idf * len(term) for key, tf in per_board.items()
+            }
+            for key, w in self.weights[term].items():
+                norms[key] += w * w
+        self.norms = {key: math.sqrt(norms[key]) or 1.0 for key in self.board_keys}
+
+        # Terms by first word, longest first, for one pass over a post.
+        self._by_first = defaultdict(list)
+        for term in sorted(self.weights, key=len, reverse=True):
+            self._by_first[term[0]].append(term)
+        self._grams = {
+            key: [_trigrams(w) for w in vocabulary[key] if len(w) > 2]
+            for key in self.board_keys
+        }
+
+    def _terms(self, words):
+        found = Counter()
+        for i, word in enumerate(words):
+            for term in self._by_first.get(word, ()):
+                if len(term) == 1 or tuple(words[i : i + len(term)]) == term:
+                    found[term] += 1
+        return found
+
+    def scores(self, title, description=""):
+        """{board: TF-IDF score} of every board sharing a term with the post."""
+        scores = Counter()
+        fields = (
+            (title, float(self.settings["title_weight"])),
+            (description, float(self.settings["description_weight"])),
+        )
+        for text, field_weight in fields:
+            for term, n in self._terms(tokenize(text)).items():
+                tf = (1 + math.log(n)) * field_weight
+                for key, w in self.weights[term].items():
+                    scores[key] += tf * w / self.norms[key]
+        return scores
+
+    def fuzzy_scores(self, title, description=""):
+        """{board: best trigram similarity between a post word and a board word}."""
+        words = {w for w in tokenize(f"{title} {description}") if len(w) > 2}
+        post_grams = [_trigrams(w) for w in words if w not in STOPWORDS]
+        scores = {}
+        for key, board_grams in self._grams.items():
+            best = 0.0
+            for a in post_grams:
+                for b in board_grams:
+                    best = max(best, len(a & b) / len(a | b))
+            if best:
+                scores[key] = best
+        return scores
+
+    def match(self, title, description=""):
+        """(board key, score, how) with how one of "keywords", "fuzzy", "default"."""
+        scores = self.scores(title, description)
+        if scores:
+            key = max(self.board_keys, key=lambda k: scores.get(k, 0.0))
+            return key, scores[key], "keywords"
+        fuzzy = self.fuzzy_scores(title, description)
+        if fuzzy:
+            key = max(self.board_keys, key=lambda k: fuzzy.get(k, 0.0))
+            if fuzzy.get(key, 0.0) >= float(self.settings["fuzzy_min_score"]):
+                return key, fuzzy[key], "fuzzy"
+        default = self.settings["default_board"]
+        if default not in self.board_keys:
+            default = self.board_keys[0]
+        return default, 0.0, "default"
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class RealClock:
+    """Wall-clock time; sleeps really block."""
+
+    virtual = False
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, cond, timeout=None):
+        """cond.wait(timeout) for a threading.Condition the caller holds."""
+        return cond.wait(timeout)
+
+
+class VirtualClock:
+    """
+    Simulated time for replaying a run in seconds: a discrete-event clock.
+    sleep() and timed waits register a wakeup at now + seconds and block.
+    Once every thread has been idle for `settle` real seconds (no wakeup
+    registered or left, no CPU spent), time jumps to the earliest wakeup,
+    ordered by (deadline, registration order), and only that sleeper
+    resumes. Concurrent sleeps therefore overlap as in a real run instead
+    of adding up, and a seeded run replays the same timeline whatever the
+    thread interleaving, unless a thread is held up for longer than
+    `settle` without using CPU (real I/O, or a machine under heavy load).
+    """
+
+    virtual = True
+
+    def __init__(self, start=None, settle=0.03):
+        self.settle = float(settle)
+        self._lock = threading.Lock()
+        self._epoch = time.time() if start is None else float(start)
+        self._elapsed = 0.0
+        self._waiters = []  # heap of (deadline, seq)
+        self._seq = itertools.count()
+        self._changed = time.monotonic()  # real time of the last activity
+        self._sampled, self._cpu = self._changed, time.process_time()
+        self.slept = 0.0
+
+    def time(self):
+        with self._lock:
+            return self._epoch + self._elapsed
+
+    def monotonic(self):
+        with self._lock:
+            return self._elapsed
+
+    def advance(self, seconds):
+        """Moves time forward right away (for tests driving the clock by hand)."""
+        if seconds > 0:
+            with self._lock:
+                self._elapsed += seconds
+                self.slept += seconds
+
+    def _wait_until(self, seconds, block):
+        """
+        Blocks until the virtual time is seconds from now. block(timeout)
+        waits up to timeout real seconds and returns True if the caller was
+        woken another way, which ends the wait early (returns True).
+        """
+        with self._lock:
+            deadline = self._elapsed + seconds
+            entry = (deadline, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            self._changed = time.monotonic()
+        try:
+            while True:
+                with self._lock:
+                    if self._elapsed >= deadline:
+                        return False
+                    real = time.monotonic()
+                    if real - self._sampled >= self.settle / 2:
+                        cpu = time.process_time()
+                        if cpu - self._cpu > (real - self._sampled) / 2:
+                            self._changed = real  # a thread is still computing
+                        self._sampled, self._cpu = real, cpu
+                    quiet = real - self._changed >= self.settle
+                    if quiet and self._waiters[0] == entry:
+                        self.slept += deadline - self._elapsed
+                        self._elapsed = deadline
+                        return False
+                if block(self.settle / 4):
+                    return True
+        finally:
+            with self._lock:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._changed = time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self._wait_until(seconds, time.sleep)
+
+    def wait(self, cond, timeout=None):
+        if timeout is None:
+            return cond.wait()
+        return self._wait_until(timeout, cond.wait)
+
+
+_clock = RealClock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """Installs clock process-wide (e.g. a VirtualClock for simulations)."""
+    global _clock
+    _clock = clock
+    return clock
+
+
+def now():
+    return _clock.time()
+
+
+def monotonic():
+    return _clock.monotonic()
+
+
+def sleep(seconds):
+    _clock.sleep(seconds)
@@ -1,5 +1,4 @@
 import os
-import yaml
 
 def replace_env(value):
     if isinstance(value, str) and value.startswith('${') and value.endswith('}'):
@@ -14,6 +13,8 @@ def walk_replace(obj):
     return replace_env(obj)
 
 def load_yaml_with_env(path):
+    import yaml
+
     with open(path, 'r', encoding='utf-8') as f:
         raw = yaml.safe_load(f)
     return walk_replace(raw)
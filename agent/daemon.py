@@ -0,0 +1,198 @@
+import datetime
+import json
+import logging
+import os
+import random
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import clock
+
+logger = logging.getLogger("pinterest-agent")
+
+DEFAULT_DAEMON = {
+    "run_at": "10:00",  # UTC, like the cron schedule in daily.yml
+    "jitter_minutes": 20,
+    "host": "127.0.0.1",
+    "port": 8086,
+    "poll_seconds": 30,  # how often config files are checked for changes
+}
+
+
+def next_run_after(now, run_at, jitter_minutes=0, rng=random):
+    """Epoch seconds of the first run_at ("HH:MM", UTC) after now, plus jitter."""
+    hour, minute = (int(v) for v in str(run_at).split(":"))
+    current = datetime.datetime.fromtimestamp(now, datetime.timezone.utc)
+    due = current.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if due.timestamp() <= now:
+        due += datetime.timedelta(days=1)
+    return due.timestamp() + rng.uniform(0, jitter_minutes * 60)
+
+
+class Daemon:
+    """
+    Keeps the agent resident and calls run() once a day at run_at, so
+    imports, connection pools, caches and tokens stay warm between runs.
+    Files in `watch` are polled; when one changes, reload() is called
+    before the next run. status() (also served as JSON on /status, with
+    /health for liveness checks) reports the state, the next and last run,
+    and whatever extra() returns (e.g. queue depths of a run in progress).
+    """
+
+    def __init__(self, run, settings=None, watch=(), reload=None, extra=None):
+        cfg = dict(DEFAULT_DAEMON)
+        cfg.update({k: v for k, v in (settings or {}).items() if v is not None})
+        self.settings = cfg
+        self.run = run
+        self.reload = reload
+        self.extra = extra
+        self.watch = list(watch)
+        self._mtimes = self._read_mtimes()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server = None
+        self.state = "idle"
+        self.started_at = clock.now()
+        self.runs = 0
+        self.reloads = 0
+        self.last_run = None
+        self.next_run = None
+
+    def _read_mtimes(self):
+        mtimes = {}
+        for path in self.watch:
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def check_reload(self):
+        """Calls reload() if a watched file changed since the last check."""
+        mtimes = self._read_mtimes()
+        if mtimes == self._mtimes:
+            return False
+        changed = [p for p in mtimes if mtimes[p] != self._mtimes.get(p)]
+        self._mtimes = mtimes
+        logger.info("Config changed (%s), reloading", ", ".join(changed))
+        if self.reload:
+            try:
+                watch = self.reload()
+            except Exception as e:
+                logger.error("Config reload failed, keeping the old one: %s", e)
+                return False
+            if watch is not None:
+                # The new config may name other files (e.g. boards of a new account).
+                self.watch = list(watch)
+                self._mtimes = self._read_mtimes()
+        with self._lock:
+            self.reloads += 1
+        return True
+
+    def run_once(self):
+        """One run now; the outcome is kept for status()."""
+        with self._lock:
+            self.state = "running"
+        started = clock.now()
+        perf = time.perf_counter()
+        record = {"started_at": started}
+        try:
+            record["result"] = self.run()
+            record["ok"] = True
+        except Exception as e:
+            logger.error("Daily run failed: %s", e)
+            record["ok"] = False
+            lines = traceback.format_exception_only(type(e), e)
+            record["error"] = "".join(lines).strip()
+        record["seconds"] = round(time.perf_counter() - perf, 3)
+        with self._lock:
+            self.state = "idle"
+            self.runs += 1
+            self.last_run = record
+        return record
+
+    def status(self):
+        with self._lock:
+            status = {
+                "state": self.state,
+                "uptime_seconds": round(clock.now() - self.started_at, 1),
+                "runs": self.runs,
+                "reloads": self.reloads,
+                "next_run": self.next_run,
+                "last_run": self.last_run,
+            }
+        if self.extra:
+            try:
+                status.update(self.extra())
+            except Exception as e:
+                status["extra_error"] = str(e)
+        return status
+
+    def start_http(self):
+        """Serves /health and /status on host:port from a background thread."""
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/health":
+                    body = {"ok": not daemon._stop.is_set(), "state": daemon.state}
+                elif self.path == "/status":
+                    body = daemon.status()
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(body, default=str).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug("status server: " + format, *args)
+
+        self._server = ThreadingHTTPServer(
+            (self.settings["host"], int(self.settings["port"])), Handler
+        )
+        threading.Thread(
+            target=self._server.serve_forever, name="status-server", daemon=True
+        ).start()
+        host, port = self._server.server_address[:2]
+        logger.info("Status endpoint on http://%s:%s/status", host, port)
+        return self._server
+
+    def serve_forever(self):
+        """Runs at run_at every day until stop(); reloads config on change."""
+        if self._server is None and self.settings.get("port") is not None:
+            self.start_http()
+        try:
+            while not self._stop.is_set():
+                self.next_run = next_run_after(
+                    clock.now(),
+                    self.settings["run_at"],
+                    float(self.settings.get("jitter_minutes") or 0),
+                )
+                logger.info(
+                    "Next run at %s",
+                    datetime.datetime.fromtimestamp(
+                        self.next_run, datetime.timezone.utc
+                    ).isoformat(timespec="seconds"),
+                )
+                while not self._stop.is_set():
+                    remaining = self.next_run - clock.now()
+                    if remaining <= 0:
+                        break
+                    poll = float(self.settings["poll_seconds"])
+                    self._stop.wait(min(remaining, poll))
+                    self.check_reload()
+                if not self._stop.is_set():
+                    self.run_once()
+        finally:
+            if self._server is not None:
+                self._server.shutdown()
+                self._server.server_close()
+
+    def stop(self):
+        self._stop.set()
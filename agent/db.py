@@ -1,10 +1,38 @@
+import json
 import sqlite3
+import zlib
+from datetime import datetime, timedelta
 from pathlib import Path
 import sys
 
 DB_PATH = Path(__file__).resolve().parent.parent / "agent_data.db"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+# Column holding the insertion/refresh time of each history table. blog_pins
+# is not one: it is the only record of which posts were pinned (prepare_post
+# dedupes against it), so it is never pruned; it grows by one small row per
+# blog post.
+HISTORY_TIME_COLUMNS = {
+    "pinned": "created_at",
+    "searched_boards": "last_searched_at",
+    "run_events": "created_at",
+}
+
+# max_age_days: rows older than this are pruned.
+# max_rows: only the newest N rows are kept.
+# keep_days: rows younger than this are never pruned, whatever the limits say,
+#            so dedupe checks for recent items stay correct.
+DEFAULT_RETENTION = {
+    "vacuum_interval_days": 7,
+    "tables": {
+        "pinned": {"max_age_days": 365, "max_rows": 20000, "keep_days": 90},
+        "searched_boards": {"max_age_days": 60, "max_rows": 5000, "keep_days": 14},
+        "run_events": {"max_age_days": 180, "max_rows": 50000, "keep_days": 30},
+    },
+}
+
+SQLITE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 
 def get_conn():
     conn = sqlite3.connect(DB_PATH)
@@ -15,6 +43,14 @@ def get_conn():
 def init_db():
     conn = get_conn()
     cur = conn.cursor()
+
+    # Incremental auto-vacuum lets run_maintenance() hand freed pages back to
+    # the filesystem without rewriting the whole file. Switching an existing
+    # database over needs a one-time full VACUUM.
+    if cur.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cur.execute("VACUUM")
+
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS pinned (
@@ -45,9 +81,191 @@ def init_db():
         )
         """
     )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS history_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_table TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    # Run reports (see agent/run_report.py); times are epoch seconds.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            started_at REAL,
+            finished_at REAL,
+            status TEXT,
+            wall_seconds REAL,
+            cpu_seconds REAL,
+            totals TEXT,
+            counters TEXT,
+            stages TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS run_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            item TEXT,
+            account TEXT,
+            started_at REAL,
+            wall_seconds REAL,
+            cpu_seconds REAL,
+            outcome TEXT,
+            reason TEXT,
+            counters TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_run_events_run ON run_events (run_id)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS maintenance (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """
+    )
+    for table, column in HISTORY_TIME_COLUMNS.items():
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})"
+        )
+    conn.commit()
+    conn.close()
+
+
+def get_db_size(conn):
+    """Returns the database size in bytes and the number of free pages."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {"bytes": page_size * page_count, "free_pages": freelist}
+
+
+def prune_table(conn, table, policy, now=None):
+    """
+    Moves rows that fall outside the retention policy of a history table into
+    history_archive (as one zlib-compressed JSON batch) and deletes them.
+    Returns the number of pruned rows.
+    """
+    column = HISTORY_TIME_COLUMNS[table]
+    now = now or datetime.utcnow()
+
+    max_age_days = policy.get("max_age_days")
+    max_rows = policy.get("max_rows")
+    keep_days = policy.get("keep_days") or 0
+
+    conditions = []
+    params = []
+    if max_age_days is not None:
+        conditions.append(f"{column} < ?")
+        params.append((now - timedelta(days=max_age_days)).strftime(SQLITE_TIME_FORMAT))
+    if max_rows is not None:
+        conditions.append(
+            f"id NOT IN (SELECT id FROM {table} ORDER BY {column} DESC, id DESC LIMIT ?)"
+        )
+        params.append(int(max_rows))
+    if not conditions:
+        return 0
+
+    protect_cutoff = (now - timedelta(days=keep_days)).strftime(SQLITE_TIME_FORMAT)
+    rows = conn.execute(
+        f"SELECT * FROM {table} WHERE {column} < ? AND ({' OR '.join(conditions)})",
+        [protect_cutoff] + params,
+    ).fetchall()
+    if not rows:
+        return 0
+
+    payload = zlib.compress(json.dumps([dict(r) for r in rows]).encode("utf-8"), 9)
+    conn.execute(
+        "INSERT INTO history_archive (source_table, row_count, payload) VALUES (?, ?, ?)",
+        (table, len(rows), payload),
+    )
+    conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(r["id"],) for r in rows])
+    return len(rows)
+
+
+def read_archive(source_table=None):
+    """Decompresses archived history rows, optionally for a single table."""
+    conn = get_conn()
+    query = "SELECT source_table, payload FROM history_archive"
+    params = ()
+    if source_table:
+        query += " WHERE source_table = ?"
+        params = (source_table,)
+    out = []
+    for row in conn.execute(query + " ORDER BY id", params):
+        for item in json.loads(zlib.decompress(row["payload"])):
+            item["source_table"] = row["source_table"]
+            out.append(item)
+    conn.close()
+    return out
+
+
+def run_maintenance(retention=None, force_vacuum=False, now=None):
+    """
+    Applies the retention policy to every history table and runs an
+    incremental VACUUM when the configured interval has elapsed.
+    Returns a report with the pruned row counts and DB size before/after.
+    """
+    retention = retention or {}
+    tables = {k: dict(v) for k, v in DEFAULT_RETENTION["tables"].items()}
+    for table, policy in (retention.get("tables") or {}).items():
+        tables.setdefault(table, {}).update(policy or {})
+    vacuum_interval_days = retention.get(
+        "vacuum_interval_days", DEFAULT_RETENTION["vacuum_interval_days"]
+    )
+    now = now or datetime.utcnow()
+
+    conn = get_conn()
+    size_before = get_db_size(conn)
+
+    pruned = {}
+    for table, policy in tables.items():
+        if table not in HISTORY_TIME_COLUMNS:
+            continue
+        pruned[table] = prune_table(conn, table, policy, now=now)
     conn.commit()
+
+    row = conn.execute(
+        "SELECT value FROM maintenance WHERE key = 'last_vacuum_at'"
+    ).fetchone()
+    last_vacuum = datetime.strptime(row["value"], SQLITE_TIME_FORMAT) if row else None
+    vacuumed = False
+    if (
+        force_vacuum
+        or last_vacuum is None
+        or now - last_vacuum >= timedelta(days=vacuum_interval_days)
+    ):
+        # incremental_vacuum frees one page per step; executescript runs it
+        # to completion whereas execute() would only take the first step.
+        conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute(
+            "INSERT OR REPLACE INTO maintenance (key, value) VALUES ('last_vacuum_at', ?)",
+            (now.strftime(SQLITE_TIME_FORMAT),),
+        )
+        conn.commit()
+        vacuumed = True
+
+    size_after = get_db_size(conn)
     conn.close()
 
+    return {
+        "pruned": pruned,
+        "vacuumed": vacuumed,
+        "size_before": size_before["bytes"],
+        "size_after": size_after["bytes"],
+    }
+
 
 def clear_all_history():
     """Deletes all records from the tracking tables."""
@@ -89,6 +307,15 @@ if __name__ == "__main__":
             print(f"   - {counts['searched_boards']} entries from 'searched_boards'.")
         except Exception as e:
             print(f"❌ Failed to clear database: {e}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "prune":
+        init_db()
+        report = run_maintenance(force_vacuum=True)
+        print("🧹 Applied retention policy:")
+        for table, count in report["pruned"].items():
+            print(f"   - archived {count} entries from '{table}'.")
+        print(
+            f"   DB size: {report['size_before']} -> {report['size_after']} bytes"
+        )
     else:
         init_db()
         print("Database initialized.")
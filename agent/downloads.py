@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("pinterest-agent")
+
+MAX_DOWNLOAD_BYTES = 25 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+}
+
+# Leading bytes of the image formats Pillow and Pinterest both accept.
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+)
+
+
+class DownloadError(RuntimeError):
+    """Raised when a download is refused (too large, not an image, bad status)."""
+
+
+def sniff_image_format(head):
+    """Returns the image format for the first bytes of a file, or None."""
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, fmt in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return fmt
+    return None
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url):
+    """One pooled requests.Session per scheme+host, shared by all threads."""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+            session.mount(f"{parts.scheme}://", adapter)
+            _sessions[key] = session
+    return session
+
+
+def _validator(headers):
+    """The If-Range validator of a response: a strong ETag, else Last-Modified."""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def _discard(*paths):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _hash_file(path, sha):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+
+
+def download(
+    url,
+    dest,
+    max_bytes=MAX_DOWNLOAD_BYTES,
+    headers=None,
+    timeout=20,
+    expect_image=True,
+    resume=True,
+):
+    """
+    Streams url to dest in CHUNK_SIZE pieces, never holding the body in memory.
+
+    - refuses bodies whose Content-Length or actual size exceeds max_bytes;
+    - with expect_image, refuses non-image content types and checks the magic
+      bytes of the first chunk before reading the rest;
+    - data is written to dest + ".part", next to the ETag or Last-Modified
+      of the response in dest + ".part.validator"; if a previous attempt left
+      both behind and resume is set, only the missing tail is requested, with
+      Range and If-Range headers. A server whose copy changed since (or that
+      ignores ranges) answers 200 with the whole body, which replaces the
+      partial file;
+    - a 304 answer to conditional headers returns status 304 and no path.
+
+    Concurrent downloads to the same dest must be serialized by the caller.
+
+    Returns {"status", "path", "size", "sha256", "format", "headers"}.
+    """
+    part = f"{dest}.part"
+    validator_path = f"{part}.validator"
+    req_headers = dict(DEFAULT_HEADERS)
+    req_headers.update(headers or {})
+
+    offset = 0
+    if resume and os.path.exists(part):
+        try:
+            with open(validator_path) as f:
+                validator = f.read().strip()
+        except FileNotFoundError:
+            validator = None
+        if validator:
+            offset = os.path.getsize(part)
+            req_headers["Range"] = f"bytes={offset}-"
+            req_headers["If-Range"] = validator
+    if not offset:
+        _discard(part, validator_path)  # nothing we could safely resume
+
+    session = get_session(url)
+    with session.get(url, headers=req_headers, timeout=timeout, stream=True) as r:
+        if r.status_code == 304:
+            return {"status": 304, "path": None, "headers": r.headers}
+        content_range = r.headers.get("Content-Range") or ""
+        wrong_range = r.status_code == 206 and not content_range.startswith(
+            f"bytes {offset}-"
+        )
+        if offset and (r.status_code == 416 or wrong_range):
+            # Our partial file is stale or already complete; start over.
+            _discard(part, validator_path)
+            return download(url, dest, max_bytes, headers, timeout, expect_image, False)
+        if r.status_code >= 400:
+            raise DownloadError(f"GET {url} failed with HTTP {r.status_code}")
+
+        if r.status_code != 206:
+            # A full body (e.g. If-Range failed): fetch from scratch.
+            offset = 0
+            _discard(validator_path)
+            validator = _validator(r.headers)
+            if validator:
+                with open(validator_path, "w") as f:
+                    f.write(validator)
+
+        sha = hashlib.sha256()
+        size = offset
+        fmt = None
+        mode = "ab" if offset else "wb"
+        try:
+            # A refused body leaves nothing behind to resume.
+            length = r.headers.get("Content-Length")
+            if length and length.isdigit() and offset + int(length) > max_bytes:
+                raise DownloadError(
+                    f"{url} is {offset + int(length)} bytes, limit is {max_bytes}"
+                )
+
+            content_type = r.headers.get("Content-Type") or ""
+            content_type = content_type.split(";")[0].strip()
+            if expect_image and content_type and not (
+                content_type.startswith("image/")
+                or content_type in ("application/octet-stream", "binary/octet-stream")
+            ):
+                raise DownloadError(f"{url} has non-image content type {content_type}")
+
+            if offset:
+                _hash_file(part, sha)
+            with open(part, mode) as f:
+                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    if size == 0 and expect_image:
+                        fmt = sniff_image_format(chunk[:16])
+                        if not fmt:
+                            raise DownloadError(f"{url} is not a recognised image")
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DownloadError(f"{url} exceeded {max_bytes} bytes")
+                    sha.update(chunk)
+                    f.write(chunk)
+        except DownloadError:
+            _discard(part, validator_path)
+            raise
+
+    if expect_image and fmt is None:
+        with open(part, "rb") as f:
+            fmt = sniff_image_format(f.read(16))
+        if not fmt:
+            _discard(part, validator_path)
+            raise DownloadError(f"{url} is not a recognised image")
+
+    os.replace(part, dest)
+    _discard(validator_path)
+    return {
+        "status": r.status_code,
+        "path": dest,
+        "size": size,
+        "sha256": sha.hexdigest(),
+        "format": fmt,
+        "headers": r.headers,
+    }
@@ -1,8 +1,12 @@
-import os, time, base64, requests
-from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
+import os, time, json, tempfile
+from PIL import Image, ImageDraw
 from requests.exceptions import HTTPError
-import replicate
+
+from .image_cache import get_image_cache
+from .image_ops import encode_image, frame_image, load_for_boxes, output_settings
+from .replicate_client import get_generation_client
+from .templates import box_layer, get_template, static_layer
+from .text_layout import get_metrics, layout_text, wrap_words
 
 
 DEFAULT_HEADERS = {
@@ -12,41 +16,20 @@ TARGET_WIDTH = 1000
 TARGET_HEIGHT = 1500  # 2:3 Pinterest Aspect Ratio
 
 
-def generate_image_replicate(prompt, outfile, model_name="prunaai/p-image"):
+def generate_image_replicate(prompt, outfile, model_name="prunaai/p-image", params=None):
     """
     Generate an image using Replicate.
-    Uses replicate.run() (recommended method) instead of model.predict().
+    Goes through the shared GenerationClient: model availability is cached,
+    the prediction is polled asynchronously and the result is cached by
+    (model, prompt, params), so retries reuse an existing output.
     Raises RuntimeError on failure.
     """
     try:
-        # Check available models
-        available_models = [m.id for m in replicate.models.list()]
-        if model_name not in available_models:
-            raise RuntimeError(
-                f"[Replicate ERROR] Model '{model_name}' not available for this token.\n"
-                f"Available models: {available_models}"
-            )
-
-        print(f"[Replicate] Using model '{model_name}' to generate image...")
-        output = replicate.run(model_name, input={"prompt": prompt})
-
-        if isinstance(output, list) and len(output) > 0:
-            image_url = output[0]
-        elif isinstance(output, str):
-            image_url = output
-        else:
-            raise RuntimeError(
-                f"[Replicate ERROR] Unexpected output from model: {output}"
-            )
-
-        r = requests.get(image_url, timeout=60)
-        r.raise_for_status()
-
-        with open(outfile, "wb") as f:
-            f.write(r.content)
-
-        print(f"[Replicate] Image saved to {outfile}")
-        return outfile
+        path = get_generation_client().generate(
+            prompt, model_name, params=params, outfile=outfile
+        )
+        print(f"[Replicate] Image saved to {path}")
+        return path
 
     except Exception as e:
         raise RuntimeError(f"[Replicate ERROR] Generation failed: {e}") from e
@@ -54,40 +37,32 @@ def generate_image_replicate(prompt, outfile, model_name="prunaai/p-image"):
 
 def get_wrapped_text(text: str, font, max_width: int):
     """Dynamically wraps text based on font and maximum pixel width."""
-    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
-
-    words = text.split()
-    lines, current_line = [], ""
-
-    for word in words:
-        # Check width of line + new word
-        test_line = current_line + word + " "
-        # Use getbbox for modern Pillow versions
-        bbox = draw.textbbox((0, 0), test_line, font=font)
-        test_width = bbox[2] - bbox[0]
-
-        if test_width <= max_width:
-            current_line = test_line
-        else:
-            lines.append(current_line.strip())
-            current_line = word + " "
-
-    if current_line:
-        lines.append(current_line.strip())
-
-    return lines
+    return wrap_words(text, get_metrics(font), max_width)
 
 
 def build_aesthetic_image(
-    background_url=None, title_text="", outfile=None, replicate_model="prunaai/p-image"
+    background_url=None,
+    title_text="",
+    outfile=None,
+    replicate_model="prunaai/p-image",
+    template=None,
+    output=None,
+    variants=None,
 ):
     """
     Build aesthetic Pinterest-style image.
     Primary: Replicate AI
     Fallback: Local overlay generator
+    With variants (see render_variants) the local generator renders every
+    size from one decode; the first variant is written to outfile and the
+    others plus a manifest next to it.
     """
     if not outfile:
-        outfile = f"/tmp/pin_{int(time.time())}.jpg"
+        ext = ".webp" if output_settings(output)["format"] == "webp" else ".jpg"
+        # Unique even for renders started in the same second on parallel
+        # workers.
+        fd, outfile = tempfile.mkstemp(prefix=f"pin_{int(time.time())}_", suffix=ext)
+        os.close(fd)
 
     replicate_token = os.getenv("REPLICATE_API_TOKEN")
 
@@ -104,126 +79,195 @@ def build_aesthetic_image(
             print(f"[Fallback] Using local image generator for '{title_text}'")
 
     # FALLBACK: Local image builder
-    try:
-        if background_url:
-            r = requests.get(background_url, headers=DEFAULT_HEADERS, timeout=20)
-            img = Image.open(BytesIO(r.content)).convert("RGBA")
-            original_w, original_h = img.size
+    background = None
+    if background_url:
+        try:
+            # Cached on disk by URL + content hash, so retries and later runs
+            # don't download the same background again.
+            background = str(
+                get_image_cache().fetch(
+                    background_url, headers=DEFAULT_HEADERS, timeout=20
+                )
+            )
+        except Exception as e:
+            print(f"[Local Generator] Failed to load background image: {e}")
+
+    results = render_variants(
+        background=background,
+        title_text=title_text,
+        variants=variants,
+        template=template,
+        output=output,
+    )
+    if variants:
+        manifest = write_variants(results, outfile)
+        for entry in manifest:
+            print(
+                f"[Local Generator] {entry['name']} {entry['width']}x{entry['height']} "
+                f"saved to {entry['path']} ({entry['format']}, "
+                f"quality {entry['quality']}, {entry['size']} bytes)"
+            )
+        return outfile
 
-            scale_w = TARGET_WIDTH / original_w
-            scale_h = TARGET_HEIGHT / original_h
+    _, data, info = results[0]
+    with open(outfile, "wb") as f:
+        f.write(data)
+    print(
+        f"[Local Generator] Image saved to {outfile} "
+        f"({info['format']}, quality {info['quality']}, {info['size']} bytes)"
+    )
+    return outfile
 
-            scale = min(scale_w, scale_h)
 
-            new_w = int(original_w * scale)
-            new_h = int(original_h * scale)
+DEFAULT_VARIANTS = [
+    {"name": "pin", "width": TARGET_WIDTH, "height": TARGET_HEIGHT, "fit": "letterbox"},
+]
 
-            scaled_img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            img = Image.new("RGBA", (TARGET_WIDTH, TARGET_HEIGHT), (0, 0, 0, 255))
 
-            x_offset = (TARGET_WIDTH - new_w) // 2
-            y_offset = (TARGET_HEIGHT - new_h) // 2
+def _blank(width, height):
+    return Image.new("RGB", (width, height), (240, 240, 240))
 
-            img.paste(scaled_img, (x_offset, y_offset))
-        else:
-            img = Image.new("RGBA", (1000, 1500), (240, 240, 240, 255))
+
+def decode_background(source, sizes):
+    """
+    Decodes source (raw bytes, a local path or None) once, at the smallest
+    resolution that still covers every (width, height) in sizes. Returns an
+    RGB image, or None when there is no usable background.
+    """
+    if not source:
+        return None
+    try:
+        # Draft-mode decode plus staged reduction, shared by all variants
+        return load_for_boxes(source, sizes)
     except Exception as e:
         print(f"[Local Generator] Failed to load background image: {e}")
-        img = Image.new("RGBA", (1000, 1500), (240, 240, 240, 255))
+        return None
 
-    draw = ImageDraw.Draw(img)
 
-    # DYNAMIC FONT SIZING (Using a placeholder font for size)
-    FONT_SIZE = 80
-    try:
-        font = ImageFont.load_default(size=FONT_SIZE)
-    except Exception:
-        font = ImageFont.load_default()
-        FONT_SIZE = 16
+def layout_title(title_text, tpl, sizes):
+    """
+    Lays the title out once for all sizes: measured against the narrowest
+    width and the smallest text area, so every variant wraps the same lines
+    at the same font size.
+    """
+    font_cfg = tpl["font"]
+    padding = tpl["box"]["padding"]
+    return layout_text(
+        title_text or "",
+        min(int(w * font_cfg["max_width"]) for w, _ in sizes),
+        max_height=min(int(h * tpl["max_text_height"]) for _, h in sizes) - padding * 2,
+        font_size=font_cfg["size"],
+        min_font_size=font_cfg["min_size"],
+        line_padding=font_cfg["line_padding"],
+        font_path=font_cfg.get("path"),
+    )
 
-    MAX_TEXT_WIDTH = int(img.width * 0.85)
-    text_to_use = title_text or ""
 
-    lines = get_wrapped_text(text_to_use, font, MAX_TEXT_WIDTH)
+def compose_pin(canvas, layout, tpl):
+    """Blends the template overlay and the laid-out title over an RGB canvas."""
+    width, height = canvas.size
+    padding = tpl["box"]["padding"]
 
     # CALCULATE BOX AND POSITION
-    # Get the bounding box of the entire text block to determine the required box height
-    total_text_height = 0
-    max_line_width = 0
-    for ln in lines:
-        bbox = draw.textbbox((0, 0), ln, font=font)
-        line_w = bbox[2] - bbox[0]
-        line_h = bbox[3] - bbox[1]
-        total_text_height += line_h
-        if line_w > max_line_width:
-            max_line_width = line_w
-
-    LINE_PADDING = 20  # Vertical space between lines
-    BOX_PADDING = 40  # Padding around the text box
-
-    total_text_height += LINE_PADDING * (len(lines) - 1)
-    box_h = total_text_height + BOX_PADDING * 2
-
-    # Position the box in the bottom quarter of the image
-    y = img.height - box_h - 150
-
-    # Draw transparent black rectangle
-    draw.rectangle(
-        [40, y, img.width - 40, y + box_h],  # Left padding  # Right padding
-        fill=(0, 0, 0, 180),  # Darker overlay
+    box_h = layout.height + padding * 2
+    y = height - box_h - tpl["bottom_offset"]
+
+    # The background stays RGB through decode and resize; the cached static
+    # layer (gradient) is alpha-blended over it in one pass, then the box, which
+    # depends on the title's height, over just its strip.
+    img = canvas.convert("RGBA")
+    overlay = static_layer(tpl, width, height)
+    if overlay is not None:
+        img.alpha_composite(overlay)
+    box = box_layer(tpl, width, box_h)
+    if box is not None:
+        img.alpha_composite(box, dest=(0, y))
+
+    # DRAW TEXT on a strip the size of the box so text colours with alpha
+    # blend too (line boxes were measured once by the layout).
+    text_layer = Image.new("RGBA", (width, box_h), (0, 0, 0, 0))
+    layout.draw(
+        ImageDraw.Draw(text_layer), padding, width, fill=tuple(tpl["colors"]["text"])
     )
+    img.alpha_composite(text_layer, dest=(0, y))
+    return img.convert("RGB")
 
-    # DRAW TEXT
-    text_y = y + BOX_PADDING
-    for ln in lines:
-        # Recalculate bbox for alignment
-        bbox = draw.textbbox((0, 0), ln, font=font)
-        w = bbox[2] - bbox[0]
-
-        # Center the text horizontally
-        x = (img.width - w) / 2
 
-        draw.text((x, text_y), ln, font=font, fill=(255, 255, 255, 255))
+def render_variants(
+    background=None, title_text="", variants=None, template=None, output=None
+):
+    """
+    Renders one pin per variant ({"name", "width", "height", "fit"}) from a
+    single decode of the background and a single title layout. fit is one of
+    crop (edge-aware), fill (blurred backdrop), letterbox or auto (crop when
+    little is lost, fill otherwise). Returns [(variant, data, info), ...] in
+    the order given.
+    """
+    variants = variants or DEFAULT_VARIANTS
+    tpl = get_template(template)
+    sizes = [(int(v["width"]), int(v["height"])) for v in variants]
 
-        # Move down for the next line
-        text_y += (bbox[3] - bbox[1]) + LINE_PADDING  # Use actual line height + padding
+    decoded = decode_background(background, sizes)
+    layout = layout_title(title_text, tpl, sizes)
 
-    rgb = img.convert("RGB")
-    rgb.save(outfile, quality=85)
-    print(f"[Local Generator] Image saved to {outfile}")
-    return outfile
+    results = []
+    for variant, size in zip(variants, sizes):
+        if decoded is None:
+            canvas = _blank(*size)
+        else:
+            canvas = frame_image(decoded, size, variant.get("fit") or "auto")
+        data, info = encode_image(compose_pin(canvas, layout, tpl), output)
+        results.append((variant, data, info))
+    return results
+
+
+def render_pin(
+    background=None,
+    title_text="",
+    width=TARGET_WIDTH,
+    height=TARGET_HEIGHT,
+    template=None,
+    output=None,
+    fit="letterbox",
+):
+    """
+    Renders a pin (background, template overlay and title) and returns the
+    encoded bytes plus the encoder report (format, quality, size). Pure CPU
+    work with no network access, so it is safe to run in a worker process.
+    template is a template name or settings dict, output an output spec
+    (see image_ops.DEFAULT_OUTPUT).
+    """
+    variant = {"name": "pin", "width": width, "height": height, "fit": fit}
+    _, data, info = render_variants(
+        background, title_text, [variant], template=template, output=output
+    )[0]
+    return data, info
 
 
-def upload_image_to_github(
-    path_local, repo=None, branch="gh-pages", dest_path=None, token=None
-):
-    if not token:
-        token = os.getenv("GITHUB_TOKEN")
-    if not repo:
-        repo = os.getenv("GITHUB_REPOSITORY")
-    if not token or not repo:
-        raise RuntimeError(
-            "GITHUB_TOKEN and GITHUB_REPOSITORY required to upload images"
+def write_variants(results, outfile):
+    """
+    Writes rendered variants next to each other: the first one to outfile,
+    the rest to <stem>_<name><ext>, plus <stem>.manifest.json describing
+    them all. Returns the manifest.
+    """
+    stem = os.path.splitext(outfile)[0]
+    manifest = []
+    for i, (variant, data, info) in enumerate(results):
+        path = outfile if i == 0 else f"{stem}_{variant['name']}{info['extension']}"
+        with open(path, "wb") as f:
+            f.write(data)
+        manifest.append(
+            {
+                "name": variant["name"],
+                "width": int(variant["width"]),
+                "height": int(variant["height"]),
+                "fit": variant.get("fit") or "auto",
+                "path": path,
+                "format": info["format"],
+                "quality": info["quality"],
+                "size": info["size"],
+            }
         )
-    if not dest_path:
-        dest_path = f"images/{int(time.time())}_{os.path.basename(path_local)}"
-    owner, repo_name = repo.split("/")
-    url = f"https://api.github.com/repos/{owner}/{repo_name}/contents/{dest_path}"
-    with open(path_local, "rb") as f:
-        content = f.read()
-    b64 = base64.b64encode(content).decode("utf-8")
-    payload = {
-        "message": f"Add generated image {os.path.basename(dest_path)}",
-        "content": b64,
-        "branch": branch,
-    }
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github+json",
-    }
-    r = requests.put(url, json=payload, headers=headers, timeout=30)
-    r.raise_for_status()
-    raw_url = (
-        f"https://raw.githubusercontent.com/{owner}/{repo_name}/{branch}/{dest_path}"
-    )
-    return raw_url
+    with open(f"{stem}.manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
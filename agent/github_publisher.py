@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .utils import Base64FileBody
+
+logger = logging.getLogger("pinterest-agent")
+
+GITHUB_API_URL = "https://api.github.com"
+HASH_CHUNK_SIZE = 64 * 1024
+BLOB_PREFIX = b'{"encoding": "base64", "content": "'
+BLOB_SUFFIX = b'"}'
+
+
+class PublishError(RuntimeError):
+    """Raised when the batch could not be committed to the host branch."""
+
+
+def git_blob_sha(path):
+    """SHA-1 git assigns to the file as a blob, used to verify uploads."""
+    sha = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode("ascii"))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class GitHubPublisher:
+    """
+    Publishes many files to a branch in one commit through the Git Data API:
+    one blob per file, then a single tree, commit and fast-forward of the
+    branch ref. When the ref moved in the meantime (another run pushed), the
+    tree and commit are rebuilt on the new head and the update is retried;
+    the blobs are reused.
+    """
+
+    def __init__(
+        self,
+        repo,
+        branch="gh-pages",
+        token=None,
+        api_url=GITHUB_API_URL,
+        max_attempts=5,
+        blob_workers=4,
+        timeout=30,
+    ):
+        if not token or not repo:
+            raise RuntimeError(
+                "GITHUB_TOKEN and GITHUB_REPOSITORY required to upload images"
+            )
+        self.repo = repo
+        self.branch = branch
+        self.api_url = api_url.rstrip("/")
+        self.max_attempts = max_attempts
+        self.blob_workers = blob_workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "Authorization": f"token {token}",
+                "Accept": "application/vnd.github+json",
+            }
+        )
+
+    def _url(self, path):
+        return f"{self.api_url}/repos/{self.repo}/git/{path}"
+
+    def _request(self, method, path, **kwargs):
+        r = self.session.request(method, self._url(path), timeout=self.timeout, **kwargs)
+        r.raise_for_status()
+        return r.json()
+
+    def exists(self, dest_path):
+        """Cheap existence check (HEAD, no content transferred)."""
+        r = self.session.head(
+            f"{self.api_url}/repos/{self.repo}/contents/{dest_path}",
+            params={"ref": self.branch},
+            timeout=self.timeout,
+        )
+        if r.status_code == 404:
+            return False
+        r.raise_for_status()
+        return True
+
+    def raw_url(self, dest_path):
+        return f"https://raw.githubusercontent.com/{self.repo}/{self.branch}/{dest_path}"
+
+    def create_blob(self, path):
+        expected = git_blob_sha(path)
+        data = self._request(
+            "POST",
+            "blobs",
+            data=Base64FileBody(path, BLOB_PREFIX, BLOB_SUFFIX),
+            headers={"Content-Type": "application/json"},
+        )
+        if data.get("sha") != expected:
+            raise PublishError(
+                f"Blob for {path} came back as {data.get('sha')}, expected {expected}"
+            )
+        return expected
+
+    def _commit(self, entries, message):
+        ref = self._request("GET", f"ref/heads/{self.branch}")
+        head = ref["object"]["sha"]
+        base_tree = self._request("GET", f"commits/{head}")["tree"]["sha"]
+        tree = self._request(
+            "POST", "trees", json={"base_tree": base_tree, "tree": entries}
+        )
+        commit = self._request(
+            "POST",
+            "commits",
+            json={"message": message, "tree": tree["sha"], "parents": [head]},
+        )
+        # force=False: GitHub answers 422 unless this is a fast-forward.
+        self._request(
+            "PATCH",
+            f"refs/heads/{self.branch}",
+            json={"sha": commit["sha"], "force": False},
+        )
+        return commit["sha"]
+
+    def publish(self, files, message=None):
+        """
+        files is a list of (local_path, dest_path). Returns {local_path:
+        raw_url} once all of them are on the branch in a single commit.
+        """
+        files = list(files)
+        if not files:
+            return {}
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.blob_workers, len(files)))
+        ) as pool:
+            shas = list(pool.map(self.create_blob, [local for local, _ in files]))
+
+        entries = [
+            {"path": dest, "mode": "100644", "type": "blob", "sha": sha}
+            for (_, dest), sha in zip(files, shas)
+        ]
+        message = message or f"Add {len(files)} generated image(s)"
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                commit_sha = self._commit(entries, message)
+                logger.info(
+                    "Published %s file(s) to %s@%s in commit %s",
+                    len(files),
+                    self.repo,
+                    self.branch,
+                    commit_sha[:7],
+                )
+                return {local: self.raw_url(dest) for local, dest in files}
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                # 409/422: the ref moved under us; anything else is not a race.
+                if status not in (409, 422) or attempt == self.max_attempts:
+                    raise PublishError(f"Publishing to {self.branch} failed: {e}") from e
+                delay = min(8.0, 0.5 * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                logger.debug("Ref update raced (HTTP %s), retrying in %.1fs", status, delay)
+                time.sleep(delay)
+
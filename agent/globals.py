@@ -1,12 +1,12 @@
 import os
-from .config_loader import load_yaml_with_env
+import threading
 
-from auth_api.api_config import ApiConfig
-from auth_api.access_token import AccessToken
 from auth_api.oauth_scope import Scope
 
+from .config_loader import load_yaml_with_env
+
 BASE = os.path.dirname(__file__)
-CONFIG = load_yaml_with_env(os.path.join(BASE, "config.yml"))
+CONFIG_PATH = os.path.join(BASE, "config.yml")
 
 REQUIRED_SCOPES = [
     Scope.READ_USERS,
@@ -22,5 +22,108 @@ REQUIRED_SCOPES = [
     Scope.READ_CATALOGS,
 ]
 
-API_CONFIG = ApiConfig(verbosity=1)
-PINTEREST_ACCESS_TOKEN = AccessToken(API_CONFIG)
+
+class AgentContext:
+    """
+    The agent's configuration and credentials, each built on first use.
+    Importing agent modules therefore reads no files, needs no environment
+    variables and constructs no clients; a missing app id or secret only
+    fails (with RuntimeError) once something talks to Pinterest.
+    """
+
+    def __init__(self, config_path=CONFIG_PATH):
+        self.config_path = config_path
+        self._lock = threading.RLock()
+        self._config = None
+        self._api_config = None
+        self._access_token = None
+
+    @property
+    def config(self):
+        with self._lock:
+            if self._config is None:
+                self._config = load_yaml_with_env(self.config_path)
+            return self._config
+
+    def reload_config(self):
+        """Re-reads the config file into the same dict, so every holder sees it."""
+        fresh = load_yaml_with_env(self.config_path)
+        with self._lock:
+            config = self.config
+            config.clear()
+            config.update(fresh)
+        return config
+
+    @property
+    def site_url(self):
+        return os.getenv("SITE_URL") or self.config.get("site")
+
+    @property
+    def api_config(self):
+        with self._lock:
+            if self._api_config is None:
+                from auth_api.api_config import ApiConfig
+
+                missing = [
+                    name
+                    for name in ("PINTEREST_APP_ID", "PINTEREST_APP_SECRET")
+                    if not os.environ.get(name)
+                ]
+                if missing:
+                    raise RuntimeError(
+                        f"{' and '.join(missing)} must be set in the environment."
+                    )
+                self._api_config = ApiConfig(verbosity=1)
+                store = (self.config.get("tokens") or {}).get("store")
+                if store and not os.environ.get("PINTEREST_TOKEN_STORE"):
+                    self._api_config.token_store = store
+            return self._api_config
+
+    @property
+    def access_token(self):
+        """The default account's AccessToken (not fetched yet)."""
+        with self._lock:
+            if self._access_token is None:
+                from auth_api.access_token import AccessToken
+
+                self._access_token = AccessToken(self.api_config)
+            return self._access_token
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def get_context():
+    global _context
+    with _context_lock:
+        if _context is None:
+            _context = AgentContext()
+        return _context
+
+
+def set_context(context):
+    """Installs context process-wide (e.g. one with another config file)."""
+    global _context
+    with _context_lock:
+        _context = context
+    return context
+
+
+def reload_config():
+    return get_context().reload_config()
+
+
+_LAZY = {
+    "CONFIG": "config",
+    "API_CONFIG": "api_config",
+    "PINTEREST_ACCESS_TOKEN": "access_token",
+}
+
+
+def __getattr__(name):
+    # CONFIG, API_CONFIG and PINTEREST_ACCESS_TOKEN used to be built at import
+    # time; they still work as module attributes, built on first access.
+    if name in _LAZY:
+        return getattr(get_context(), _LAZY[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .downloads import MAX_DOWNLOAD_BYTES, download
+from .run_report import get_run_report
+
+logger = logging.getLogger("pinterest-agent")
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "images"
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+DEFAULT_REVALIDATE_AFTER = 24 * 3600
+
+
+class ImageCache:
+    """
+    Content-addressed on-disk cache for remote images.
+
+    urls/<sha256(url)>.json maps a URL to the SHA-256 of its body plus the
+    validators (ETag / Last-Modified) needed for conditional revalidation.
+    blobs/<ab>/<sha256> holds each distinct body exactly once. Blob mtimes are
+    bumped on every hit and the least recently used blobs are evicted once the
+    cache grows past max_bytes.
+    """
+
+    def __init__(
+        self,
+        root=DEFAULT_CACHE_DIR,
+        max_bytes=DEFAULT_MAX_BYTES,
+        revalidate_after=DEFAULT_REVALIDATE_AFTER,
+        max_download_bytes=MAX_DOWNLOAD_BYTES,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.max_download_bytes = max_download_bytes
+        self.urls_dir = self.root / "urls"
+        self.blobs_dir = self.root / "blobs"
+        self.tmp_dir = self.root / "tmp"
+        for d in (self.urls_dir, self.blobs_dir, self.tmp_dir):
+            d.mkdir(parents=True, exist_ok=True)
+        self._evict_lock = threading.Lock()
+        # Fetches of one URL share its partial download; they take turns.
+        self._url_locks = [threading.Lock() for _ in range(64)]
+
+    def _url_entry_path(self, url):
+        return self.urls_dir / (hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def blob_path(self, digest):
+        return self.blobs_dir / digest[:2] / digest
+
+    def _read_entry(self, url):
+        try:
+            with open(self._url_entry_path(url), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, url, entry):
+        path = self._url_entry_path(url)
+        fd, tmp = tempfile.mkstemp(dir=self.tmp_dir, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def _touch(self, path):
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def get(self, url):
+        """Returns the cached file for url without any network access, or None."""
+        entry = self._read_entry(url)
+        if not entry:
+            return None
+        path = self.blob_path(entry["sha256"])
+        if not path.exists():
+            return None
+        self._touch(path)
+        return path
+
+    def fetch(self, url, headers=None, timeout=20):
+        """
+        Returns a local path holding the body of url, downloading it only when
+        it is not cached or the cached copy fails revalidation.
+        """
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        with self._url_locks[int(key[:8], 16) % len(self._url_locks)]:
+            return self._fetch(url, key, headers, timeout)
+
+    def _fetch(self, url, key, headers, timeout):
+        entry = self._read_entry(url)
+        cached = self.blob_path(entry["sha256"]) if entry else None
+        if cached is not None and not cached.exists():
+            entry, cached = None, None
+
+        req_headers = dict(headers or {})
+
+        if entry:
+            if time.time() - entry.get("fetched_at", 0) < self.revalidate_after:
+                self._touch(cached)
+                get_run_report().count("image_cache.hit")
+                return cached
+            if entry.get("etag"):
+                req_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                req_headers["If-Modified-Since"] = entry["last_modified"]
+
+        # Resumable, size-capped streaming download; a deterministic partial
+        # file name lets a retry for the same URL continue where it stopped.
+        tmp = self.tmp_dir / key
+        result = download(
+            url,
+            str(tmp),
+            max_bytes=self.max_download_bytes,
+            headers=req_headers,
+            timeout=timeout,
+        )
+        if entry and result["status"] == 304:
+            entry["fetched_at"] = int(time.time())
+            self._write_entry(url, entry)
+            self._touch(cached)
+            logger.debug("Image cache revalidated %s", url)
+            get_run_report().count("image_cache.revalidated")
+            return cached
+
+        get_run_report().count("image_cache.miss")
+
+        digest = result["sha256"]
+        path = self.blob_path(digest)
+        if path.exists():
+            # Same bytes under another URL: keep the existing blob.
+            os.unlink(tmp)
+            self._touch(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, path)
+
+        self._write_entry(
+            url,
+            {
+                "url": url,
+                "sha256": digest,
+                "size": result["size"],
+                "etag": result["headers"].get("ETag"),
+                "last_modified": result["headers"].get("Last-Modified"),
+                "content_type": result["headers"].get("Content-Type"),
+                "fetched_at": int(time.time()),
+            },
+        )
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Deletes least recently used blobs until the cache fits max_bytes."""
+        with self._evict_lock:
+            blobs = []
+            total = 0
+            for path in self.blobs_dir.glob("*/*"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                blobs.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for _, size, path in sorted(blobs, key=lambda b: b[0]):
+                if total <= self.max_bytes:
+                    break
+                if keep is not None and path == keep:
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            logger.debug("Image cache evicted %s blobs", removed)
+            return removed
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def configure_image_cache(settings=None):
+    """Builds the process-wide cache from the `image_cache` config section."""
+    global _default_cache
+    settings = settings or {}
+    with _default_lock:
+        _default_cache = ImageCache(
+            root=settings.get("dir") or DEFAULT_CACHE_DIR,
+            max_bytes=int(float(settings.get("max_mb") or 0) * 1024 * 1024)
+            or DEFAULT_MAX_BYTES,
+            revalidate_after=int(
+                float(settings.get("revalidate_after_hours") or 0) * 3600
+            )
+            or DEFAULT_REVALIDATE_AFTER,
+            max_download_bytes=int(
+                float(settings.get("max_download_mb") or 0) * 1024 * 1024
+            )
+            or MAX_DOWNLOAD_BYTES,
+        )
+    return _default_cache
+
+
+def get_image_cache():
+    if _default_cache is None:
+        return configure_image_cache()
+    return _default_cache
@@ -0,0 +1,265 @@
+import math
+from io import BytesIO
+
+from PIL import Image, ImageFilter
+
+
+# Anything above this is refused before decoding (roughly a 8000x6000 photo).
+MAX_SOURCE_PIXELS = 48_000_000
+# Integer box-filter reduction is applied until the image is at most this many
+# times the target size; the final LANCZOS pass then only has a small ratio
+# to cover, which is where its quality matters.
+REDUCE_GAP = 2
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when a source image declares more pixels than MAX_SOURCE_PIXELS."""
+
+
+def _open(source):
+    fp = BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    return Image.open(fp)
+
+
+def fit_size(size, box):
+    """Largest size with the aspect ratio of `size` that fits inside `box`."""
+    w, h = size
+    scale = min(box[0] / w, box[1] / h)
+    return max(1, int(w * scale)), max(1, int(h * scale))
+
+
+def cover_size(size, box):
+    """Smallest size with the aspect ratio of `size` that covers `box`."""
+    w, h = size
+    scale = max(box[0] / w, box[1] / h)
+    return max(1, math.ceil(w * scale)), max(1, math.ceil(h * scale))
+
+
+def to_rgb(img, background=(0, 0, 0)):
+    """Flattens any mode to RGB, compositing transparency onto background."""
+    if img.mode == "RGB":
+        return img
+    if img.mode == "P" and "transparency" in img.info:
+        img = img.convert("RGBA")
+    if img.mode in ("RGBA", "LA", "PA"):
+        img = img.convert("RGBA")
+        flat = Image.new("RGB", img.size, background)
+        flat.paste(img, mask=img.getchannel("A"))
+        return flat
+    return img.convert("RGB")
+
+
+def open_checked(source, max_pixels=MAX_SOURCE_PIXELS):
+    """Opens source lazily (header only) and refuses decompression bombs."""
+    img = _open(source)
+    w, h = img.size
+    if w * h > max_pixels:
+        raise ImageTooLargeError(
+            f"source image is {w}x{h} ({w * h} px), limit is {max_pixels} px"
+        )
+    return img
+
+
+def scale_to(img, target):
+    """
+    Decodes an opened image straight to `target`:
+    - JPEGs use draft mode, so libjpeg's DCT scaling decodes at 1/2, 1/4 or
+      1/8 size (never below what the target needs);
+    - the remaining reduction is done with a cheap integer box filter and a
+      single final LANCZOS pass;
+    - the result is RGB, alpha is only introduced when compositing.
+    """
+    if img.format == "JPEG":
+        # draft() only ever picks a scale that keeps the image >= target.
+        img.draft("RGB", target)
+
+    img = to_rgb(img)
+
+    factor = min(img.width // (target[0] * REDUCE_GAP), img.height // (target[1] * REDUCE_GAP))
+    if factor >= 2:
+        img = img.reduce(factor)
+
+    if img.size != target:
+        img = img.resize(target, Image.Resampling.LANCZOS)
+    return img
+
+
+def load_scaled(source, box, mode="fit", max_pixels=MAX_SOURCE_PIXELS):
+    """
+    Decodes source (bytes or path) straight to the size needed for `box`; the
+    header is checked against max_pixels before any pixel is decoded.
+    mode="fit" returns an image that fits inside box, mode="cover" one that
+    covers it (for cropping).
+    """
+    img = open_checked(source, max_pixels)
+    size = img.size
+    target = fit_size(size, box) if mode == "fit" else cover_size(size, box)
+    return scale_to(img, target)
+
+
+def load_for_boxes(source, boxes, max_pixels=MAX_SOURCE_PIXELS):
+    """
+    Decodes source once, at the smallest size that still covers every box
+    (never larger than the source), so all variants can be cut from it.
+    """
+    img = open_checked(source, max_pixels)
+    size = img.size
+    target = max((cover_size(size, box) for box in boxes), key=lambda s: s[0] * s[1])
+    if target[0] > size[0]:
+        target = size
+    return scale_to(img, target)
+
+
+def _best_window(energy, window):
+    """Start index of the window with the most energy (prefix sums, O(n))."""
+    prefix = [0]
+    for e in energy:
+        prefix.append(prefix[-1] + e)
+    best, best_sum = 0, -1
+    for i in range(len(energy) - window + 1):
+        total = prefix[i + window] - prefix[i]
+        if total > best_sum:
+            best, best_sum = i, total
+    return best
+
+
+def smart_crop(img, size):
+    """
+    Scales img to cover `size` and crops the overflowing axis where the edge
+    energy (detail) is highest, measured on a ~128px thumbnail.
+    """
+    scaled = img.resize(cover_size(img.size, size), Image.Resampling.LANCZOS)
+    extra_x, extra_y = scaled.width - size[0], scaled.height - size[1]
+    if extra_x <= 0 and extra_y <= 0:
+        return scaled
+
+    s = 128 / max(scaled.size)
+    thumb_size = (max(1, round(scaled.width * s)), max(1, round(scaled.height * s)))
+    edges = scaled.convert("L").resize(thumb_size).filter(ImageFilter.FIND_EDGES)
+    if extra_x >= extra_y:
+        energy = list(edges.resize((thumb_size[0], 1), Image.Resampling.BOX).getdata())
+        window = max(1, round(size[0] * s))
+        x = min(round(_best_window(energy, window) / s), extra_x)
+        return scaled.crop((x, 0, x + size[0], size[1]))
+    energy = list(edges.resize((1, thumb_size[1]), Image.Resampling.BOX).getdata())
+    window = max(1, round(size[1] * s))
+    y = min(round(_best_window(energy, window) / s), extra_y)
+    return scaled.crop((0, y, size[0], y + size[1]))
+
+
+def fill_frame(img, size, blur_radius=24):
+    """
+    Fits img inside `size` over a blurred, cover-scaled copy of itself
+    instead of black bars. The blur runs on a 1/8 size copy, which is far
+    cheaper and looks the same once scaled back up.
+    """
+    small = img.resize(
+        (max(1, size[0] // 8), max(1, size[1] // 8)), Image.Resampling.BOX
+    ).filter(ImageFilter.GaussianBlur(blur_radius / 8))
+    canvas = small.resize(size, Image.Resampling.BILINEAR)
+    canvas = Image.blend(canvas, Image.new("RGB", size, (0, 0, 0)), 0.25)
+    fitted = img.resize(fit_size(img.size, size), Image.Resampling.LANCZOS)
+    canvas.paste(fitted, ((size[0] - fitted.width) // 2, (size[1] - fitted.height) // 2))
+    return canvas
+
+
+def letterbox(img, size, color=(0, 0, 0)):
+    canvas = Image.new("RGB", size, color)
+    fitted = img.resize(fit_size(img.size, size), Image.Resampling.LANCZOS)
+    canvas.paste(fitted, ((size[0] - fitted.width) // 2, (size[1] - fitted.height) // 2))
+    return canvas
+
+
+# With fit="auto", crops losing at most this share of the image are taken,
+# anything more is framed with fill_frame.
+AUTO_CROP_MAX_LOSS = 0.3
+
+
+def frame_image(img, size, fit="auto"):
+    """Brings a decoded RGB image to exactly `size` using the given fit mode."""
+    if fit == "auto":
+        src_ratio = img.width / img.height
+        dst_ratio = size[0] / size[1]
+        loss = 1 - min(src_ratio, dst_ratio) / max(src_ratio, dst_ratio)
+        fit = "crop" if loss <= AUTO_CROP_MAX_LOSS else "fill"
+    if fit == "crop":
+        return smart_crop(img, size)
+    if fit == "fill":
+        return fill_frame(img, size)
+    return letterbox(img, size)
+
+
+DEFAULT_OUTPUT = {
+    "format": "jpeg",  # jpeg | webp
+    "max_kb": None,  # byte budget, None disables the quality search
+    "quality": 85,  # starting (and highest) quality
+    "min_quality": 45,  # the search never goes below this
+    "progressive": True,
+    "subsampling": "4:2:0",  # JPEG chroma subsampling: 4:4:4 | 4:2:2 | 4:2:0
+}
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+
+def output_settings(output=None):
+    settings = dict(DEFAULT_OUTPUT)
+    settings.update({k: v for k, v in (output or {}).items() if v is not None})
+    return settings
+
+
+def _encode(img, fmt, quality, settings):
+    out = BytesIO()
+    if fmt == "WEBP":
+        img.save(out, format="WEBP", quality=quality, method=6)
+    else:
+        # No exif/icc is passed through, so the output carries no metadata.
+        img.save(
+            out,
+            format="JPEG",
+            quality=quality,
+            optimize=True,
+            progressive=bool(settings["progressive"]),
+            subsampling=settings["subsampling"],
+        )
+    return out.getvalue()
+
+
+def encode_image(img, output=None):
+    """
+    Encodes an RGB image according to an output spec (see DEFAULT_OUTPUT).
+    With max_kb set, the quality is binary-searched for the highest value in
+    [min_quality, quality] whose output fits the budget. Returns the bytes
+    and a report with the chosen format, quality and size.
+    """
+    settings = output_settings(output)
+    fmt = "WEBP" if str(settings["format"]).lower() == "webp" else "JPEG"
+    if img.mode != "RGB":
+        img = to_rgb(img)
+
+    high = int(settings["quality"])
+    data = _encode(img, fmt, high, settings)
+    quality = high
+    budget = int(float(settings["max_kb"]) * 1024) if settings["max_kb"] else None
+
+    if budget and len(data) > budget:
+        lo, hi = int(settings["min_quality"]), high - 1
+        best = None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            candidate = _encode(img, fmt, mid, settings)
+            if len(candidate) <= budget:
+                best, quality = candidate, mid
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        if best is None:
+            quality = int(settings["min_quality"])
+            best = _encode(img, fmt, quality, settings)
+        data = best
+
+    return data, {
+        "format": fmt,
+        "extension": FORMAT_EXTENSIONS[fmt],
+        "quality": quality,
+        "size": len(data),
+        "within_budget": budget is None or len(data) <= budget,
+    }
@@ -0,0 +1,198 @@
+import logging
+import math
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from .downloads import DEFAULT_HEADERS, get_session
+
+logger = logging.getLogger("pinterest-agent")
+
+PROBE_MAX_BYTES = 64 * 1024  # give up if dimensions are not found in this much
+PROBE_CHUNK_SIZE = 4 * 1024
+TARGET_SIZE = (1000, 1500)  # 2:3 Pinterest Aspect Ratio
+SKIP_EXTENSIONS = (".svg", ".ico")
+
+# JPEG start-of-frame markers carry the image size (C4, C8 and CC are not SOF).
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _parse_jpeg(data):
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return "invalid"
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        (seg_len,) = struct.unpack(">H", data[i + 2 : i + 4])
+        if marker in _JPEG_SOF:
+            if i + 9 > len(data):
+                return None
+            h, w = struct.unpack(">HH", data[i + 5 : i + 9])
+            return "jpeg", w, h
+        i += 2 + seg_len
+    return None
+
+
+def parse_image_header(data):
+    """
+    Incrementally parses the first bytes of an image. Returns
+    (format, width, height) once they are known, None if more bytes are
+    needed, or "invalid" when the data is not a supported image.
+    """
+    if len(data) < 10:
+        return None
+    if data.startswith(b"\xff\xd8"):
+        return _parse_jpeg(data)
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        if len(data) < 24:
+            return None
+        w, h = struct.unpack(">II", data[16:24])
+        return "png", w, h
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        w, h = struct.unpack("<HH", data[6:10])
+        return "gif", w, h
+    if data[:4] == b"RIFF" and len(data) >= 12 and data[8:12] == b"WEBP":
+        if len(data) < 30:
+            return None
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            w, h = struct.unpack("<HH", data[26:30])
+            return "webp", w & 0x3FFF, h & 0x3FFF
+        if chunk == b"VP8L":
+            b = data[21:25]
+            w = 1 + (((b[1] & 0x3F) << 8) | b[0])
+            h = 1 + (((b[3] & 0xF) << 10) | (b[2] << 2) | ((b[1] & 0xC0) >> 6))
+            return "webp", w, h
+        if chunk == b"VP8X":
+            w = 1 + int.from_bytes(data[24:27], "little")
+            h = 1 + int.from_bytes(data[27:30], "little")
+            return "webp", w, h
+        return "invalid"
+    if data[:2] == b"BM":
+        if len(data) < 26:
+            return None
+        w, h = struct.unpack("<ii", data[18:26])
+        return "bmp", w, abs(h)
+    return "invalid"
+
+
+def probe_image(url, timeout=10, max_bytes=PROBE_MAX_BYTES):
+    """
+    Reads only the first few KB of url (Range request, stream closed as soon
+    as the header is parsed) and returns {"url", "format", "width", "height"},
+    or None when the size could not be determined.
+    """
+    headers = dict(DEFAULT_HEADERS)
+    headers["Range"] = f"bytes=0-{max_bytes - 1}"
+    buf = b""
+    try:
+        with get_session(url).get(url, headers=headers, timeout=timeout, stream=True) as r:
+            if r.status_code >= 400:
+                return None
+            for chunk in r.iter_content(chunk_size=PROBE_CHUNK_SIZE):
+                buf += chunk
+                parsed = parse_image_header(buf)
+                if parsed == "invalid":
+                    return None
+                if parsed:
+                    fmt, w, h = parsed
+                    return {"url": url, "format": fmt, "width": w, "height": h}
+                if len(buf) >= max_bytes:
+                    break
+    except Exception as e:
+        logger.debug("Probe failed for %s: %s", url, e)
+    return None
+
+
+def _parse_srcset(srcset):
+    urls = []
+    for entry in srcset.split(","):
+        parts = entry.strip().split()
+        if parts:
+            urls.append(parts[0])
+    return urls
+
+
+def collect_image_candidates(soup, base_url):
+    """
+    Every image a post offers, in preference order: og:image, twitter:image,
+    then <img> src/data-src and srcset entries inside the article (or the
+    whole page when there is no <article>).
+    """
+    found = []
+
+    for attrs in (
+        {"property": "og:image"},
+        {"name": "og:image"},
+        {"property": "og:image:secure_url"},
+        {"name": "twitter:image"},
+        {"property": "twitter:image"},
+    ):
+        for tag in soup.find_all("meta", attrs=attrs):
+            found.append(tag.get("content") or tag.get("value"))
+
+    scope = soup.find("article") or soup
+    for img in scope.find_all("img"):
+        found.append(img.get("src"))
+        found.append(img.get("data-src"))
+        for attr in ("srcset", "data-srcset"):
+            if img.get(attr):
+                found.extend(_parse_srcset(img.get(attr)))
+    for source in scope.find_all("source"):
+        if source.get("srcset"):
+            found.extend(_parse_srcset(source.get("srcset")))
+
+    out, seen = [], set()
+    for url in found:
+        if not url or url.startswith("data:"):
+            continue
+        url = urljoin(base_url, url.strip())
+        if url in seen or url.lower().split("?")[0].endswith(SKIP_EXTENSIONS):
+            continue
+        seen.add(url)
+        out.append(url)
+    return out
+
+
+def score_image(width, height, target=TARGET_SIZE):
+    """
+    Higher is better: how much of the target the image covers without
+    upscaling, minus a penalty for aspect ratios far from the target's.
+    """
+    if width <= 0 or height <= 0:
+        return float("-inf")
+    coverage = min(width / target[0], height / target[1], 1.0)
+    ratio_penalty = abs(math.log((width / height) / (target[0] / target[1])))
+    return coverage - 0.5 * ratio_penalty
+
+
+def pick_best_image(candidates, max_candidates=8, min_side=200, max_workers=4):
+    """
+    Probes up to max_candidates image URLs concurrently (header bytes only)
+    and returns the best ranked probe, or None when nothing usable was found.
+    """
+    candidates = list(candidates)[:max_candidates]
+    if not candidates:
+        return None
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(candidates))) as pool:
+        probes = [p for p in pool.map(probe_image, candidates) if p]
+
+    usable = [p for p in probes if p["width"] >= min_side and p["height"] >= min_side]
+    if not usable:
+        return None
+    # max() keeps the first of equal scores, i.e. the page's preference order.
+    best = max(usable, key=lambda p: score_image(p["width"], p["height"]))
+    logger.debug(
+        "Picked %s (%sx%s) out of %s candidates",
+        best["url"],
+        best["width"],
+        best["height"],
+        len(candidates),
+    )
+    return best
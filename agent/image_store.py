@@ -0,0 +1,351 @@
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from urllib.parse import quote, urlsplit
+
+import requests
+
+from .github_publisher import GitHubPublisher
+from .run_report import get_run_report
+
+logger = logging.getLogger("pinterest-agent")
+
+HASH_CHUNK_SIZE = 64 * 1024
+CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+}
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def content_key(path, prefix="images", digest=None):
+    """
+    Storage key derived from the file content: identical images always map
+    to the same key, different ones never collide.
+    """
+    digest = digest or file_sha256(path)
+    ext = os.path.splitext(path)[1].lower() or ".bin"
+    return f"{prefix.strip('/')}/{digest[:2]}/{digest}{ext}"
+
+
+class ImageStore:
+    """
+    Content-addressed image hosting. Backends implement exists(key),
+    put(path, key, digest) and public_url(key); publish() hashes the files,
+    skips everything already stored and uploads the rest.
+    """
+
+    name = "base"
+
+    def __init__(self, prefix="images"):
+        self.prefix = prefix
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def put(self, path, key, digest):
+        raise NotImplementedError
+
+    def public_url(self, key):
+        raise NotImplementedError
+
+    def put_many(self, items):
+        """items is a list of (path, key, digest); backends may batch this."""
+        for path, key, digest in items:
+            self.put(path, key, digest)
+
+    def publish(self, paths):
+        """Returns {local_path: public_url}, uploading only unseen content."""
+        keys = {}
+        for path in paths:
+            digest = file_sha256(path)
+            keys[path] = (content_key(path, self.prefix, digest), digest)
+
+        missing, seen = [], set()
+        for path, (key, digest) in keys.items():
+            if key in seen:
+                continue
+            seen.add(key)
+            if self.exists(key):
+                logger.debug("%s already stored as %s", path, key)
+                continue
+            missing.append((path, key, digest))
+
+        if missing:
+            self.put_many(missing)
+        report = get_run_report()
+        report.count("image_store.uploaded", len(missing))
+        report.count("image_store.present", len(seen) - len(missing))
+        logger.info(
+            "Image store (%s): %s uploaded, %s already present",
+            self.name,
+            len(missing),
+            len(seen) - len(missing),
+        )
+        return {path: self.public_url(key) for path, (key, _) in keys.items()}
+
+
+class GitHubStore(ImageStore):
+    """Files on a branch (e.g. gh-pages), all new ones added in one commit."""
+
+    name = "github"
+
+    def __init__(self, publisher, prefix="images"):
+        super().__init__(prefix)
+        self.publisher = publisher
+
+    def exists(self, key):
+        return self.publisher.exists(key)
+
+    def put_many(self, items):
+        self.publisher.publish([(path, key) for path, key, _ in items])
+
+    def put(self, path, key, digest):
+        self.put_many([(path, key, digest)])
+
+    def public_url(self, key):
+        return self.publisher.raw_url(key)
+
+
+class LocalDirStore(ImageStore):
+    """A directory served over HTTP by something else (nginx, Pages, ...)."""
+
+    name = "local"
+
+    def __init__(self, root, base_url, prefix="images"):
+        super().__init__(prefix)
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, path, key, digest):
+        dest = self._path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest))
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def public_url(self, key):
+        return f"{self.base_url}/{key}"
+
+
+def _hmac(key, msg):
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def sign_v4(
+    method,
+    url,
+    headers,
+    payload_hash,
+    access_key,
+    secret_key,
+    region,
+    service="s3",
+    now=None,
+):
+    """
+    AWS Signature Version 4 for a single request. Signs host plus every
+    header given and returns a copy of headers with x-amz-date,
+    x-amz-content-sha256 and Authorization added.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+
+    parts = urlsplit(url)
+    headers = dict(headers)
+    headers["x-amz-date"] = amz_date
+    headers["x-amz-content-sha256"] = payload_hash
+
+    canonical = {"host": parts.netloc}
+    canonical.update({k.lower(): " ".join(str(v).split()) for k, v in headers.items()})
+    signed_headers = ";".join(sorted(canonical))
+    query = "&".join(
+        sorted(
+            "=".join(quote(p, safe="-_.~") for p in (pair.split("=", 1) + [""])[:2])
+            for pair in parts.query.split("&")
+            if pair
+        )
+    )
+    canonical_request = "\n".join(
+        [
+            method,
+            quote(parts.path or "/", safe="/-_.~"),
+            query,
+            "".join(f"{k}:{canonical[k]}\n" for k in sorted(canonical)),
+            signed_headers,
+            payload_hash,
+        ]
+    )
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ]
+    )
+    key = _hmac(("AWS4" + secret_key).encode("utf-8"), date)
+    for part in (region, service, "aws4_request"):
+        key = _hmac(key, part)
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    headers["Authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return headers
+
+
+class S3Store(ImageStore):
+    """
+    Any S3-compatible bucket (AWS, R2, MinIO, ...), addressed path-style as
+    <endpoint>/<bucket>/<key>. Uploads stream from disk; the payload hash
+    SigV4 needs is the SHA-256 the key is already derived from.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket,
+        endpoint,
+        access_key,
+        secret_key,
+        region="us-east-1",
+        public_base_url=None,
+        prefix="images",
+        timeout=30,
+    ):
+        super().__init__(prefix)
+        if not bucket or not endpoint or not access_key or not secret_key:
+            raise RuntimeError("S3 image store needs bucket, endpoint and credentials")
+        self.bucket = bucket
+        self.endpoint = endpoint.rstrip("/")
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.public_base_url = (
+            public_base_url or f"{self.endpoint}/{self.bucket}"
+        ).rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _url(self, key):
+        return f"{self.endpoint}/{self.bucket}/{quote(key, safe='/-_.~')}"
+
+    def _signed(self, method, url, payload_hash, headers=None):
+        return sign_v4(
+            method,
+            url,
+            headers or {},
+            payload_hash,
+            self.access_key,
+            self.secret_key,
+            self.region,
+        )
+
+    def exists(self, key):
+        url = self._url(key)
+        empty = hashlib.sha256(b"").hexdigest()
+        r = self.session.head(
+            url, headers=self._signed("HEAD", url, empty), timeout=self.timeout
+        )
+        if r.status_code == 404:
+            return False
+        r.raise_for_status()
+        return True
+
+    def put(self, path, key, digest):
+        url = self._url(key)
+        ext = os.path.splitext(path)[1].lower()
+        headers = self._signed(
+            "PUT",
+            url,
+            digest,
+            {
+                "Content-Type": CONTENT_TYPES.get(ext, "application/octet-stream"),
+                "Cache-Control": "public, max-age=31536000, immutable",
+            },
+        )
+        headers["Content-Length"] = str(os.path.getsize(path))
+        with open(path, "rb") as f:
+            r = self.session.put(url, data=f, headers=headers, timeout=self.timeout)
+        r.raise_for_status()
+
+    def public_url(self, key):
+        return f"{self.public_base_url}/{key}"
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def configure_image_store(settings=None, branch=None):
+    """Builds the process-wide store from the `image_store` config section."""
+    global _default_store
+    settings = settings or {}
+    backend = os.getenv("IMAGE_STORE_BACKEND") or settings.get("backend") or "github"
+    prefix = settings.get("prefix") or "images"
+
+    if backend == "local":
+        local = settings.get("local") or {}
+        store = LocalDirStore(
+            local.get("dir") or "site", local.get("base_url") or "", prefix
+        )
+    elif backend == "s3":
+        s3 = settings.get("s3") or {}
+        store = S3Store(
+            bucket=s3.get("bucket"),
+            endpoint=s3.get("endpoint") or "https://s3.amazonaws.com",
+            access_key=os.getenv("AWS_ACCESS_KEY_ID"),
+            secret_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            region=s3.get("region") or "us-east-1",
+            public_base_url=s3.get("public_url") or None,
+            prefix=prefix,
+        )
+    else:
+        store = GitHubStore(
+            GitHubPublisher(
+                os.getenv("GITHUB_REPOSITORY"),
+                branch=branch or "gh-pages",
+                token=os.getenv("GITHUB_TOKEN"),
+            ),
+            prefix,
+        )
+    with _default_lock:
+        _default_store = store
+    return store
+
+
+def get_image_store():
+    with _default_lock:
+        store = _default_store
+    return store or configure_image_store()
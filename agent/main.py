@@ -1,237 +1,602 @@
 #!/usr/bin/env python3
-import os, random, time, logging
+import os, logging
+import argparse
 import threading
-from .config_loader import load_yaml_with_env
-from .db import init_db, get_conn
-from .repin_engine import repin_for_board
-from .blog_scraper import fetch_sitemap_posts, extract_post_meta
-from .generator import build_aesthetic_image, upload_image_to_github
-from .pinterest_api import save_pin_to_board
-from .utils import (
-    human_sleep_between_pins,
-    short_random_sleep,
-    clean_site_url_for_display,
-)
-
-from .globals import CONFIG, PINTEREST_ACCESS_TOKEN, REQUIRED_SCOPES
-
-logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+import time
+from urllib.parse import urlparse
+from .accounts import load_accounts, run_shards
+from .db import init_db, get_conn, run_maintenance
+from .pipeline import Pipeline, Stage
+from .retry import breaker_states, call_with_retry, policy_for, reset_breakers
+from .run_report import get_run_report, start_run_report
+from .scheduler import DeadlineExceeded
+from .utils import short_random_sleep
+
+from .globals import CONFIG_PATH, get_context, reload_config
+
+# PIL, requests, bs4 and replicate are only imported by the functions that
+# need them, so importing this module (tests, simulate, embedding) is cheap.
+
 logger = logging.getLogger("pinterest-agent")
 logger.setLevel(logging.DEBUG)
 
-BASE = os.path.dirname(__file__)
-BOARDS = load_yaml_with_env(os.path.join(BASE, "boards.yml"))["boards"]
 REPLICATE_TOKEN = os.getenv("REPLICATE_API_TOKEN")
-GITHUB_REPO = os.getenv("GITHUB_REPOSITORY")
-IMAGE_HOST_BRANCH = (
-    os.getenv("IMAGE_HOST_BRANCH") or CONFIG.get("image_host_branch") or "gh-pages"
-)
-SITE_URL = os.getenv("SITE_URL") or CONFIG.get("site")
-CLEAN_SITE_URL = clean_site_url_for_display(SITE_URL)
 repinned_results = []
 created_results = []
+# Pipelines of the runs in progress (for the daemon's status endpoint).
+_active_runs = {}
+_active_lock = threading.Lock()
+# Sitemap posts per site, reused for daemon.sitemap_ttl_minutes.
+_sitemap_cache = {}
+
+
+def safe_run_with_retries(
+    func, attempts=None, delay=None, *args, policy=None, breaker=None, **kwargs
+):
+    """
+    Calls func under the retry policy of call site `policy` (the `retry`
+    config section; attempts and delay override its attempts and
+    base_delay) and through circuit breaker `breaker`, if named. Returns
+    None once the call has failed for good.
+    """
+    report = get_run_report()
+    name = getattr(func, "__name__", str(func))
+    try:
+        return call_with_retry(
+            func,
+            *args,
+            policy=policy_for(policy, attempts=attempts, base_delay=delay),
+            breaker=breaker,
+            on_retry=lambda kind: report.count("retries"),
+            **kwargs,
+        )
+    except DeadlineExceeded:
+        # Out of time for the run; retrying cannot help.
+        raise
+    except Exception as e:
+        logger.error("%s failed for good: %s", name, e)
+        report.fail(f"{name}: {type(e).__name__}: {e}")
+        return None
 
 
-def safe_run_with_retries(func, attempts=3, delay=5, *args, **kwargs):
-    for i in range(attempts):
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            logger.warning("Attempt %s failed: %s", i + 1, e)
-            time.sleep(delay * (i + 1))
-    logger.error(
-        "All %s attempts failed for %s", attempts, getattr(func, "__name__", str(func))
-    )
-    return None
-
+def run_repins(account):
+    from .pinterest_api import save_pin_to_board
+    from .repin_engine import repin_for_board
 
-def run_repins():
-    repins_needed = CONFIG["daily_pins"]["repins"]
-    board_keys = list(BOARDS.keys())
-    selected_boards = [random.choice(board_keys) for _ in range(repins_needed)]
-    filters = CONFIG.get("filters", {})
+    repins_needed = account.daily_pins["repins"]
+    rng = account.rng("repins")
+    board_keys = list(account.boards.keys())
+    selected_boards = [rng.choice(board_keys) for _ in range(repins_needed)]
+    filters = get_context().config.get("filters", {})
+    report = get_run_report()
     all_picked = []
-    for idx, bk in enumerate(selected_boards):
-        cfg = BOARDS[bk]
-        picked = safe_run_with_retries(
-            repin_for_board,
-            attempts=3,
-            delay=3,
-            board_key=bk,
-            board_cfg=cfg,
-            quota=1,
-            filters=filters,
-            sleep_fn=lambda: short_random_sleep(2, 6),
-        )
-        if picked:
-            all_picked.extend(picked)
-        human_sleep_between_pins(
-            idx, total_pins=repins_needed + CONFIG["daily_pins"]["new_pins"]
-        )
+    for bk in selected_boards:
+        if account.scheduler.expired():
+            break
+        cfg = account.boards[bk]
+        # The save itself waits for its slot on the shared action timeline.
+        with report.stage("repin", item=bk, account=account.name):
+            try:
+                picked = safe_run_with_retries(
+                    repin_for_board,
+                    policy="repin",
+                    board_key=bk,
+                    board_cfg=cfg,
+                    quota=1,
+                    filters=filters,
+                    sleep_fn=lambda: short_random_sleep(2, 6, rng=rng),
+                    save_fn=account.scheduled(save_pin_to_board),
+                    token=account.token,
+                    rng=rng,
+                )
+            except DeadlineExceeded as e:
+                logger.info("Stopping repins for %s: %s", account.name, e)
+                report.skip("deadline")
+                break
+            if picked:
+                all_picked.extend(picked)
+            else:
+                report.skip("no new pin found")
     return all_picked
 
 
-def run_new_pins():
-    new_needed = CONFIG["daily_pins"]["new_pins"]
-    posts = fetch_sitemap_posts(SITE_URL, limit=200)
-    random.shuffle(posts)
+def publish_new_images(paths):
+    """Returns {local_path: public_url}; empty when publishing failed."""
+    if not paths:
+        return {}
+    from .image_store import get_image_store
 
-    created_new = []
+    try:
+        return get_image_store().publish(paths)
+    except Exception as e:
+        logger.warning("Image publishing failed, falling back to meta images: %s", e)
+        return {}
+
+
+def prepare_post(p, account):
+    """Pipeline stage: DB check, meta extraction, image probing, board match."""
+    from .blog_scraper import extract_post_meta
+    from .image_probe import pick_best_image
+
+    # Database Check for Existing Pin
+    # Open connection only for this quick read
+    conn_check = get_conn()
+    cur_check = conn_check.cursor()
+    cur_check.execute("SELECT 1 FROM blog_pins WHERE post_url = ?", (p,))
+    pin_exists = cur_check.fetchone()
+    conn_check.close()
+
+    report = get_run_report()
+    if pin_exists:
+        report.skip("already pinned")
+        return None
+
+    meta = safe_run_with_retries(
+        extract_post_meta,
+        policy="blog",
+        breaker=f"blog {urlparse(p).netloc}",
+        post_url=p,
+    )
+    if not meta:
+        report.skip("no post metadata")
+        return None
+
+    # Rank every image on the post by header-only probes (size, 2:3 fit)
+    # before anything is downloaded in full.
+    probe_cfg = get_context().config.get("image_probe") or {}
+    if probe_cfg.get("enabled", True) and meta.get("images"):
+        best = pick_best_image(
+            meta["images"], max_candidates=probe_cfg.get("max_candidates", 8)
+        )
+        if best:
+            meta["image"] = best["url"]
 
-    for idx, p in enumerate(posts):
+    board_key, score, how = account.board_matcher.match(
+        meta.get("title") or "", meta.get("description") or ""
+    )
+    logger.debug("Board for %s: %s (%s, score %.2f)", p, board_key, how, score)
+    if how != "keywords":
+        report.count(f"board_match.{how}")
+
+    return {
+        "post": p,
+        "meta": meta,
+        "board": account.boards[board_key],
+        "account": account,
+    }
+
+
+def render_post(item):
+    """Pipeline stage: builds the pin image (Replicate first, local fallback)."""
+    from .generator import build_aesthetic_image
+    from .pinterest_api import base64_content_type
+
+    config = get_context().config
+    meta = item["meta"]
+    title_for_image = meta.get("title")
+    if not title_for_image:
+        title_for_image = f"More on {item['account'].clean_site_url}"
+
+    # Image Generation
+    use_ai = config.get("use_ai_generation", True) and bool(REPLICATE_TOKEN)
+    # Both attempts can end in the local renderer, so both get its settings.
+    render_settings = {
+        "title_text": title_for_image,
+        "template": config.get("template"),
+        "output": config.get("output"),
+        "variants": config.get("variants"),
+    }
+    local_img = None
+    if use_ai:
+        local_img = safe_run_with_retries(
+            build_aesthetic_image,
+            policy="render",
+            background_url=meta.get("url"),
+            **render_settings,
+        )
+    if not local_img:
+        local_img = safe_run_with_retries(
+            build_aesthetic_image,
+            attempts=1,
+            policy="render",
+            background_url=meta.get("image"),
+            **render_settings,
+        )
+    if not local_img:
+        return None
+
+    item["image"] = local_img
+    # pin_media_mode "base64" sends JPEG/PNG images inline with the pin
+    # request; only the rest (e.g. WebP) still needs hosting.
+    item["direct"] = (
+        config.get("pin_media_mode", "url") == "base64"
+        and base64_content_type(local_img) is not None
+    )
+    return item
+
+
+def publish_posts(items):
+    """Pipeline stage (batched): hosts the images that need a public URL."""
+    public_urls = publish_new_images(
+        [item["image"] for item in items if not item["direct"]]
+    )
+    ready = []
+    for item in items:
+        if item["direct"]:
+            item["media"] = {"image_path": item["image"]}
+        else:
+            public_url = public_urls.get(item["image"]) or item["meta"].get("image")
+            if not public_url:
+                logger.info(
+                    "No public image available for %s, skipping", item["post"]
+                )
+                get_run_report().count("publish.no_public_image")
+                continue
+            item["media"] = {"image_url": public_url}
+        ready.append(item)
+    return ready
+
+
+def submit_pin(item):
+    """Pipeline stage: creates the pin and records it in the DB."""
+    from .pinterest_api import save_pin_to_board
+
+    p, meta, account = item["post"], item["meta"], item["account"]
+    res = safe_run_with_retries(
+        account.scheduled(save_pin_to_board),
+        policy="pin",
+        board_id=item["board"]["id"],
+        title=meta.get("title"),
+        description=meta.get("description"),
+        link=account.site_url,
+        **item["media"],
+    )
+    if not res:
+        return None
+
+    pin_id = res.get("id")
+    if not pin_id:
+        get_run_report().fail("response without pin id")
+        return None
+
+    # Database Write
+    # Open new connection only for the write/commit
+    conn_write = get_conn()
+    cur_write = conn_write.cursor()
+    cur_write.execute(
+        "INSERT OR IGNORE INTO blog_pins (post_url, pinterest_pin_id) VALUES (?, ?)",
+        (p, pin_id),
+    )
+    conn_write.commit()
+    conn_write.close()
+    return pin_id
+
+
+def sitemap_posts(site_url):
+    """Post URLs from the site's sitemap, cached in daemon mode."""
+    from .blog_scraper import fetch_sitemap_posts
+
+    daemon_cfg = get_context().config.get("daemon") or {}
+    ttl = float(daemon_cfg.get("sitemap_ttl_minutes") or 0) * 60
+    cached = _sitemap_cache.get(site_url)
+    if cached and time.monotonic() - cached[0] < ttl:
+        return list(cached[1])
+    posts = fetch_sitemap_posts(site_url, limit=200)
+    if posts:
+        _sitemap_cache[site_url] = (time.monotonic(), posts)
+    return list(posts)
+
+
+def run_new_pins(account):
+    """
+    Runs posts through a staged pipeline (meta -> render -> publish -> pin)
+    with bounded queues in between, so the next pins are already rendered
+    and hosted while the pin stage waits for its slot on the action
+    scheduler. The pipeline stops once enough pins exist or time runs out.
+    """
+    new_needed = account.daily_pins["new_pins"]
+    created_new = []
+    if new_needed <= 0:
+        return created_new
+
+    posts = sitemap_posts(account.site_url)
+    account.rng("new_pins").shuffle(posts)
+
+    cfg = get_context().config.get("pipeline") or {}
+    report = get_run_report()
+    pipeline = None
+
+    # Renders are the expensive step (Replicate predictions), so at most
+    # new_needed + lookahead of them are started; a slot is handed back
+    # whenever a rendered post fails to become a pin.
+    slots = threading.Semaphore(new_needed + int(cfg.get("lookahead", 1)))
+
+    def meta_stage(p):
+        with report.stage("meta", item=p, account=account.name):
+            return prepare_post(p, account)
+
+    def render_stage(item):
+        while not slots.acquire(timeout=0.5):
+            if pipeline.stopped:
+                return None
+        rendered = None
+        try:
+            with report.stage("render", item=item["post"], account=account.name):
+                rendered = render_post(item)
+                if rendered is None:
+                    report.fail("no image rendered")
+        finally:
+            if rendered is None:  # also when render_post raised
+                slots.release()
+        return rendered
+
+    def publish_stage(items):
+        ready = []
+        try:
+            with report.stage(
+                "publish", item=f"{len(items)} images", account=account.name
+            ):
+                ready = publish_posts(items)
+        finally:
+            for _ in range(len(items) - len(ready)):
+                slots.release()
+        return ready
+
+    def pin_stage(item):
+        pin_id = None
+        try:
+            with report.stage("pin", item=item["post"], account=account.name):
+                try:
+                    pin_id = submit_pin(item)
+                except DeadlineExceeded as e:
+                    logger.info("Stopping new pins for %s: %s", account.name, e)
+                    report.skip("deadline")
+                    pipeline.stop()
+                    return None
+        finally:
+            if not pin_id:
+                slots.release()
+        if not pin_id:
+            return None
+        created_new.append(pin_id)
         if len(created_new) >= new_needed:
-            break
+            pipeline.stop()
+        return pin_id
+
+    pipeline = Pipeline(
+        [
+            Stage.from_config(
+                "meta", meta_stage, cfg.get("meta"), workers=4, queue_size=4
+            ),
+            Stage.from_config(
+                "render", render_stage, cfg.get("render"), workers=2, queue_size=2
+            ),
+            Stage.from_config(
+                "publish", publish_stage, cfg.get("publish"), queue_size=4, batch_size=4
+            ),
+            Stage.from_config("pin", pin_stage, cfg.get("pin"), queue_size=2),
+        ]
+    )
+    with _active_lock:
+        _active_runs[account.name] = {"account": account, "pipeline": pipeline}
+    try:
+        pipeline.run(posts)
+    finally:
+        with _active_lock:
+            _active_runs.pop(account.name, None)
+    return created_new[:new_needed]
 
-        # Database Check for Existing Pin
-        # Open connection only for this quick read
-        conn_check = get_conn()
-        cur_check = conn_check.cursor()
-        cur_check.execute("SELECT 1 FROM blog_pins WHERE post_url = ?", (p,))
-        pin_exists = cur_check.fetchone()
-        conn_check.close()
 
-        if pin_exists:
-            continue
+def maintain_db():
+    try:
+        report = run_maintenance(get_context().config.get("retention"))
+        logger.info(
+            "DB maintenance: pruned %s, vacuumed=%s, size %s -> %s bytes",
+            report["pruned"],
+            report["vacuumed"],
+            report["size_before"],
+            report["size_after"],
+        )
+    except Exception as e:
+        logger.warning("DB maintenance failed: %s", e)
 
-        meta = safe_run_with_retries(extract_post_meta, attempts=2, delay=2, post_url=p)
-        if not meta:
-            continue
 
-        matched_board_key = None
-        for bk, bcfg in BOARDS.items():
-            for k in bcfg.get("keywords", []):
-                # Ensure checking against a sequence (keywords is list/tuple)
-                if k.lower() in [kw.lower() for kw in meta.get("keywords", [])]:
-                    matched_board_key = bk
-                    break
-            if matched_board_key:
-                break
-        if not matched_board_key:
-            matched_board_key = random.choice(list(BOARDS.keys()))
-        matched_board = BOARDS[matched_board_key]
-
-        title_for_image = meta.get("title")
-        if not title_for_image:
-            title_for_image = f"More on {CLEAN_SITE_URL}"
-
-        # Image Generation and Upload
-        use_ai = CONFIG.get("use_ai_generation", True) and bool(REPLICATE_TOKEN)
-        local_img = None
-        if use_ai:
-            local_img = safe_run_with_retries(
-                build_aesthetic_image,
-                attempts=2,
-                delay=5,
-                background_url=meta.get("url"),
-                title_text=title_for_image,
-            )
-        if not local_img:
-            local_img = safe_run_with_retries(
-                build_aesthetic_image,
-                attempts=1,
-                delay=1,
-                background_url=meta.get("image"),
-                title_text=title_for_image,
-            )
-        if not local_img:
-            continue
+def setup():
+    """Configures the process-wide caches, clients and image store from CONFIG."""
+    from .image_cache import configure_image_cache
+    from .image_store import configure_image_store
+    from .replicate_client import configure_generation_client
+    from .templates import configure_templates
+
+    config = get_context().config
+    branch = (
+        os.getenv("IMAGE_HOST_BRANCH") or config.get("image_host_branch") or "gh-pages"
+    )
+    configure_image_cache(config.get("image_cache"))
+    configure_templates(config.get("templates"))
+    configure_generation_client(config.get("replicate"))
+    try:
+        configure_image_store(config.get("image_store"), branch=branch)
+    except Exception as e:
+        logger.warning("Image store not configured: %s", e)
 
-        public_url = None
+
+def ready_accounts(accounts):
+    """Accounts whose token is valid (fetched or refreshed only when needed)."""
+    ready = []
+    for account in accounts:
         try:
-            public_url = upload_image_to_github(
-                local_img,
-                repo=GITHUB_REPO,
-                branch=IMAGE_HOST_BRANCH,
-                token=os.getenv("GITHUB_TOKEN"),
-            )
+            if account.fetch_token():
+                logger.info("Fetched Pinterest Access Token for %s.", account.name)
         except Exception as e:
-            logger.warning(
-                "upload_image_to_github failed, falling back to meta image: %s", e
+            logger.error(
+                "Failed to fetch/refresh Pinterest token for %s: %s. Skipping.",
+                account.name,
+                e,
             )
-            public_url = meta.get("image")
-        if not public_url:
-            logger.info("No public image available for %s, skipping", p)
             continue
+        ready.append(account)
+    return ready
+
+
+def run_day(accounts):
+    """
+    One day of repins and new pins for every account; returns
+    {account name: {"repins": n, "new_pins": n}}.
+    """
+    global repinned_results, created_results
+    report = start_run_report()
+    for account in accounts:
+        # Each account's writes share one paced timeline that ends before the
+        # job's time limit; accounts are paced independently of each other.
+        account.start()
 
-        res = safe_run_with_retries(
-            save_pin_to_board,
-            attempts=2,
-            delay=3,
-            board_id=matched_board["id"],
-            image_url=public_url,
-            title=meta.get("title"),
-            description=meta.get("description"),
-            link=SITE_URL,
+    logger.info(
+        "Starting repinning and new pin creation for %s account(s).", len(accounts)
+    )
+    runner = get_context().config.get("runner") or {}
+    try:
+        results = run_shards(
+            accounts, [run_repins, run_new_pins], workers=runner.get("workers")
+        )
+    except BaseException:
+        report.finish("failed")
+        save_run_report(report)
+        raise
+    finally:
+        for account in accounts:
+            account.close()
+
+    repinned_results, created_results = [], []
+    summary = {}
+    for account in accounts:
+        repinned = results[account.name].get("run_repins") or []
+        created = results[account.name].get("run_new_pins") or []
+        repinned_results.extend(repinned)
+        created_results.extend(created)
+        summary[account.name] = {"repins": len(repinned), "new_pins": len(created)}
+        logger.info(
+            "%s: repinned %s, new pins %s", account.name, len(repinned), len(created)
         )
-        if not res:
-            continue
-
-        pin_id = res.get("id")
-        if pin_id:
-            # Database Write
-            # Open new connection only for the write/commit
-            conn_write = get_conn()
-            cur_write = conn_write.cursor()
-            cur_write.execute(
-                "INSERT OR IGNORE INTO blog_pins (post_url, pinterest_pin_id) VALUES (?, ?)",
-                (p, pin_id),
-            )
-            conn_write.commit()
-            conn_write.close()
 
-            created_new.append(pin_id)
+    logger.info(
+        "Done. Repinned: %s New pins: %s", len(repinned_results), len(created_results)
+    )
+    report.finish(
+        "ok", repins=len(repinned_results), new_pins=len(created_results)
+    )
+    report.log_summary()
+    save_run_report(report)
+    return summary
 
-        human_sleep_between_pins(
-            idx + CONFIG["daily_pins"]["repins"],
-            total_pins=CONFIG["daily_pins"]["repins"]
-            + CONFIG["daily_pins"]["new_pins"],
-        )
 
-    return created_new
+def save_run_report(report):
+    """Stores the report in the DB and as a JSON file in run_report.dir."""
+    settings = get_context().config.get("run_report") or {}
+    try:
+        conn = get_conn()
+        try:
+            report.save(conn)
+        finally:
+            conn.close()
+        path = report.write_json(settings.get("dir") or "reports")
+        logger.info("Run report %s written to %s", report.run_id, path)
+    except Exception as e:
+        logger.warning("Saving the run report failed: %s", e)
 
 
-def run_repins_threaded():
-    global repinned_results
-    repinned_results = run_repins()
+def run_status():
+    """Queue depths of the run in progress, per account."""
+    with _active_lock:
+        active = dict(_active_runs)
+    return {
+        "breakers": breaker_states(),
+        "active": {
+            name: {
+                "pipeline": run["pipeline"].depths() if run.get("pipeline") else {},
+                "scheduled": run["account"].scheduler.pending(),
+            }
+            for name, run in active.items()
+        }
+    }
 
 
-def run_new_pins_threaded():
-    global created_results
-    created_results = run_new_pins()
+def configure_logging():
+    """Log format of the agent's CLIs; left alone when used as a library."""
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
 
 
 def main():
     logger.info("Starting Pinterest Agent")
     init_db()
+    maintain_db()
+    setup()
 
-    logger.info("Fetching Pinterest Access Token...")
     try:
-        PINTEREST_ACCESS_TOKEN.fetch(scopes=REQUIRED_SCOPES)
-        logger.info("Token fetched successfully.")
-    except Exception as e:
-        logger.error("Failed to fetch/refresh Pinterest token: %s. Exiting.", e)
+        accounts = ready_accounts(load_accounts())
+    except RuntimeError as e:  # e.g. PINTEREST_APP_ID / SECRET missing
+        logger.error("%s Exiting.", e)
         return
+    if not accounts:
+        logger.error("No Pinterest account available. Exiting.")
+        return
+    return run_day(accounts)
 
-    logger.info("Starting repinning and new pin creation in parallel threads.")
-
-    # Create thread objects
-    repin_thread = threading.Thread(target=run_repins_threaded)
-    new_pin_thread = threading.Thread(target=run_new_pins_threaded)
-
-    # Start threads
-    repin_thread.start()
-    new_pin_thread.start()
 
-    # Wait for both threads to complete
-    # This ensures main() doesn't exit until both repinning and new pin creation are done.
-    repin_thread.join()
-    new_pin_thread.join()
+def serve():
+    """
+    Daemon mode (--serve): set up once, then one run_day() per day at
+    daemon.run_at with warm caches, connection pools and tokens. Changes to
+    config.yml or a boards file are picked up before the next run.
+    """
+    from .daemon import Daemon
 
-    # Use the results captured globally
-    logger.info(
-        "Done. Repinned: %s New pins: %s", len(repinned_results), len(created_results)
-    )
+    logger.info("Starting Pinterest Agent in daemon mode")
+    init_db()
+    setup()
+    settings = get_context().config.get("daemon") or {}
+    state = {"accounts": None}
+
+    def watched():
+        files = [CONFIG_PATH]
+        for account in state["accounts"] or load_accounts():
+            if account.boards_file not in files:
+                files.append(account.boards_file)
+        return files
+
+    def reload():
+        reload_config()
+        reset_breakers()
+        setup()
+        state["accounts"] = None
+        return watched()
+
+    def run():
+        if state["accounts"] is None:
+            state["accounts"] = load_accounts()
+        accounts = ready_accounts(state["accounts"])
+        if not accounts:
+            raise RuntimeError("No Pinterest account available")
+        maintain_db()
+        return run_day(accounts)
+
+    daemon = Daemon(run, settings, watch=watched(), reload=reload, extra=run_status)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping daemon")
+        daemon.stop()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Pinterest agent")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="stay resident and run once a day (see `daemon` in config.yml)",
+    )
+    configure_logging()
+    if parser.parse_args().serve:
+        serve()
+    else:
+        main()
@@ -1,47 +1,100 @@
-import os
+import json
+import logging
 import requests
-from .globals import PINTEREST_ACCESS_TOKEN, CONFIG
-from .utils import clean_site_url_for_display
+from requests.adapters import HTTPAdapter
+from auth_api.api_common import RateLimitException, SpamException
+from .downloads import sniff_image_format
+from .globals import get_context
+from .retry import get_breaker
+from .utils import Base64FileBody, clean_site_url_for_display
+
+logger = logging.getLogger("pinterest-agent")
 
 
 API_BASE = "https://api.pinterest.com/v5"
-SITE_URL = os.getenv("SITE_URL") or CONFIG.get("site")
-CLEAN_SITE_URL = clean_site_url_for_display(SITE_URL)
+# Formats Pinterest accepts as an image_base64 media source.
+BASE64_CONTENT_TYPES = {"jpeg": "image/jpeg", "png": "image/png"}
+
+# One keep-alive connection pool for every account and thread of the process;
+# the token is per request, so sharing it between accounts is safe.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
 
-def search_boards(query, limit=5):
-    if not PINTEREST_ACCESS_TOKEN.access_token:
+def auth_headers(token=None):
+    """Request headers for token (an AccessToken; default: the global one)."""
+    token = token or get_context().access_token
+    access_token = getattr(token, "access_token", None)
+    if not access_token:
         raise RuntimeError("Pinterest Access Token not available.")
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json",
+    }
+
 
+def _refreshed_after_401(token, seen):
+    """Refreshes token once for all threads that got a 401 with `seen`."""
+    refresh = getattr(token, "refresh_if_stale", None)
+    if refresh is None:
+        return False
+    try:
+        return refresh(seen=seen)
+    except Exception as e:
+        logger.warning("Refreshing %s after a 401 failed: %s", token.name, e)
+        return False
+
+
+def _send(endpoint, method, url, token=None, **kwargs):
+    """
+    Sends a request with token's credentials through the circuit breaker of
+    endpoint for that token, so one account's outage or spam block does not
+    stop the others. A 401 is retried once if the token could be refreshed (it
+    expired or was replaced since). Error statuses raise: SpamException or
+    RateLimitException for a 429 (with the response attached, for its
+    Retry-After), HTTPError for the rest.
+    """
+    token = token or get_context().access_token
+
+    def send():
+        seen = getattr(token, "access_token", None)
+        r = SESSION.request(method, url, headers=auth_headers(token), **kwargs)
+        if r.status_code == 401 and _refreshed_after_401(token, seen):
+            r = SESSION.request(method, url, headers=auth_headers(token), **kwargs)
+        if r.status_code == 429:
+            try:
+                data = r.json()
+                detail = data.get("message_detail") or data.get("message") or ""
+            except ValueError:
+                detail = ""
+            if "spam" in detail.lower():
+                error = SpamException(detail)
+            else:
+                error = RateLimitException(detail or "HTTP 429 Too Many Requests")
+            error.response = r
+            raise error
+        r.raise_for_status()
+        return r
+
+    account = getattr(token, "name", None) or "access_token"
+    return get_breaker(f"pinterest {account} {endpoint}").call(send)
+
+
+def search_boards(query, limit=5, token=None):
     url = f"{API_BASE}/search/boards"
     params = {"query": query, "page_size": limit}
 
-    headers = {
-        "Authorization": f"Bearer {PINTEREST_ACCESS_TOKEN.access_token}",
-        "Content-Type": "application/json",
-    }
-
-    r = requests.get(url, params=params, headers=headers, timeout=30)
-    r.raise_for_status()
+    r = _send("search/boards", "GET", url, token, params=params, timeout=30)
     data = r.json()
-    print(data, url, headers, params)
+    print(data, url, params)
     return data.get("items", [])
 
 
-def list_pins_on_board(board_id, limit=50):
-    if not PINTEREST_ACCESS_TOKEN.access_token:
-        raise RuntimeError("Pinterest Access Token not available.")
-
+def list_pins_on_board(board_id, limit=50, token=None):
     url = f"{API_BASE}/boards/{board_id}/pins"
     params = {"page_size": limit, "fields": "id,link,created_at,aggregated_pin_data"}
 
-    headers = {
-        "Authorization": f"Bearer {PINTEREST_ACCESS_TOKEN.access_token}",
-        "Content-Type": "application/json",
-    }
-
-    r = requests.get(url, params=params, headers=headers, timeout=30)
-    r.raise_for_status()
+    r = _send("boards/pins", "GET", url, token, params=params, timeout=30)
     data = r.json()
     return data.get("items", [])
 
@@ -55,39 +108,78 @@ def search_pins(query, limit=25):
     )
 
 
+def base64_content_type(image_path):
+    """Content type for an image_base64 upload, or None if Pinterest won't take it."""
+    with open(image_path, "rb") as f:
+        return BASE64_CONTENT_TYPES.get(sniff_image_format(f.read(16)))
+
+
+def image_base64_body(payload, image_path):
+    """
+    Streams payload as JSON with an image_base64 media source read from
+    image_path; the base64 data is encoded chunk by chunk while sending.
+    """
+    content_type = base64_content_type(image_path)
+    if not content_type:
+        raise ValueError(f"{image_path} is not a JPEG or PNG image.")
+    head = json.dumps(payload)[:-1] + (
+        ', "media_source": {"source_type": "image_base64", '
+        f'"content_type": "{content_type}", "data": "'
+    )
+    return Base64FileBody(image_path, head.encode("utf-8"), b'"}}')
+
+
 def save_pin_to_board(
-    board_id, pin_id=None, image_url=None, title=None, description=None, link=None
+    board_id,
+    pin_id=None,
+    image_url=None,
+    title=None,
+    description=None,
+    link=None,
+    image_path=None,
+    token=None,
+    site_url=None,
 ):
-    if not PINTEREST_ACCESS_TOKEN.access_token:
-        raise RuntimeError("PINTEREST_ACCESS_TOKEN not set")
-
+    """
+    Saves an existing pin (pin_id) or creates a new one. New pins take their
+    image from image_url (Pinterest fetches it) or, with image_path, from a
+    local JPEG/PNG uploaded inline as image_base64, so no public hosting
+    is needed. token and site_url default to the single-account globals.
+    """
+    site_url = site_url or get_context().site_url
+    clean_site_url = clean_site_url_for_display(site_url)
+
+    body = None
     if pin_id:
+        endpoint = "pins/save"
         url = f"{API_BASE}/pins/{pin_id}/save"
         payload = {"board_id": board_id}
 
     else:
+        endpoint = "pins"
         url = f"{API_BASE}/pins"
 
-        if not image_url or not board_id:
-            raise ValueError("Pin creation requires image_url and board_id.")
+        if not (image_url or image_path) or not board_id:
+            raise ValueError("Pin creation requires image_url or image_path and board_id.")
 
         payload = {
             "board_id": board_id,
-            "media_source": {"source_type": "image_url", "url": image_url},
-            "title": title or CLEAN_SITE_URL,
-            "alt_text": title or CLEAN_SITE_URL + " image",
-            "description": description or "View more on " + CLEAN_SITE_URL,
-            "link": link or SITE_URL,
+            "title": title or clean_site_url,
+            "alt_text": title or clean_site_url + " image",
+            "description": description or "View more on " + clean_site_url,
+            "link": link or site_url,
         }
-
-    headers = {
-        "Authorization": f"Bearer {PINTEREST_ACCESS_TOKEN.access_token}",
-        "Content-Type": "application/json",
-    }
+        if image_path:
+            body = image_base64_body(payload, image_path)
+        else:
+            payload["media_source"] = {"source_type": "image_url", "url": image_url}
 
     print(f"URL: {url}")
     print(f"PAYLOAD: {payload}")
 
-    r = requests.post(url, json=payload, headers=headers, timeout=30)
-    r.raise_for_status()
+    if body is not None:
+        print(f"MEDIA: {image_path} ({len(body)} bytes, image_base64)")
+        r = _send(endpoint, "POST", url, token, data=body, timeout=60)
+    else:
+        r = _send(endpoint, "POST", url, token, json=payload, timeout=30)
     return r.json()
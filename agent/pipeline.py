@@ -0,0 +1,180 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger("pinterest-agent")
+
+_DONE = object()
+_POLL = 0.1  # how often blocked workers re-check the stop flag
+
+
+class Stage:
+    """
+    One step of a Pipeline. fn takes an item and returns the item to pass
+    on, or None to drop it. With batch_size > 1, fn takes a list of up to
+    batch_size items (whatever is queued when the worker wakes up) and
+    returns a list.
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=1, batch_size=1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.batch_size = max(1, int(batch_size))
+
+    @classmethod
+    def from_config(cls, name, fn, settings=None, **defaults):
+        """Builds a stage from a {workers, queue, batch} config section."""
+        settings = settings or {}
+        return cls(
+            name,
+            fn,
+            workers=settings.get("workers") or defaults.get("workers", 1),
+            queue_size=settings.get("queue") or defaults.get("queue_size", 1),
+            batch_size=settings.get("batch") or defaults.get("batch_size", 1),
+        )
+
+
+class Pipeline:
+    """
+    Runs items through stages connected by bounded queues, each stage with
+    its own worker threads. A full queue blocks the stage feeding it, so a
+    fast stage never runs more than queue_size items ahead of a slow one,
+    while I/O-bound and CPU-bound stages overlap. Exceptions drop the item
+    (logged and counted). stop() ends the run early, e.g. once the last
+    stage has produced enough.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.queues = [queue.Queue(maxsize=s.queue_size) for s in self.stages]
+        self.results = []
+        self.stats = {
+            s.name: {"in": 0, "out": 0, "errors": 0, "busy_seconds": 0.0}
+            for s in self.stages
+        }
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._alive = [s.workers for s in self.stages]
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def depths(self):
+        """Items waiting in front of each stage right now."""
+        return {s.name: q.qsize() for s, q in zip(self.stages, self.queues)}
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _emit(self, index, item):
+        if index + 1 < len(self.stages):
+            self._put(self.queues[index + 1], item)
+        else:
+            with self._lock:
+                self.results.append(item)
+
+    def _finish_worker(self, index):
+        with self._lock:
+            self._alive[index] -= 1
+            last = self._alive[index] == 0
+        if last and index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].workers):
+                self._put(self.queues[index + 1], _DONE)
+
+    def _worker(self, index):
+        stage = self.stages[index]
+        stats = self.stats[stage.name]
+        q = self.queues[index]
+        done = False
+        while not done:
+            item = self._get(q)
+            if item is _DONE:
+                break
+            batch = [item]
+            while len(batch) < stage.batch_size:
+                try:
+                    extra = q.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is _DONE:
+                    done = True
+                    break
+                batch.append(extra)
+
+            started = time.perf_counter()
+            try:
+                if stage.batch_size > 1:
+                    out = stage.fn(batch)
+                else:
+                    out = [stage.fn(batch[0])]
+            except Exception as e:
+                out = []
+                with self._lock:
+                    stats["errors"] += len(batch)
+                logger.warning("Pipeline stage %s failed: %s", stage.name, e)
+            with self._lock:
+                stats["in"] += len(batch)
+                stats["busy_seconds"] += time.perf_counter() - started
+
+            for result in out or []:
+                if result is None:
+                    continue
+                with self._lock:
+                    stats["out"] += 1
+                self._emit(index, result)
+        self._finish_worker(index)
+
+    def run(self, source):
+        """Feeds source through the stages and returns the last stage's outputs."""
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(index,),
+                    name=f"{stage.name}-{n}",
+                    daemon=True,
+                )
+                t.start()
+                threads.append(t)
+
+        for item in source:
+            if not self._put(self.queues[0], item):
+                break
+        for _ in range(self.stages[0].workers):
+            self._put(self.queues[0], _DONE)
+
+        for t in threads:
+            t.join()
+
+        for name, s in self.stats.items():
+            logger.debug(
+                "Pipeline stage %s: in=%s out=%s errors=%s busy=%.1fs",
+                name,
+                s["in"],
+                s["out"],
+                s["errors"],
+                s["busy_seconds"],
+            )
+        return self.results
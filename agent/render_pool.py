@@ -0,0 +1,114 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .generator import DEFAULT_HEADERS, TARGET_HEIGHT, TARGET_WIDTH, render_pin
+from .image_cache import get_image_cache
+from .templates import get_template
+
+logger = logging.getLogger("pinterest-agent")
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _resolve_background(source):
+    """
+    Turns a job's background into something a worker can open without network
+    access: bytes and local paths pass through, URLs are resolved to a file in
+    the image cache here in the parent.
+    """
+    if not source or isinstance(source, (bytes, bytearray)):
+        return source
+    if source.startswith(("http://", "https://")):
+        try:
+            return str(get_image_cache().fetch(source, headers=DEFAULT_HEADERS))
+        except Exception as e:
+            logger.warning("Background download failed for %s: %s", source, e)
+            return None
+    return source
+
+
+def render_job(job):
+    """
+    Worker entry point. A job is a plain dict:
+        {"id": ..., "background": bytes | path | None, "title": str,
+         "template": dict, "output": {"width": int, "height": int, "path": str,
+                                      ...image_ops.DEFAULT_OUTPUT keys}}
+    Returns a dict with the encoded image bytes (never PIL objects, so the
+    result pickles cheaply back to the parent).
+    """
+    output = job.get("output") or {}
+    started = time.perf_counter()
+    data, info = render_pin(
+        background=job.get("background"),
+        title_text=job.get("title") or "",
+        width=output.get("width", TARGET_WIDTH),
+        height=output.get("height", TARGET_HEIGHT),
+        template=job.get("template"),
+        output=output,
+    )
+    return dict(
+        info,
+        id=job.get("id"),
+        data=data,
+        render_seconds=time.perf_counter() - started,
+    )
+
+
+def _finish(job, result):
+    path = (job.get("output") or {}).get("path")
+    if path:
+        with open(path, "wb") as f:
+            f.write(result["data"])
+        result["path"] = path
+    return result
+
+
+def render_batch(jobs, max_workers=None):
+    """
+    Renders many jobs across a process pool and yields each result as soon
+    as it finishes (completion order, not submission order). Jobs whose
+    output spec has a "path" are also written to disk. A failed job yields
+    a result with "error" set instead of raising.
+    """
+    # Template names are resolved here: spawned workers only know the
+    # built-in templates, not the ones registered from config.yml.
+    jobs = [
+        dict(
+            job,
+            background=_resolve_background(job.get("background")),
+            template=get_template(job.get("template")),
+        )
+        for job in jobs
+    ]
+    if not jobs:
+        return
+
+    workers = min(max_workers or available_cpus(), len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            try:
+                yield _finish(job, render_job(job))
+            except Exception as e:
+                yield {"id": job.get("id"), "error": str(e)}
+        return
+
+    # spawn instead of fork: the agent runs threads, and forking a threaded
+    # process can deadlock on locks held by the other threads.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(render_job, job): job for job in jobs}
+        for fut in as_completed(futures):
+            job = futures[fut]
+            try:
+                yield _finish(job, fut.result())
+            except Exception as e:
+                logger.warning("Render job %s failed: %s", job.get("id"), e)
+                yield {"id": job.get("id"), "error": str(e)}
@@ -1,7 +1,10 @@
-import random, time
+import random
 import logging
 from .pinterest_api import search_boards, list_pins_on_board, save_pin_to_board
+from . import clock
 from .db import get_conn
+from .retry import CircuitOpenError
+from .scheduler import DeadlineExceeded
 
 logger = logging.getLogger("pinterest-agent")
 logger.setLevel(logging.DEBUG)
@@ -35,7 +38,22 @@ def pick_quality_pins(items, min_saves=0):
     return out
 
 
-def repin_for_board(board_key, board_cfg, quota, filters, sleep_fn):
+def repin_for_board(
+    board_key,
+    board_cfg,
+    quota,
+    filters,
+    sleep_fn,
+    save_fn=save_pin_to_board,
+    token=None,
+    rng=random,
+):
+    """
+    Repins up to quota pins onto the board. save_fn performs the actual
+    Pinterest save (e.g. a scheduled wrapper around save_pin_to_board);
+    token is the account's AccessToken for the searches (default: global);
+    rng picks the keywords and shuffles the candidates.
+    """
     keywords = board_cfg.get("keywords", [])
     picked = []
     conn = get_conn()
@@ -45,18 +63,21 @@ def repin_for_board(board_key, board_cfg, quota, filters, sleep_fn):
     while len(picked) < quota and attempts < quota * 10:
         attempts += 1
 
-        q = random.choice(keywords)
+        q = rng.choice(keywords)
         logger.info("Attempt %s: Searching boards for keyword: %s", attempts, q)
 
         # Search for relevant SOURCE boards
         try:
-            source_boards = search_boards(q, limit=5)
+            source_boards = search_boards(q, limit=5, token=token)
+        except CircuitOpenError:
+            conn.close()
+            raise
         except Exception as e:
             logger.warning("search_boards failed: %s", e)
-            time.sleep(2)
+            clock.sleep(2)
             continue
 
-        random.shuffle(source_boards)
+        rng.shuffle(source_boards)
 
         # Iterate through found boards to find unsearched one
         source_board_id = None
@@ -88,7 +109,7 @@ def repin_for_board(board_key, board_cfg, quota, filters, sleep_fn):
                 source_board_name,
                 source_board_id,
             )
-            items = list_pins_on_board(source_board_id, limit=50)
+            items = list_pins_on_board(source_board_id, limit=50, token=token)
 
             cur.execute(
                 "INSERT OR IGNORE INTO searched_boards (source_board_id) VALUES (?)",
@@ -96,14 +117,17 @@ def repin_for_board(board_key, board_cfg, quota, filters, sleep_fn):
             )
             conn.commit()
 
+        except CircuitOpenError:
+            conn.close()
+            raise
         except Exception as e:
             logger.warning("list_pins_on_board failed for %s: %s", source_board_id, e)
-            time.sleep(2)
+            clock.sleep(2)
             continue
 
         # Filter pins by quality and shuffle for randomness
         candidates = pick_quality_pins(items, min_saves=filters.get("min_saves", 5))
-        random.shuffle(candidates)
+        rng.shuffle(candidates)
 
         # Filter out already pinned items and Idea Pins
         filtered_candidates = []
@@ -132,7 +156,7 @@ def repin_for_board(board_key, board_cfg, quota, filters, sleep_fn):
             pin_id = c.get("id")
 
             try:
-                save_pin_to_board(board_cfg["id"], pin_id=pin_id)
+                save_fn(board_cfg["id"], pin_id=pin_id)
 
                 cur.execute(
                     "INSERT OR IGNORE INTO pinned (pinterest_pin_id, board_key, source_url) VALUES (?, ?, ?)",
@@ -153,9 +177,13 @@ def repin_for_board(board_key, board_cfg, quota, filters, sleep_fn):
                 sleep_fn()
                 break
 
+            except (DeadlineExceeded, CircuitOpenError):
+                # Out of time, or Pinterest is failing: stop rather than retry.
+                conn.close()
+                raise
             except Exception as e:
                 logger.warning("Failed saving pin %s: %s", pin_id, e)
-                time.sleep(2)
+                clock.sleep(2)
                 continue
 
     conn.close()
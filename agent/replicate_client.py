@@ -0,0 +1,326 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from .downloads import download
+from .run_report import get_run_report
+
+logger = logging.getLogger("pinterest-agent")
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "generations"
+DEFAULT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MODEL_TTL = 3600
+TERMINAL_STATUSES = ("succeeded", "failed", "canceled")
+
+
+class ReplicateBackend:
+    """Runs predictions on replicate.com."""
+
+    name = "replicate"
+
+    def model_available(self, model_name):
+        import replicate
+        from replicate.exceptions import ReplicateError
+
+        try:
+            replicate.models.get(model_name)
+            return True
+        except ReplicateError as e:
+            if getattr(e, "status", None) == 404:
+                return False
+            raise
+
+    def submit(self, model_name, inputs):
+        import replicate
+
+        return replicate.predictions.create(model=model_name, input=inputs)
+
+    def poll(self, handle):
+        """Refreshes a prediction and returns (status, output, error)."""
+        handle.reload()
+        return handle.status, handle.output, handle.error
+
+    def cancel(self, handle):
+        handle.cancel()
+
+    def fetch_output(self, output, dest):
+        download(output, dest, timeout=60)
+
+
+class LocalBackend:
+    """
+    Offline stand-in for benchmarking and tests: every prediction "runs" for
+    `latency` seconds and produces a deterministic gradient image derived from
+    the prompt, without any network access.
+    """
+
+    name = "local"
+
+    def __init__(self, latency=2.0, size=(1000, 1500)):
+        self.latency = latency
+        self.size = size
+        self.submitted = 0
+        self.canceled = 0
+
+    def model_available(self, model_name):
+        return True
+
+    def submit(self, model_name, inputs):
+        self.submitted += 1
+        digest = hashlib.sha256(
+            json.dumps([model_name, inputs], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return {"ready_at": time.monotonic() + self.latency, "digest": digest}
+
+    def poll(self, handle):
+        if time.monotonic() < handle["ready_at"]:
+            return "processing", None, None
+        return "succeeded", [f"local://{handle['digest']}"], None
+
+    def cancel(self, handle):
+        self.canceled += 1
+
+    def fetch_output(self, output, dest):
+        from PIL import Image
+
+        digest = output[len("local://") :]
+        top = tuple(int(digest[i : i + 2], 16) for i in (0, 2, 4))
+        bottom = tuple(int(digest[i : i + 2], 16) for i in (6, 8, 10))
+        img = Image.linear_gradient("L").resize(self.size)
+        Image.composite(
+            Image.new("RGB", self.size, bottom), Image.new("RGB", self.size, top), img
+        ).save(dest, format="JPEG", quality=85)
+
+
+def prediction_key(model_name, prompt, params=None):
+    """Cache key for a generation: hash of (model, prompt, params)."""
+    blob = json.dumps(
+        {"model": model_name, "prompt": prompt, "params": params or {}}, sort_keys=True
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class GenerationClient:
+    """
+    Image generation with:
+      - model availability cached for model_ttl seconds,
+      - predictions submitted asynchronously and polled from a small thread
+        pool, so several run concurrently,
+      - results cached on disk by prediction_key (least recently used
+        outputs evicted past max_cache_bytes), and in-flight predictions
+        shared, so a retry or re-render reuses the existing output,
+      - predictions that time out canceled, so they stop costing money.
+    Call close() when replacing a client.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        cache_dir=DEFAULT_CACHE_DIR,
+        model_ttl=DEFAULT_MODEL_TTL,
+        max_concurrency=4,
+        poll_interval=1.0,
+        timeout=300,
+        max_cache_bytes=DEFAULT_CACHE_MAX_BYTES,
+    ):
+        self.backend = backend or ReplicateBackend()
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_cache_bytes = max_cache_bytes
+        self.model_ttl = model_ttl
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="replicate"
+        )
+        self._lock = threading.Lock()
+        self._models = {}  # model_name -> (available, checked_at)
+        self._inflight = {}  # key -> Future
+        self._outputs = {}  # key -> backend output, kept if the download fails
+        self._evict_lock = threading.Lock()
+
+    def close(self):
+        """Stops taking predictions; running ones finish in the background."""
+        self._executor.shutdown(wait=False)
+
+    def model_available(self, model_name):
+        with self._lock:
+            cached = self._models.get(model_name)
+        if cached and time.monotonic() - cached[1] < self.model_ttl:
+            return cached[0]
+        available = self.backend.model_available(model_name)
+        with self._lock:
+            self._models[model_name] = (available, time.monotonic())
+        return available
+
+    def cached_path(self, key):
+        path = self.cache_dir / f"{key}.img"
+        try:
+            os.utime(path, None)  # most recently used
+        except OSError:
+            return None
+        return path
+
+    def evict(self, keep=None):
+        """Deletes least recently used outputs until the cache fits max_cache_bytes."""
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*.img"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+            removed = 0
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_cache_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            if removed:
+                logger.debug("Generation cache evicted %s outputs", removed)
+            return removed
+
+    def submit(self, prompt, model_name, params=None, outfile=None):
+        """Starts (or reuses) a generation and returns a Future of the output path."""
+        key = prediction_key(model_name, prompt, params)
+        cached = self.cached_path(key)
+        if cached:
+            logger.debug("Generation cache hit for %s", key[:12])
+            get_run_report().count("generation_cache.hit")
+            fut = Future()
+            fut.set_result(self._deliver(cached, outfile))
+            return fut
+
+        with self._lock:
+            inner = self._inflight.get(key)
+            if inner is None:
+                get_run_report().count("generation_cache.miss")
+                inner = self._executor.submit(self._run, key, model_name, prompt, params)
+                self._inflight[key] = inner
+                inner.add_done_callback(lambda _f, k=key: self._forget(k))
+
+        outer = Future()
+
+        def _chain(f):
+            try:
+                outer.set_result(self._deliver(f.result(), outfile))
+            except Exception as e:
+                outer.set_exception(e)
+
+        inner.add_done_callback(_chain)
+        return outer
+
+    def generate(self, prompt, model_name, params=None, outfile=None):
+        return self.submit(prompt, model_name, params=params, outfile=outfile).result()
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _deliver(self, path, outfile):
+        if not outfile:
+            return str(path)
+        shutil.copyfile(path, outfile)
+        return outfile
+
+    def _run(self, key, model_name, prompt, params):
+        output = self._outputs.get(key)
+        if output is None:
+            if not self.model_available(model_name):
+                raise RuntimeError(
+                    f"[Replicate ERROR] Model '{model_name}' not available for this token."
+                )
+            inputs = dict(params or {})
+            inputs["prompt"] = prompt
+            print(f"[Replicate] Using model '{model_name}' to generate image...")
+            handle = self.backend.submit(model_name, inputs)
+
+            deadline = time.monotonic() + self.timeout
+            while True:
+                status, output, error = self.backend.poll(handle)
+                if status in TERMINAL_STATUSES:
+                    break
+                if time.monotonic() > deadline:
+                    try:
+                        self.backend.cancel(handle)
+                    except Exception as e:
+                        logger.warning("Could not cancel timed-out prediction: %s", e)
+                    raise RuntimeError(
+                        f"[Replicate ERROR] Prediction timed out after {self.timeout}s"
+                    )
+                time.sleep(self.poll_interval)
+
+            if status != "succeeded":
+                raise RuntimeError(f"[Replicate ERROR] Prediction {status}: {error}")
+            if isinstance(output, list) and len(output) > 0:
+                output = output[0]
+            if not isinstance(output, str):
+                raise RuntimeError(
+                    f"[Replicate ERROR] Unexpected output from model: {output}"
+                )
+            self._outputs[key] = output
+
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir)
+        os.close(fd)
+        try:
+            self.backend.fetch_output(output, tmp)
+            path = self.cache_dir / f"{key}.img"
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        self._outputs.pop(key, None)
+        self.evict(keep=path)
+        return path
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def configure_generation_client(settings=None):
+    """Builds the process-wide client from the `replicate` config section."""
+    global _default_client
+    settings = settings or {}
+    backend_name = os.getenv("REPLICATE_BACKEND") or settings.get("backend") or "replicate"
+    if backend_name == "local":
+        backend = LocalBackend(latency=float(settings.get("local_latency") or 2.0))
+    else:
+        backend = ReplicateBackend()
+    client = GenerationClient(
+        backend=backend,
+        cache_dir=settings.get("cache_dir") or DEFAULT_CACHE_DIR,
+        model_ttl=float(settings.get("model_ttl_minutes") or 60) * 60,
+        max_concurrency=int(settings.get("max_concurrency") or 4),
+        poll_interval=float(settings.get("poll_interval") or 1.0),
+        timeout=float(settings.get("timeout") or 300),
+        max_cache_bytes=int(float(settings.get("max_cache_mb") or 0) * 1024 * 1024)
+        or DEFAULT_CACHE_MAX_BYTES,
+    )
+    with _default_lock:
+        old, _default_client = _default_client, client
+    if old is not None:
+        old.close()
+    return client
+
+
+def get_generation_client():
+    with _default_lock:
+        client = _default_client
+    return client or configure_generation_client()
@@ -0,0 +1,335 @@
+"""
+Retry policies and circuit breakers.
+
+Errors are classified before anything is retried: timeouts, connection
+resets, 408 and 5xx are transient and back off exponentially (with
+jitter, up to max_delay); rate limits wait at least as long as the
+server's Retry-After; permanent 4xx errors and spam blocks are never
+retried. Each call site picks a policy from the `retry` config section.
+
+A circuit breaker per endpoint counts transient failures in a row. Once
+it opens, calls fail fast with CircuitOpenError instead of burning the
+run's time budget on a downed dependency; after reset_seconds one probe
+call is let through, and its outcome closes or re-opens the circuit.
+"""
+import email.utils
+import logging
+import random
+import sys
+import threading
+
+from auth_api.api_common import RateLimitException, SpamException
+
+from . import clock
+from .scheduler import DeadlineExceeded
+
+logger = logging.getLogger("pinterest-agent")
+
+TRANSIENT = "transient"
+RATE_LIMIT = "rate_limit"
+PERMANENT = "permanent"
+SPAM = "spam"
+UNKNOWN = "unknown"
+ABORT = "abort"  # out of time or circuit open: stop, don't retry
+
+DEFAULT_POLICY = {
+    "attempts": 3,
+    "base_delay": 2.0,
+    "max_delay": 60.0,
+    "multiplier": 2.0,
+    "max_retry_after": 300.0,
+    "retry_unknown": True,
+}
+DEFAULT_BREAKER = {
+    "failure_threshold": 5,
+    "reset_seconds": 300.0,
+    "spam_reset_seconds": 3600.0,
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"circuit {name} is open (next probe in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def retry_after_seconds(response):
+    """Seconds the response's Retry-After header asks for, or None."""
+    headers = getattr(response, "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - clock.now())
+
+
+def classify(exc):
+    """(kind, retry_after seconds or None) for an exception raised by a call."""
+    if isinstance(exc, (DeadlineExceeded, CircuitOpenError)):
+        return ABORT, None
+    response = getattr(exc, "response", None)
+    if isinstance(exc, SpamException):
+        return SPAM, None
+    if isinstance(exc, RateLimitException):
+        return RATE_LIMIT, retry_after_seconds(response)
+
+    status = getattr(response, "status_code", None)
+    if isinstance(status, int):
+        if status == 429:
+            if "spam" in (getattr(response, "text", "") or "").lower():
+                return SPAM, None
+            return RATE_LIMIT, retry_after_seconds(response)
+        if status in (408, 425) or status >= 500:
+            return TRANSIENT, retry_after_seconds(response)
+        if 400 <= status < 500:
+            return PERMANENT, None
+
+    # socket.timeout and ConnectionResetError are subclasses of these.
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return TRANSIENT, None
+    # Only a loaded requests can have raised a requests exception.
+    requests = sys.modules.get("requests")
+    if requests is not None and isinstance(
+        exc,
+        (
+            requests.exceptions.Timeout,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+        ),
+    ):
+        return TRANSIENT, None
+    return UNKNOWN, None
+
+
+class RetryPolicy:
+    """How often and how long to retry each kind of error."""
+
+    def __init__(
+        self,
+        attempts=3,
+        base_delay=2.0,
+        max_delay=60.0,
+        multiplier=2.0,
+        max_retry_after=300.0,
+        retry_unknown=True,
+        rng=None,
+    ):
+        self.attempts = max(1, int(attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.multiplier = float(multiplier)
+        self.max_retry_after = float(max_retry_after)
+        self.retry_unknown = bool(retry_unknown)
+        self.rng = rng or random
+
+    def should_retry(self, kind, attempt, retry_after=None):
+        """Whether to try again after `attempt` failed attempts ending in `kind`."""
+        if attempt >= self.attempts:
+            return False
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return False
+        if kind in (TRANSIENT, RATE_LIMIT):
+            return True
+        return kind == UNKNOWN and self.retry_unknown
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait after `attempt` failed attempts: exponential, capped
+        at max_delay, jittered over its upper half so concurrent callers
+        spread out, and never shorter than the server's Retry-After.
+        """
+        ceiling = min(
+            self.max_delay, self.base_delay * self.multiplier ** (attempt - 1)
+        )
+        wait = ceiling / 2 + self.rng.uniform(0, ceiling / 2)
+        if retry_after is not None:
+            wait = max(wait, retry_after)
+        return wait
+
+
+def policy_for(site=None, config=None, **overrides):
+    """
+    The policy of call site `site`: retry.default updated with
+    retry.sites[site], then with overrides that are not None.
+    """
+    if config is None:
+        from .globals import get_context
+
+        config = get_context().config
+    section = config.get("retry") or {}
+    settings = dict(DEFAULT_POLICY)
+    settings.update(section.get("default") or {})
+    if site:
+        settings.update((section.get("sites") or {}).get(site) or {})
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    return RetryPolicy(**settings)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold transient failures in a row (or
+    one spam block) -> half open after reset_seconds, when a single probe
+    call is allowed through -> closed again if it gets an answer.
+    """
+
+    def __init__(
+        self, name, failure_threshold=5, reset_seconds=300.0, spam_reset_seconds=3600.0
+    ):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = float(reset_seconds)
+        self.spam_reset_seconds = float(spam_reset_seconds)
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = None
+        self._open_for = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raises CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open":
+                waited = clock.monotonic() - self._opened_at
+                if waited < self._open_for:
+                    raise CircuitOpenError(self.name, self._open_for - waited)
+                self.state = "half_open"
+                self._probing = False
+            if self._probing:
+                raise CircuitOpenError(self.name, 0)
+            self._probing = True
+            logger.info("Circuit %s half open, probing", self.name)
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Circuit %s closed", self.name)
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self, kind):
+        if kind == SPAM:
+            self._open(self.spam_reset_seconds, "spam block")
+        elif kind in (TRANSIENT, RATE_LIMIT):
+            with self._lock:
+                self.failures += 1
+                trip = (
+                    self.state == "half_open"
+                    or self.failures >= self.failure_threshold
+                )
+            if trip:
+                self._open(self.reset_seconds, f"{self.failures} {kind} failures")
+        else:
+            # The endpoint answered (e.g. a 404); it is up.
+            self.record_success()
+
+    def _open(self, seconds, reason):
+        with self._lock:
+            self.state = "open"
+            self._opened_at = clock.monotonic()
+            self._open_for = seconds
+            self._probing = False
+        logger.warning("Circuit %s open for %.0fs after %s", self.name, seconds, reason)
+
+    def call(self, fn, *args, **kwargs):
+        self.allow()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(classify(e)[0])
+            raise
+        self.record_success()
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """The process-wide breaker of endpoint `name`, configured by retry.breaker."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            from .globals import get_context
+
+            settings = dict(DEFAULT_BREAKER)
+            retry = get_context().config.get("retry") or {}
+            settings.update(retry.get("breaker") or {})
+            breaker = _breakers[name] = CircuitBreaker(name, **settings)
+        return breaker
+
+
+def breaker_states():
+    """{endpoint: state} of every breaker that is not closed."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.state for b in breakers if b.state != "closed"}
+
+
+def reset_breakers():
+    """Forgets all breakers (after a config reload, or between tests)."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def call_with_retry(fn, *args, policy=None, breaker=None, on_retry=None, **kwargs):
+    """
+    Calls fn(*args, **kwargs) under policy (default: policy_for()),
+    through the named circuit breaker if one is given. on_retry(kind) is
+    called before every retry. The last error is raised when retries are
+    exhausted or the error is not worth retrying.
+    """
+    policy = policy or policy_for()
+    name = getattr(fn, "__name__", str(fn))
+    if breaker is None:
+        call = fn
+    else:
+
+        def call(*a, **kw):
+            return get_breaker(breaker).call(fn, *a, **kw)
+
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return call(*args, **kwargs)
+        except Exception as e:
+            kind, retry_after = classify(e)
+            if not policy.should_retry(kind, attempt, retry_after):
+                if kind != ABORT:
+                    logger.warning(
+                        "%s failed (%s, attempt %s of %s), giving up: %s",
+                        name,
+                        kind,
+                        attempt,
+                        policy.attempts,
+                        e,
+                    )
+                raise
+            wait = policy.delay(attempt, retry_after)
+            logger.warning(
+                "%s failed (%s, attempt %s of %s), retrying in %.1fs: %s",
+                name,
+                kind,
+                attempt,
+                policy.attempts,
+                wait,
+                e,
+            )
+            if on_retry:
+                on_retry(kind)
+            clock.sleep(wait)
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Per-run report of what the agent did and what it cost: every stage of every
+item with its wall and CPU time, retries, cache hits and the reason it was
+skipped or failed. Reports are stored in the runs / run_events tables and
+as one JSON file per run; this module's CLI compares recent runs:
+
+    python -m agent.run_report            # last runs, per-stage timings
+    python -m agent.run_report --run ID   # one run in detail
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import secrets
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from . import clock
+
+logger = logging.getLogger("pinterest-agent")
+
+# A stage this much slower per item than its median over earlier runs is
+# flagged, unless the difference is below the noise floor.
+REGRESSION_FACTOR = 1.5
+REGRESSION_MIN_SECONDS = 0.1
+
+
+class RunReport:
+    """
+    Collects events for one run. stage() times a block and records its
+    outcome; code running inside it can call skip(), fail() and count() to
+    annotate the current event (tracked per thread, so pipeline workers
+    each annotate their own; outside a stage they do nothing). The first
+    skip or failure reason of an event sticks. Counters also add up for
+    the whole run.
+    """
+
+    def __init__(self, run_id=None):
+        now = clock.now()
+        stamp = datetime.fromtimestamp(now, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.run_id = run_id or f"{stamp}-{secrets.token_hex(2)}"
+        self.started_at = now
+        self.finished_at = None
+        self.status = "running"
+        self.totals = {}
+        self.events = []
+        self.counters = Counter()
+        self._perf = time.perf_counter()
+        self._cpu = time.process_time()
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextlib.contextmanager
+    def stage(self, name, item=None, account=None):
+        """Times the block as one event; an exception marks it failed."""
+        event = {
+            "stage": name,
+            "item": None if item is None else str(item),
+            "account": account,
+            "started_at": clock.now(),
+            "outcome": "ok",
+            "reason": None,
+            "counters": {},
+        }
+        stack = self._stack()
+        stack.append(event)
+        perf, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield event
+        except Exception as e:
+            event["outcome"] = "fail"
+            event["reason"] = event["reason"] or f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            event["wall_seconds"] = round(time.perf_counter() - perf, 6)
+            event["cpu_seconds"] = round(time.thread_time() - cpu, 6)
+            stack.pop()
+            with self._lock:
+                self.events.append(event)
+
+    def skip(self, reason):
+        self._mark("skip", reason)
+
+    def fail(self, reason):
+        self._mark("fail", reason)
+
+    def _mark(self, outcome, reason):
+        # The first reason recorded is the most specific one; keep it.
+        event = self.current()
+        if event is not None and event["outcome"] == "ok":
+            event["outcome"] = outcome
+            event["reason"] = reason
+
+    def count(self, name, n=1):
+        """Adds to a run-wide counter and to the current event's counters."""
+        with self._lock:
+            self.counters[name] += n
+        event = self.current()
+        if event is not None:
+            event["counters"][name] = event["counters"].get(name, 0) + n
+
+    def finish(self, status="ok", **totals):
+        self.finished_at = clock.now()
+        self.wall_seconds = round(time.perf_counter() - self._perf, 3)
+        self.cpu_seconds = round(time.process_time() - self._cpu, 3)
+        self.status = status
+        self.totals.update(totals)
+        return self
+
+    def stage_summary(self):
+        """{stage: {count, ok, skip, fail, wall_seconds, cpu_seconds, reasons}}."""
+        with self._lock:
+            events = list(self.events)
+        return summarize_events(events)
+
+    def to_dict(self):
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "status": self.status,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "totals": self.totals,
+            "counters": counters,
+            "stages": summarize_events(events),
+            "events": events,
+        }
+
+    def write_json(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"run_{self.run_id}.json")
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
+
+    def save(self, conn):
+        """Writes the run and its events to the runs / run_events tables."""
+        data = self.to_dict()
+        conn.execute(
+            "INSERT OR REPLACE INTO runs (run_id, started_at, finished_at, status,"
+            " wall_seconds, cpu_seconds, totals, counters, stages)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.run_id,
+                self.started_at,
+                self.finished_at,
+                self.status,
+                self.wall_seconds,
+                self.cpu_seconds,
+                json.dumps(data["totals"]),
+                json.dumps(data["counters"]),
+                json.dumps(data["stages"]),
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO run_events (run_id, stage, item, account, started_at,"
+            " wall_seconds, cpu_seconds, outcome, reason, counters)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    self.run_id,
+                    e["stage"],
+                    e["item"],
+                    e["account"],
+                    e["started_at"],
+                    e["wall_seconds"],
+                    e["cpu_seconds"],
+                    e["outcome"],
+                    e["reason"],
+                    json.dumps(e["counters"]) if e["counters"] else None,
+                )
+                for e in data["events"]
+            ],
+        )
+        conn.commit()
+
+    def log_summary(self):
+        for name, s in self.stage_summary().items():
+            logger.info(
+                "Stage %-8s %3s items: ok=%s skip=%s fail=%s wall=%.1fs cpu=%.1fs",
+                name,
+                s["count"],
+                s["ok"],
+                s["skip"],
+                s["fail"],
+                s["wall_seconds"],
+                s["cpu_seconds"],
+            )
+            for reason, n in s["reasons"].items():
+                logger.info("  %sx %s", n, reason)
+        if self.counters:
+            logger.info(
+                "Counters: %s",
+                ", ".join(f"{k}={v}" for k, v in sorted(self.counters.items())),
+            )
+
+
+def summarize_events(events):
+    stages = {}
+    for e in events:
+        s = stages.setdefault(
+            e["stage"],
+            {
+                "count": 0,
+                "ok": 0,
+                "skip": 0,
+                "fail": 0,
+                "wall_seconds": 0.0,
+                "cpu_seconds": 0.0,
+                "reasons": Counter(),
+            },
+        )
+        s["count"] += 1
+        s[e["outcome"]] += 1
+        s["wall_seconds"] += e["wall_seconds"] or 0.0
+        s["cpu_seconds"] += e["cpu_seconds"] or 0.0
+        if e["reason"]:
+            s["reasons"][e["reason"]] += 1
+    for s in stages.values():
+        s["wall_seconds"] = round(s["wall_seconds"], 3)
+        s["cpu_seconds"] = round(s["cpu_seconds"], 3)
+        s["reasons"] = dict(s["reasons"].most_common(5))
+    return stages
+
+
+_current_report = None
+_current_lock = threading.Lock()
+
+
+def start_run_report(run_id=None):
+    """Starts the process-wide report for a new run."""
+    global _current_report
+    report = RunReport(run_id)
+    with _current_lock:
+        _current_report = report
+    return report
+
+
+def get_run_report():
+    global _current_report
+    with _current_lock:
+        if _current_report is None:
+            _current_report = RunReport()
+        return _current_report
+
+
+def load_runs(conn, limit=10):
+    """The last `limit` runs, oldest first, with per-stage mean wall seconds."""
+    runs = [
+        dict(r)
+        for r in conn.execute(
+            "SELECT * FROM runs ORDER BY started_at DESC, rowid DESC LIMIT ?", (limit,)
+        )
+    ]
+    runs.reverse()
+    for run in runs:
+        for key in ("totals", "counters", "stages"):
+            run[key] = json.loads(run[key] or "{}")
+        run["stage_means"] = {}
+        for row in conn.execute(
+            "SELECT stage, AVG(wall_seconds) AS mean, COUNT(*) AS n,"
+            " SUM(outcome = 'fail') AS failed, SUM(outcome = 'skip') AS skipped"
+            " FROM run_events WHERE run_id = ? GROUP BY stage",
+            (run["run_id"],),
+        ):
+            run["stage_means"][row["stage"]] = dict(row)
+    return runs
+
+
+def find_regressions(runs):
+    """(stage, mean, median of earlier runs) where the last run got slower."""
+    if len(runs) < 2:
+        return []
+    last, earlier = runs[-1], runs[:-1]
+    out = []
+    for stage, row in last["stage_means"].items():
+        history = [
+            r["stage_means"][stage]["mean"]
+            for r in earlier
+            if stage in r["stage_means"] and r["stage_means"][stage]["mean"]
+        ]
+        if not history or not row["mean"]:
+            continue
+        median = statistics.median(history)
+        slower = row["mean"] - median
+        if row["mean"] > median * REGRESSION_FACTOR and slower > REGRESSION_MIN_SECONDS:
+            out.append((stage, row["mean"], median))
+    return out
+
+
+def _format_time(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def print_runs(runs):
+    stages = sorted({s for r in runs for s in r["stage_means"]})
+    header = f"{'run':<24} {'started (UTC)':<16} {'status':<7} {'wall':>8} {'cpu':>7}"
+    header += f" {'repins':>6} {'new':>4} {'fail':>4}"
+    header += "".join(f" {s[:8]:>8}" for s in stages)
+    print(header)
+    for r in runs:
+        failed = sum(row["failed"] or 0 for row in r["stage_means"].values())
+        line = (
+            f"{r['run_id']:<24} {_format_time(r['started_at']):<16} "
+            f"{r['status']:<7} {r['wall_seconds'] or 0:>7.1f}s "
+            f"{r['cpu_seconds'] or 0:>6.1f}s "
+            f"{r['totals'].get('repins', 0):>6} {r['totals'].get('new_pins', 0):>4} "
+            f"{failed:>4}"
+        )
+        for s in stages:
+            row = r["stage_means"].get(s)
+            line += f" {row['mean']:>7.2f}s" if row else f" {'-':>8}"
+        print(line)
+    print("(stage columns: mean wall seconds per item)")
+    for stage, mean, median in find_regressions(runs):
+        print(
+            f"REGRESSION: {stage} took {mean:.2f}s per item, "
+            f"median of earlier runs {median:.2f}s"
+        )
+
+
+def print_run(conn, run_id):
+    row = conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    if row is None:
+        print(f"No run {run_id}")
+        return
+    print(
+        f"Run {run_id} ({row['status']}), {row['wall_seconds']}s wall, "
+        f"{row['cpu_seconds']}s CPU, totals {row['totals']}"
+    )
+    events = [
+        dict(e)
+        for e in conn.execute(
+            "SELECT * FROM run_events WHERE run_id = ? ORDER BY started_at", (run_id,)
+        )
+    ]
+    for name, s in summarize_events(events).items():
+        print(
+            f"  {name:<8} {s['count']:>4} items  ok={s['ok']} skip={s['skip']} "
+            f"fail={s['fail']}  wall={s['wall_seconds']}s cpu={s['cpu_seconds']}s"
+        )
+        for reason, n in s["reasons"].items():
+            print(f"      {n}x {reason}")
+    counters = json.loads(row["counters"] or "{}")
+    if counters:
+        pairs = ", ".join(f"{k}={v}" for k, v in sorted(counters.items()))
+        print(f"  counters: {pairs}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare recent agent runs.")
+    parser.add_argument("--last", type=int, default=10, help="runs to show")
+    parser.add_argument("--run", help="show one run in detail")
+    args = parser.parse_args(argv)
+
+    from .db import get_conn, init_db
+
+    init_db()
+    conn = get_conn()
+    try:
+        if args.run:
+            print_run(conn, args.run)
+        else:
+            print_runs(load_runs(conn, args.last))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
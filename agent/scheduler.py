@@ -0,0 +1,227 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+from concurrent.futures import Future
+
+from .clock import get_clock
+from .utils import HUMAN_SLEEP_WINDOWS
+
+logger = logging.getLogger("pinterest-agent")
+
+DEFAULT_SCHEDULE = {
+    # GitHub Actions kills jobs after 6 hours; setup and teardown need the rest.
+    "deadline_minutes": 330,
+    "min_gap_seconds": 120,  # never two Pinterest actions closer than this
+    "first_action_max_seconds": 240,
+}
+
+
+_dispatched = threading.local()
+
+
+def dispatch_time():
+    """
+    The clock's monotonic time at which a scheduler dispatched the action
+    running on this thread, or None outside scheduled actions.
+    """
+    return getattr(_dispatched, "at", None)
+
+
+class DeadlineExceeded(RuntimeError):
+    """Raised for actions that would have to run after the run's deadline."""
+
+
+def plan_timeline(n, budget, min_gap=0, first_max=240, rng=random):
+    """
+    Offsets (seconds from now) for n actions spread over at most `budget`
+    seconds. Gaps are drawn from HUMAN_SLEEP_WINDOWS, so they grow during the
+    run like a person's would; when they don't fit, everything above the
+    minimum gap is shrunk proportionally so the last action lands inside the
+    budget. min_gap is never given up: if even that does not fit, the tail
+    ends up past the budget (and the scheduler refuses those actions).
+    """
+    if n <= 0:
+        return []
+    gaps = [rng.uniform(0, first_max)]
+    for i in range(n - 1):
+        low, high = HUMAN_SLEEP_WINDOWS[min(i, len(HUMAN_SLEEP_WINDOWS) - 1)]
+        gaps.append(rng.uniform(max(low, min_gap), max(high, min_gap)))
+
+    if sum(gaps) > budget:
+        if (n - 1) * min_gap > budget:
+            logger.warning(
+                "Only %s of %s actions fit %.0fs with a %.0fs minimum gap",
+                int(budget // min_gap) + 1,
+                n,
+                budget,
+                min_gap,
+            )
+        floors = [0.0] + [float(min_gap)] * (n - 1)
+        spare = sum(g - f for g, f in zip(gaps, floors))
+        scale = max(0.0, budget - sum(floors)) / spare if spare else 0.0
+        gaps = [f + (g - f) * scale for g, f in zip(gaps, floors)]
+
+    offsets, t = [], 0.0
+    for g in gaps:
+        t += g
+        offsets.append(t)
+    return offsets
+
+
+class ActionScheduler:
+    """
+    One timeline for every Pinterest write of the run. plan(n) lays out n
+    human-paced slots that end before the deadline; submit() hands an action
+    to the next free slot and returns a Future immediately, and a single
+    dispatcher thread runs each action when its slot comes up. Callers stay
+    free to prepare more work in the meantime, actions never run closer
+    than min_gap apart, and anything that cannot run before the deadline
+    fails with DeadlineExceeded instead of overrunning.
+    """
+
+    def __init__(
+        self,
+        deadline_seconds,
+        min_gap=DEFAULT_SCHEDULE["min_gap_seconds"],
+        first_max=DEFAULT_SCHEDULE["first_action_max_seconds"],
+        clock=None,
+        rng=random,
+    ):
+        # clock is a clock.RealClock / VirtualClock (default: the installed one)
+        self._clock = clock or get_clock()
+        self.clock = self._clock.monotonic
+        self.rng = rng
+        self.min_gap = min_gap
+        self.first_max = first_max
+        self.started_at = self.clock()
+        self.deadline = self.started_at + deadline_seconds
+        self._slots = []
+        self._last_slot = None
+        self._last_run = None
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._dispatch, name="action-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def remaining(self):
+        return self.deadline - self.clock()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def pending(self):
+        """Actions queued and not yet dispatched."""
+        with self._cond:
+            return len(self._heap)
+
+    def plan(self, n):
+        """Lays out slots for the next n actions between now and the deadline."""
+        now = self.clock()
+        offsets = plan_timeline(
+            n, max(0.0, self.deadline - now), self.min_gap, self.first_max, self.rng
+        )
+        with self._cond:
+            self._slots = [now + o for o in offsets]
+        if offsets:
+            logger.info(
+                "Scheduled %s actions over %.0f min (deadline in %.0f min)",
+                n,
+                offsets[-1] / 60,
+                (self.deadline - now) / 60,
+            )
+        return offsets
+
+    def _next_slot(self):
+        if self._slots:
+            slot = self._slots.pop(0)
+        else:
+            # More actions than planned: keep the minimum spacing.
+            slot = self.clock()
+        if self._last_slot is not None:
+            slot = max(slot, self._last_slot + self.min_gap)
+        self._last_slot = slot
+        return slot
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs) for the next slot; returns a Future."""
+        fut = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("scheduler is closed")
+            slot = self._next_slot()
+            if slot > self.deadline:
+                name = getattr(fn, "__name__", fn)
+                fut.set_exception(
+                    DeadlineExceeded(f"no slot left before the deadline for {name}")
+                )
+                return fut
+            heapq.heappush(self._heap, (slot, next(self._seq), fn, args, kwargs, fut))
+            self._cond.notify()
+        return fut
+
+    def run(self, fn, *args, **kwargs):
+        """submit() and wait for the result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        if self._closed:
+                            return
+                        self._cond.wait()
+                        continue
+                    slot = self._heap[0][0]
+                    if self._last_run is not None:
+                        slot = max(slot, self._last_run + self.min_gap)
+                    wait = slot - self.clock()
+                    if wait <= 0:
+                        break
+                    self._clock.wait(self._cond, wait)
+                _, _, fn, args, kwargs, fut = heapq.heappop(self._heap)
+                self._last_run = dispatched_at = self.clock()
+
+            # Judged by the due time, so waking a few ms late is not an overrun.
+            if slot > self.deadline:
+                fut.set_exception(DeadlineExceeded("deadline passed before dispatch"))
+                continue
+            if not fut.set_running_or_notify_cancel():
+                continue
+            _dispatched.at = dispatched_at
+            try:
+                fut.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                fut.set_exception(e)
+            finally:
+                _dispatched.at = None
+
+    def close(self, cancel_pending=False):
+        """Stops accepting actions; waits for (or cancels) the queued ones."""
+        with self._cond:
+            self._closed = True
+            if cancel_pending:
+                for *_, fut in self._heap:
+                    fut.cancel()
+                self._heap.clear()
+            self._cond.notify()
+        self._thread.join()
+
+
+def build_scheduler(settings=None, **kwargs):
+    """A new ActionScheduler from a `schedule` config section."""
+    cfg = dict(DEFAULT_SCHEDULE)
+    cfg.update({k: v for k, v in (settings or {}).items() if v is not None})
+    return ActionScheduler(
+        deadline_seconds=float(cfg["deadline_minutes"]) * 60,
+        min_gap=float(cfg["min_gap_seconds"]),
+        first_max=float(cfg["first_action_max_seconds"]),
+        **kwargs,
+    )
+
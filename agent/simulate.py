@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Replays a full daily run in seconds: every sleep and scheduler wait runs on a
+virtual clock, randomness is seeded, and the blog, image host and Pinterest
+API are in-process stand-ins (requests_mock), so nothing leaves the machine.
+
+    python -m agent.simulate --seed 1 --posts 40 --report sim_report.json
+
+The report lists each Pinterest write at its virtual time, how long the run
+would have taken, and the real compute time spent producing it.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from io import BytesIO
+from pathlib import Path
+
+from .clock import VirtualClock, set_clock
+from .scheduler import dispatch_time
+
+logger = logging.getLogger("pinterest-agent")
+
+SIM_SITE = "https://blog.sim.test"
+SIM_SITES = re.compile(r"https://blog\d*\.sim\.test")  # one per simulated account
+SIM_IMAGE_HOST = "https://img.sim.test"
+PINTEREST_API = "https://api.pinterest.com/v5"
+SIM_EPOCH = 1_700_000_000  # fixed start so timelines are comparable
+BOARD_ENV = {
+    "BOARD_K_DRAMA": "sim-k-drama",
+    "BOARD_C_DRAMA": "sim-c-drama",
+    "BOARD_ENTERTAINMENT": "sim-entertainment",
+    "BOARD_LIFESTYLE": "sim-lifestyle",
+    "BOARD_FOOD": "sim-food",
+    "BOARD_TRAVEL": "sim-travel",
+}
+WORDS = (
+    "cozy autumn recipes kdrama romance travel guide weekend food anime "
+    "lifestyle quotes seoul street market tips favourite scenes"
+).split()
+
+
+class StandIns:
+    """
+    Stand-in HTTP services registered on a requests_mock Mocker. Each
+    response sleeps on the virtual clock for a sampled latency, and every
+    Pinterest write is recorded with the virtual time the scheduler
+    dispatched it at. Samples come from a generator seeded per request
+    (not one shared by every thread), so they do not depend on the order
+    in which threads happen to send their requests.
+    """
+
+    def __init__(self, mocker, clock, rng, posts=40):
+        self.clock = clock
+        self.salt = rng.getrandbits(64)
+        self._seen = Counter()
+        self._seen_lock = threading.Lock()
+        self.posts = posts
+        self.actions = []
+        self._images = {}
+        self._next_pin = 0
+
+        site, api = SIM_SITES.pattern, re.escape(PINTEREST_API)
+        mocker.get(re.compile(site + r"/sitemap\.xml"), text=self.sitemap)
+        mocker.get(re.compile(site + r"/20\d\d/.+"), text=self.post)
+        mocker.get(re.compile(site + r"/images/.+"), content=self.image)
+        mocker.get(f"{PINTEREST_API}/search/boards", json=self.search_boards)
+        mocker.get(re.compile(api + r"/boards/.+/pins"), json=self.board_pins)
+        mocker.post(re.compile(api + r"/pins/.+/save"), json=self.save_pin)
+        mocker.post(f"{PINTEREST_API}/pins", json=self.create_pin, status_code=201)
+
+    def _rng(self, request):
+        """A generator for this request: same URL and token, same sequence."""
+        key = (request.method, request.url, request.headers.get("Authorization"))
+        with self._seen_lock:
+            self._seen[key] += 1
+            n = self._seen[key]
+        return random.Random(f"{self.salt}:{key}:{n}")
+
+    def _latency(self, rng, low=0.05, high=0.4):
+        self.clock.sleep(rng.uniform(low, high))
+
+    def _record(self, request, action, **details):
+        token = request.headers.get("Authorization", "").split(" ")[-1]
+        at = dispatch_time()
+        self.actions.append(
+            dict(
+                at=round(self.clock.monotonic() if at is None else at, 3),
+                action=action,
+                token=token,
+                **details,
+            )
+        )
+
+    def sitemap(self, request, context):
+        self._latency(self._rng(request))
+        site = f"{request.scheme}://{request.netloc}"
+        urls = "".join(
+            f"<url><loc>{site}/2024/{i % 12 + 1:02d}/post-{i}</loc></url>"
+            for i in range(self.posts)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+        )
+
+    def post(self, request, context):
+        self._latency(self._rng(request))
+        i = int(request.path.rsplit("-", 1)[1])
+        rng = random.Random(i)
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 9))).title()
+        sizes = [(1200, 800), (1000, 1500), (640, 640)]
+        imgs = "".join(f'<img src="/images/post-{i}-{w}x{h}.jpg">' for w, h in sizes)
+        return (
+            f"<html><head><title>{title}</title>"
+            f'<meta property="og:title" content="{title}">'
+            f'<meta name="description" content="All about {title.lower()}.">'
+            f'<meta property="og:image" content="{SIM_SITE}/images/post-{i}-1200x800.jpg">'
+            f"</head><body><article>{imgs}</article></body></html>"
+        )
+
+    def image(self, request, context):
+        self._latency(self._rng(request), 0.1, 0.8)
+        name = request.path.rsplit("/", 1)[1]
+        if name not in self._images:
+            from PIL import Image, ImageDraw
+
+            w, h = (int(v) for v in re.search(r"(\d+)x(\d+)", name).groups())
+            rng = random.Random(name)
+            img = Image.linear_gradient("L").resize((w, h)).convert("RGB")
+            draw = ImageDraw.Draw(img)
+            for _ in range(12):
+                x, y = rng.randrange(w), rng.randrange(h)
+                r = rng.randint(20, 160)
+                color = tuple(rng.randrange(256) for _ in range(3))
+                draw.ellipse((x - r, y - r, x + r, y + r), fill=color)
+            out = BytesIO()
+            img.save(out, format="JPEG", quality=85)
+            self._images[name] = out.getvalue()
+        context.headers["Content-Type"] = "image/jpeg"
+        return self._images[name]
+
+    def search_boards(self, request, context):
+        rng = self._rng(request)
+        self._latency(rng)
+        q = request.qs.get("query", ["x"])[0]
+        slug = re.sub(r"\W+", "-", q)
+        return {
+            "items": [
+                {"id": f"src-{slug}-{n}-{rng.randrange(10**6)}", "name": f"{q} {n}"}
+                for n in range(5)
+            ]
+        }
+
+    def board_pins(self, request, context):
+        rng = self._rng(request)
+        self._latency(rng)
+        board = request.path.split("/")[-2]
+        return {
+            "items": [
+                {
+                    "id": f"{board}-pin-{n}",
+                    "link": f"https://example.test/{board}/{n}",
+                    "creative_type": rng.choice(["REGULAR", "REGULAR", "IDEA"]),
+                }
+                for n in range(10)
+            ]
+        }
+
+    def save_pin(self, request, context):
+        pin_id = request.path.split("/")[-2]
+        self._record(request, "repin", pin_id=pin_id, board_id=request.json().get("board_id"))
+        self._latency(self._rng(request))
+        return {"id": pin_id}
+
+    def create_pin(self, request, context):
+        body = request.body
+        if not isinstance(body, (bytes, str)):
+            body = b"".join(body)
+        payload = json.loads(body)
+        self._next_pin += 1
+        pin_id = f"sim-pin-{self._next_pin}"
+        media = payload.get("media_source", {})
+        self._record(
+            request,
+            "create_pin",
+            pin_id=pin_id,
+            board_id=payload.get("board_id"),
+            title=payload.get("title"),
+            media=media.get("source_type"),
+            media_bytes=len(media.get("data") or ""),
+        )
+        self._latency(self._rng(request), 0.3, 1.5)
+        return {"id": pin_id}
+
+
+def _prepare_environment():
+    # The agent context and accounts read these when first used.
+    os.environ.update(BOARD_ENV)
+    os.environ.update(
+        {
+            "PINTEREST_APP_ID": "sim-app",
+            "PINTEREST_APP_SECRET": "sim-secret",
+            "ACCESS_TOKEN": "sim-token",
+            "SITE_URL": SIM_SITE,
+            "IMAGE_STORE_BACKEND": "local",
+        }
+    )
+    for name in ("REPLICATE_API_TOKEN", "GITHUB_TOKEN", "REPLICATE_BACKEND"):
+        os.environ.pop(name, None)
+
+
+def _format_offset(seconds):
+    seconds = int(seconds)
+    return f"+{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def sim_accounts(n):
+    """`accounts` entries for n simulated accounts, each with its own site and token."""
+    entries = []
+    for i in range(n):
+        name = f"sim{i + 1}"
+        os.environ[f"ACCESS_TOKEN_{name.upper()}"] = f"{name}-token"
+        entries.append(
+            {
+                "name": name,
+                "site": f"https://blog{i + 1}.sim.test",
+                "token": f"access_token_{name}",
+            }
+        )
+    return entries
+
+
+def run_simulation(seed=0, posts=40, workdir=None, overrides=None):
+    """Runs agent.main.main() on a virtual clock against stand-ins; returns a report."""
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="agent-sim-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    _prepare_environment()
+
+    random.seed(seed)
+    clock = set_clock(VirtualClock(start=SIM_EPOCH))
+
+    from . import db
+    from . import main as agent_main
+    from .globals import CONFIG
+    from .run_report import get_run_report
+
+    db.DB_PATH = workdir / "agent_data.db"
+    CONFIG["pin_media_mode"] = "base64"
+    CONFIG["run_report"] = {"dir": str(workdir / "reports")}
+    CONFIG["image_cache"] = {"dir": str(workdir / "cache" / "images")}
+    CONFIG["image_store"] = {
+        "backend": "local",
+        "local": {"dir": str(workdir / "site"), "base_url": SIM_IMAGE_HOST},
+    }
+    CONFIG["replicate"] = dict(
+        CONFIG.get("replicate") or {},
+        backend="local",
+        cache_dir=str(workdir / "cache" / "generations"),
+    )
+    for key, value in (overrides or {}).items():
+        CONFIG[key] = value
+
+    import requests_mock
+
+    started = time.perf_counter()
+    with requests_mock.Mocker() as mocker:
+        stand_ins = StandIns(mocker, clock, random.Random(seed), posts=posts)
+        agent_main.main()
+        requests_made = mocker.call_count
+    compute_seconds = time.perf_counter() - started
+
+    schedule = CONFIG.get("schedule") or {}
+    return {
+        "seed": seed,
+        "posts": posts,
+        "virtual_seconds": round(clock.monotonic(), 3),
+        "compute_seconds": round(compute_seconds, 3),
+        "deadline_seconds": float(schedule.get("deadline_minutes") or 330) * 60,
+        "requests": requests_made,
+        "repins": len(agent_main.repinned_results),
+        "new_pins": len(agent_main.created_results),
+        "run_id": get_run_report().run_id,
+        "actions": stand_ins.actions,
+        "workdir": str(workdir),
+    }
+
+
+def print_report(report):
+    print(
+        f"Simulated {report['virtual_seconds'] / 3600:.2f} h in "
+        f"{report['compute_seconds']:.2f} s of compute "
+        f"({report['requests']} stand-in requests, seed {report['seed']})"
+    )
+    for a in report["actions"]:
+        details = " ".join(
+            f"{k}={v}" for k, v in a.items() if k not in ("at", "action") and v
+        )
+        print(f"  {_format_offset(a['at'])}  {a['action']:<10} {details}")
+    print(f"Repinned: {report['repins']}  New pins: {report['new_pins']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--posts", type=int, default=40, help="posts in the stand-in sitemap"
+    )
+    parser.add_argument("--repins", type=int, help="override daily_pins.repins")
+    parser.add_argument("--new-pins", type=int, help="override daily_pins.new_pins")
+    parser.add_argument(
+        "--accounts", type=int, help="simulate this many accounts, one site each"
+    )
+    parser.add_argument("--workdir", help="keep DB, caches and images here")
+    parser.add_argument("--report", help="write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    _prepare_environment()
+    from .globals import CONFIG
+    from .main import configure_logging
+
+    configure_logging()
+
+    logging.getLogger("pinterest-agent").setLevel(
+        logging.DEBUG if args.verbose else logging.INFO
+    )
+
+    overrides = {}
+    if args.repins is not None or args.new_pins is not None:
+        daily = dict(CONFIG["daily_pins"])
+        if args.repins is not None:
+            daily["repins"] = args.repins
+        if args.new_pins is not None:
+            daily["new_pins"] = args.new_pins
+        overrides["daily_pins"] = daily
+    if args.accounts:
+        overrides["accounts"] = sim_accounts(args.accounts)
+
+    report = run_simulation(args.seed, args.posts, args.workdir, overrides)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import copy
+import json
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+
+# Built-in templates. config.yml `templates:` entries are merged over these
+# (so a config template only needs the keys it changes) and may add new names.
+DEFAULT_TEMPLATES = {
+    "classic": {
+        "margin": 40,  # left/right inset of the text box
+        "bottom_offset": 150,  # distance from the box to the bottom edge
+        "max_text_height": 0.5,  # fraction of the height the title may use
+        "box": {"padding": 40, "color": [0, 0, 0, 180], "radius": 0},
+        "gradient": None,
+        "font": {
+            "size": 80,
+            "min_size": 32,
+            "path": None,
+            "line_padding": 20,
+            "max_width": 0.85,
+        },
+        "colors": {"text": [255, 255, 255, 255]},
+    },
+    "soft_gradient": {
+        "margin": 60,
+        "bottom_offset": 120,
+        "max_text_height": 0.5,
+        "box": {"padding": 30, "color": [0, 0, 0, 0], "radius": 0},
+        "gradient": {"color": [0, 0, 0], "start": 0.45, "from_alpha": 0, "to_alpha": 220},
+        "font": {
+            "size": 84,
+            "min_size": 36,
+            "path": None,
+            "line_padding": 16,
+            "max_width": 0.85,
+        },
+        "colors": {"text": [255, 255, 255, 255]},
+    },
+    "card": {
+        "margin": 60,
+        "bottom_offset": 180,
+        "max_text_height": 0.45,
+        "box": {"padding": 48, "color": [255, 255, 255, 215], "radius": 36},
+        "gradient": None,
+        "font": {
+            "size": 76,
+            "min_size": 32,
+            "path": None,
+            "line_padding": 18,
+            "max_width": 0.78,
+        },
+        "colors": {"text": [30, 30, 30, 255]},
+    },
+}
+DEFAULT_TEMPLATE = "classic"
+
+_templates = copy.deepcopy(DEFAULT_TEMPLATES)
+
+
+def _merge(base, override):
+    out = copy.deepcopy(base)
+    for k, v in (override or {}).items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = _merge(out[k], v)
+        else:
+            out[k] = v
+    return out
+
+
+def configure_templates(config_templates=None):
+    """Registers the templates declared in config.yml on top of the built-ins."""
+    global _templates
+    merged = copy.deepcopy(DEFAULT_TEMPLATES)
+    for name, settings in (config_templates or {}).items():
+        base = merged.get(name) or merged[DEFAULT_TEMPLATE]
+        merged[name] = _merge(base, settings)
+    _templates = merged
+    return _templates
+
+
+def get_template(template=None):
+    """
+    Resolves a template name (or an already resolved dict) to its settings.
+    Unknown names fall back to the default template.
+    """
+    if isinstance(template, dict):
+        return _merge(DEFAULT_TEMPLATES[DEFAULT_TEMPLATE], template)
+    return _templates.get(template or DEFAULT_TEMPLATE) or _templates[DEFAULT_TEMPLATE]
+
+
+def _draw_gradient(layer, gradient):
+    width, height = layer.size
+    start = int(height * gradient.get("start", 0.5))
+    span = max(height - start, 1)
+    a0 = gradient.get("from_alpha", 0)
+    a1 = gradient.get("to_alpha", 200)
+    # Build a 1px wide alpha ramp and stretch it: far cheaper than per-row drawing.
+    ramp = Image.new("L", (1, height), 0)
+    ramp.putdata(
+        [0] * start + [int(a0 + (a1 - a0) * (y / span)) for y in range(height - start)]
+    )
+    shade = Image.new("RGBA", (width, height), tuple(gradient.get("color", [0, 0, 0])) + (0,))
+    shade.putalpha(ramp.resize((width, height)))
+    layer.alpha_composite(shade)
+
+
+# Each entry is a full-canvas RGBA layer (~6 MB at 1000x1500), keep it small.
+# It depends only on the template and the canvas size, never on the title.
+@lru_cache(maxsize=16)
+def _static_layer(template_json, width, height):
+    template = json.loads(template_json)
+    if not template.get("gradient"):
+        return None
+    layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    _draw_gradient(layer, template["gradient"])
+    return layer
+
+
+def static_layer(template, width, height):
+    """
+    Returns the pre-rendered text-independent overlay (the gradient) for a
+    template and canvas, or None when the template has none. Cached per
+    process, so a batch of renders only pays for the box and text pass.
+    """
+    key = json.dumps(template, sort_keys=True)
+    return _static_layer(key, width, height)
+
+
+# A strip is width x box_h; titles with the same line count share one.
+@lru_cache(maxsize=16)
+def _box_layer(template_json, width, box_h):
+    template = json.loads(template_json)
+    box = template.get("box") or {}
+    color = tuple(box.get("color", [0, 0, 0, 180]))
+    if len(color) == 4 and color[3] == 0:
+        return None
+    layer = Image.new("RGBA", (width, box_h + 1), (0, 0, 0, 0))
+    rect = [template["margin"], 0, width - template["margin"], box_h]
+    ImageDraw.Draw(layer).rounded_rectangle(
+        rect, radius=box.get("radius", 0), fill=color
+    )
+    return layer
+
+
+def box_layer(template, width, box_h):
+    """
+    The title box as a width x box_h strip (drawn where the title goes), or
+    None when the box is fully transparent. Cached like static_layer; the
+    returned image is shared and must not be drawn on.
+    """
+    key = json.dumps(template, sort_keys=True)
+    return _box_layer(key, width, box_h)
@@ -0,0 +1,218 @@
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from PIL import ImageFont
+
+
+DEFAULT_FONT_SIZE = 80
+MIN_FONT_SIZE = 32
+LINE_PADDING = 20  # Vertical space between lines
+# Loaded fonts (and their FontMetrics) kept per process.
+FONT_CACHE_SIZE = 32
+# Per-font measurement caches keep this many least recently used entries.
+WORD_CACHE_SIZE = 4096
+BOX_CACHE_SIZE = 1024
+
+# One wrapped line: its text, its ink width and the horizontal offset of the
+# ink from the draw origin.
+LineBox = namedtuple("LineBox", ["text", "width", "x_offset"])
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(size=DEFAULT_FONT_SIZE, font_path=None):
+    """Loads a font once per (size, path) and process."""
+    try:
+        if font_path:
+            return ImageFont.truetype(font_path, size)
+        return ImageFont.load_default(size=size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+class FontMetrics:
+    """
+    Cached measurements for a single font. Glyph advances and word widths are
+    measured once with font.getlength, which includes kerning, so wrapping a
+    title only costs dictionary lookups after the first render. Word widths
+    and line boxes are kept in LRU caches, so a long-running process does
+    not keep every title it ever rendered.
+    """
+
+    def __init__(self, font, max_words=WORD_CACHE_SIZE, max_boxes=BOX_CACHE_SIZE):
+        self.font = font
+        self._glyphs = {}
+        self._words = OrderedDict()
+        self._boxes = OrderedDict()
+        self.max_words = max_words
+        self.max_boxes = max_boxes
+        self._lock = threading.Lock()
+        self.space_width = self.word_width(" ")
+        # Every line gets the same ascender-to-descender box so baselines are
+        # evenly spaced regardless of which letters a line contains.
+        _, top, _, bottom = font.getbbox("Ayg|")
+        self.line_top = top
+        self.line_height = bottom - top
+
+    def glyph_width(self, ch):
+        width = self._glyphs.get(ch)
+        if width is None:
+            width = self._glyphs[ch] = self.font.getlength(ch)
+        return width
+
+    def _cached(self, cache, limit, key, measure):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+                return value
+        value = measure(key)
+        with self._lock:
+            cache[key] = value
+            if len(cache) > limit:
+                cache.popitem(last=False)
+        return value
+
+    def word_width(self, word):
+        return self._cached(self._words, self.max_words, word, self.font.getlength)
+
+    def _measure_line(self, text):
+        left, _, right, _ = self.font.getbbox(text)
+        return LineBox(text, right - left, left)
+
+    def line_box(self, text):
+        """Exact ink box of a finished line, measured once and reused for drawing."""
+        return self._cached(self._boxes, self.max_boxes, text, self._measure_line)
+
+    def split_to_width(self, word, max_width):
+        """
+        Binary-searches the longest prefix of an over-long word that fits
+        max_width, using cumulative glyph advances.
+        """
+        prefix = [0.0]
+        for ch in word:
+            prefix.append(prefix[-1] + self.glyph_width(ch))
+        lo, hi = 1, len(word)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if prefix[mid] <= max_width:
+                lo = mid
+            else:
+                hi = mid - 1
+        return word[:lo], word[lo:]
+
+
+_METRICS = OrderedDict()
+_metrics_lock = threading.Lock()
+
+
+def get_metrics(font):
+    """
+    Returns the shared FontMetrics cache for a font object. Like get_font it
+    keeps only the FONT_CACHE_SIZE most recently used fonts, so fonts that
+    get_font evicted (and loads again as new objects) age out here too.
+    """
+    with _metrics_lock:
+        metrics = _METRICS.get(font)
+        if metrics is not None:
+            _METRICS.move_to_end(font)
+            return metrics
+        metrics = _METRICS[font] = FontMetrics(font)
+        if len(_METRICS) > FONT_CACHE_SIZE:
+            _METRICS.popitem(last=False)
+    return metrics
+
+
+def wrap_words(text, metrics, max_width):
+    """
+    Greedy wrapping by accumulating cached word widths, O(words).
+    Words wider than max_width are broken at the widest fitting prefix.
+    """
+    lines, current, current_w = [], [], 0.0
+    for word in text.split():
+        word_w = metrics.word_width(word)
+        while word_w > max_width and len(word) > 1:
+            if current:
+                lines.append(" ".join(current))
+                current, current_w = [], 0.0
+            head, word = metrics.split_to_width(word, max_width)
+            lines.append(head)
+            word_w = metrics.word_width(word) if word else 0.0
+        if not word:
+            continue
+
+        extra = word_w + (metrics.space_width if current else 0.0)
+        if current and current_w + extra > max_width:
+            lines.append(" ".join(current))
+            current, current_w = [word], word_w
+        else:
+            current.append(word)
+            current_w += extra
+
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+
+class TextLayout:
+    """Wrapped lines plus the measured boxes needed to draw them."""
+
+    def __init__(self, metrics, font_size, lines, line_padding=LINE_PADDING):
+        self.font = metrics.font
+        self.font_size = font_size
+        self.lines = lines
+        self.line_height = metrics.line_height
+        self.line_top = metrics.line_top
+        self.line_padding = line_padding
+        self.width = max((ln.width for ln in lines), default=0)
+        self.height = len(lines) * self.line_height + line_padding * max(
+            len(lines) - 1, 0
+        )
+
+    @property
+    def texts(self):
+        return [ln.text for ln in self.lines]
+
+    def draw(self, draw, top, canvas_width, fill=(255, 255, 255, 255)):
+        """Draws every line horizontally centred, starting at y=top."""
+        y = top
+        for ln in self.lines:
+            x = (canvas_width - ln.width) / 2 - ln.x_offset
+            draw.text((x, y - self.line_top), ln.text, font=self.font, fill=fill)
+            y += self.line_height + self.line_padding
+
+
+def _layout_at(text, size, max_width, line_padding, font_path):
+    metrics = get_metrics(get_font(size, font_path))
+    lines = [metrics.line_box(t) for t in wrap_words(text, metrics, max_width)]
+    return TextLayout(metrics, size, lines, line_padding)
+
+
+def layout_text(
+    text,
+    max_width,
+    max_height=None,
+    font_size=DEFAULT_FONT_SIZE,
+    min_font_size=MIN_FONT_SIZE,
+    line_padding=LINE_PADDING,
+    font_path=None,
+):
+    """
+    Wraps text into max_width. When the block is taller than max_height the
+    font size is binary-searched down to the largest size that fits (never
+    below min_font_size).
+    """
+    layout = _layout_at(text, font_size, max_width, line_padding, font_path)
+    if max_height is None or layout.height <= max_height:
+        return layout
+
+    best = None
+    lo, hi = min_font_size, font_size - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = _layout_at(text, mid, max_width, line_padding, font_path)
+        if candidate.height <= max_height:
+            best = candidate
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    return best or _layout_at(text, min_font_size, max_width, line_padding, font_path)
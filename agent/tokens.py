@@ -0,0 +1,114 @@
+import logging
+import threading
+
+from auth_api.access_token import DEFAULT_REFRESH_MARGIN
+
+logger = logging.getLogger("pinterest-agent")
+
+DEFAULT_TOKENS = {
+    # fetch refreshes tokens expiring sooner
+    "refresh_margin_minutes": DEFAULT_REFRESH_MARGIN / 60,
+    "background_lead_minutes": 60,  # background refresh this long before expiry
+    "retry_minutes": 5,  # after a failed background refresh
+}
+
+
+def token_settings(config=None):
+    if config is None:
+        from .globals import get_context
+
+        config = get_context().config
+    settings = dict(DEFAULT_TOKENS)
+    settings.update(
+        {k: v for k, v in (config.get("tokens") or {}).items() if v is not None}
+    )
+    return settings
+
+
+class TokenRefresher:
+    """
+    Refreshes an AccessToken from a background thread shortly before it
+    expires, so requests never wait for the OAuth round trip and a long
+    run or a resident daemon never works with an expired token. Refreshes
+    go through AccessToken.refresh_if_stale, so they are serialized with
+    fetches and with refreshes after a 401.
+    """
+
+    def __init__(self, token, lead_seconds=3600, retry_seconds=300):
+        self.token = token
+        self.lead_seconds = float(lead_seconds)
+        self.retry_seconds = float(retry_seconds)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_refresh_in(self):
+        """Seconds until the next refresh, or None while the expiry is unknown."""
+        remaining = self.token.expires_in()
+        if remaining is None:
+            return None
+        return max(0.0, remaining - self.lead_seconds)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            delay = self.next_refresh_in()
+            if delay is None:
+                delay = self.retry_seconds  # look again once the token is fetched
+            if self._stop.wait(delay):
+                return
+            if self.next_refresh_in() is None or not self.token.can_refresh():
+                continue
+            try:
+                if self.token.refresh_if_stale(margin=self.lead_seconds):
+                    logger.info("Refreshed %s in the background", self.token.name)
+            except Exception as e:
+                logger.warning(
+                    "Background refresh of %s failed: %s", self.token.name, e
+                )
+                self._stop.wait(self.retry_seconds)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._loop,
+                name=f"token-refresh-{self.token.name}",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_refreshers = {}
+_refreshers_lock = threading.Lock()
+
+
+def keep_fresh(token, settings=None):
+    """
+    Starts (once per token name) the background refresher of a token that
+    can be refreshed; a refresher of a replaced token with the same name
+    (e.g. after a config reload) is stopped.
+    """
+    if not token.can_refresh():
+        return None
+    settings = settings or token_settings()
+    with _refreshers_lock:
+        current = _refreshers.get(token.name)
+        if current is not None and current.token is token:
+            return current
+        if current is not None:
+            current.stop()
+        refresher = _refreshers[token.name] = TokenRefresher(
+            token,
+            lead_seconds=float(settings["background_lead_minutes"]) * 60,
+            retry_seconds=float(settings["retry_minutes"]) * 60,
+        ).start()
+        return refresher
+
+
+def stop_refreshers():
+    with _refreshers_lock:
+        for refresher in _refreshers.values():
+            refresher.stop()
+        _refreshers.clear()
@@ -1,33 +1,26 @@
-import random, time, math
+import base64, os, random, math
 
+from . import clock
 
-def human_sleep_between_pins(pin_index, total_pins=7):
-    """
-    Sleeps for a random, progressively longer duration to mimic human activity
-    and stay within the 6-hour GitHub Actions limit (max total sleep ~5.4 hours for 10 pins).
-    """
-    base_windows = [
-        (0, 240),  # 0-4 min
-        (300, 1200),  # 5-20 min
-        (600, 1800),  # 10-30 min
-        (900, 2700),  # 15-45 min
-        (600, 1800),  # 10-30 min
-        (900, 2400),  # 15-40 min
-        (1200, 3000),  # 20-50 min
-    ]
-
-    # Use the last window for any index exceeding the list length (pins > 7)
-    idx = min(pin_index, len(base_windows) - 1)
-    low, high = base_windows[idx]
-
-    s = random.uniform(low, high)
-    time.sleep(s)
-    return s
-
-
-def short_random_sleep(min_s=2, max_s=6):
-    t = random.uniform(min_s, max_s)
-    time.sleep(t)
+# Multiple of 3 so every chunk encodes to base64 without padding.
+B64_CHUNK_SIZE = 3 * 64 * 1024
+
+# Human-like pause windows (seconds) between consecutive pins, growing over
+# the day; entries past the end reuse the last window.
+HUMAN_SLEEP_WINDOWS = [
+    (0, 240),  # 0-4 min
+    (300, 1200),  # 5-20 min
+    (600, 1800),  # 10-30 min
+    (900, 2700),  # 15-45 min
+    (600, 1800),  # 10-30 min
+    (900, 2400),  # 15-40 min
+    (1200, 3000),  # 20-50 min
+]
+
+
+def short_random_sleep(min_s=2, max_s=6, rng=random):
+    t = rng.uniform(min_s, max_s)
+    clock.sleep(t)
     return t
 
 
@@ -48,3 +41,30 @@ def clean_site_url_for_display(url: str) -> str:
         url = url[:-1]
 
     return url
+
+
+class Base64FileBody:
+    """
+    Request body that base64-encodes a file while it is being sent, between
+    a fixed prefix and suffix (e.g. the JSON around a "data" field), so
+    neither the raw bytes nor the encoded copy are ever held in memory as a
+    whole. __len__ lets requests send a Content-Length instead of a chunked
+    body, and every iteration re-reads the file, so the body can be resent.
+    """
+
+    def __init__(self, path, prefix=b"", suffix=b""):
+        self.path = path
+        self.prefix = prefix
+        self.suffix = suffix
+        size = os.path.getsize(path)
+        self.length = len(prefix) + 4 * ((size + 2) // 3) + len(suffix)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        yield self.prefix
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(B64_CHUNK_SIZE), b""):
+                yield base64.b64encode(chunk)
+        yield self.suffix
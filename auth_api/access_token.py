@@ -3,30 +3,51 @@ import hashlib
 import json
 import os
 import pathlib
+import threading
+import time
 
 import requests
 
 from .api_common import ApiCommon
 from .oauth_scope import Scope
+from .token_store import open_token_store
 from .user_auth import get_auth_code
 
+# fetch() leaves a token alone while it is valid for at least this long.
+DEFAULT_REFRESH_MARGIN = 24 * 60 * 60
+
 
 class AccessToken(ApiCommon):
-    def __init__(self, api_config, name=None):
+    def __init__(self, api_config, name=None, store=None):
         if name:
             self.name = name
         else:
             self.name = "access_token"
 
+        self.access_token = None
+        self.refresh_token = None
+        self.scopes = None
+        # epoch seconds, when known from the token response
+        self.expires_at = None
+        self.refresh_token_expires_at = None
+        # held while the token is being refreshed or replaced
+        self.lock = threading.RLock()
+
         self.api_config = api_config
         self.path = pathlib.Path(api_config.oauth_token_dir) / (self.name + ".json")
+        # where the token is saved: JSON files in oauth_token_dir by default
+        self.store = store or open_token_store(
+            getattr(api_config, "token_store", None), api_config.oauth_token_dir
+        )
 
         # use the recommended authorization approach
         auth = api_config.app_id + ":" + api_config.app_secret
         b64auth = base64.b64encode(auth.encode("ascii")).decode("ascii")
         self.auth_headers = {"Authorization": "Basic " + b64auth}
 
-    def fetch(self, scopes=None, client_credentials=False):
+    def fetch(
+        self, scopes=None, client_credentials=False, margin=DEFAULT_REFRESH_MARGIN
+    ):
         """
         This method tries to make it as easy as possible for a developer
         to start using an OAuth access token. It fetches the access token
@@ -35,9 +56,13 @@ class AccessToken(ApiCommon):
               version of the self.name attribute. This method is intended as
               a quick hack for developers.
            2. Read the access_token and (if available) the refresh_token from
-              the file at the path specified by joining the configured
-              OAuth token directory, the self.name attribute, and the '.json'
-              file extension.
+              the token store: by default the file at the path specified by
+              joining the configured OAuth token directory, the self.name
+              attribute, and the '.json' file extension. The token is
+              refreshed only if it expires within margin seconds, or if its
+              expiry is not known. Reading, refreshing and saving happen
+              under the store's lock, so concurrent processes refresh a
+              token once and then all read the new one.
            3. Execute the OAuth 2.0 request flow using the default browser
               and local redirect.
         """
@@ -48,12 +73,11 @@ class AccessToken(ApiCommon):
             print(f"reading {self.name} from environment failed, trying read")
 
         try:
-            self.read()
-            if self.refresh_token:
-                self.refresh()
-                self.write()  # Save the newly refreshed access token and (if changed) the refresh token
-                self.read()  # Add read to synchronize after refresh
-                return
+            with self.lock, self.store.lock(self.name):
+                self.read()
+                if self.refresh_token and not self.is_fresh(margin):
+                    self.refresh()
+                    self.write()  # Save the newly refreshed access token and (if changed) the refresh token
             return
         except Exception as e:
             # Check the specific exception to see if it's because the file is missing/bad (e.g., FileNotFoundError, json.JSONDecodeError)
@@ -73,40 +97,100 @@ class AccessToken(ApiCommon):
 
     def read(self):
         """
-        Get the access token from the file at self.path.
+        Get the access token from the token store.
         """
-        with open(self.path, "r") as jsonfile:
-            data = json.load(jsonfile)
-            self.name = data.get("name") or "access_token"
-            self.access_token = data["access_token"]
-            self.refresh_token = data.get("refresh_token")
-            self.scopes = data.get("scopes")
-        print(f"read {self.name} from {self.path}")
+        data = self.store.load(self.name)
+        if data is None:
+            raise LookupError(f"no {self.name} in {self.store}")
+        self.name = data.get("name") or "access_token"
+        self.access_token = data["access_token"]
+        self.refresh_token = data.get("refresh_token")
+        self.scopes = data.get("scopes")
+        self.expires_at = data.get("expires_at")
+        self.refresh_token_expires_at = data.get("refresh_token_expires_at")
+        print(f"read {self.name} from {self.store}")
 
     def write(self):
         """
-        Store the access token in the file at self.path.
-        """
-        with open(self.path, "w") as jsonfile:
-            # make credential-bearing file as secure as possible
-            if "chmod" in dir(os):
-                os.chmod(jsonfile.fileno(), 0o600)
-            # write the information to the file
-            json.dump(
-                {
-                    "name": self.name,
-                    "access_token": self.access_token,
-                    "refresh_token": self.refresh_token,
-                    "scopes": self.scopes,
-                },
-                jsonfile,
-                indent=2,
-            )
+        Store the access token in the token store (atomically); a read-only
+        store keeps the old record.
+        """
+        if not self.store.writable:
+            print(f"{self.store} is read-only, {self.name} kept in memory")
+            return
+        data = {
+            "name": self.name,
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "scopes": self.scopes,
+        }
+        if self.expires_at is not None:
+            data["expires_at"] = self.expires_at
+        if self.refresh_token_expires_at is not None:
+            data["refresh_token_expires_at"] = self.refresh_token_expires_at
+        self.store.save(self.name, data)
 
     def header(self, headers={}):
         headers["Authorization"] = "Bearer " + self.access_token
         return headers
 
+    def expires_in(self):
+        """Seconds until the access token expires, or None if that is not known."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.time()
+
+    def is_fresh(self, margin=0):
+        """True if the access token is known to be valid for margin more seconds."""
+        remaining = self.expires_in()
+        return remaining is not None and remaining > margin
+
+    def can_refresh(self):
+        if not self.refresh_token:
+            return False
+        expires_at = self.refresh_token_expires_at
+        return expires_at is None or expires_at > time.time()
+
+    def refresh_if_stale(self, seen=None, margin=0):
+        """
+        Refreshes (and saves) the token, once, however many threads or
+        processes ask at the same time: with seen, the access token a caller
+        found invalid, nothing is done if it was replaced meanwhile; without,
+        nothing is done while the token is valid for margin more seconds.
+        Returns True if the token now differs from the one the caller saw.
+        """
+        if not self.can_refresh():
+            return False
+        with self.lock, self.store.lock(self.name):
+            # Another process may have refreshed and saved it already.
+            try:
+                self.read()
+            except LookupError:
+                pass
+            if seen is not None and self.access_token != seen:
+                return True
+            if seen is None and self.is_fresh(margin):
+                return False
+            if not self.can_refresh():
+                return False
+            self.refresh()
+            self.write()
+            return True
+
+    def _update(self, unpacked):
+        """Takes the token (and its expiry) from an OAuth token response."""
+        now = time.time()
+        self.access_token = unpacked["access_token"]
+        # save refresh token if it was also refreshed
+        if "refresh_token" in unpacked:
+            self.refresh_token = unpacked["refresh_token"]
+            expires_in = unpacked.get("refresh_token_expires_in")
+            self.refresh_token_expires_at = expires_in and now + expires_in
+        if "scope" in unpacked:
+            self.scopes = unpacked["scope"]
+        expires_in = unpacked.get("expires_in")
+        self.expires_at = expires_in and now + expires_in
+
     def hashed(self):
         """
         Print the access token in a human-readable format that does not reveal
@@ -187,30 +271,31 @@ class AccessToken(ApiCommon):
         unpacked = self.unpack(response)
 
         print("scope: " + unpacked["scope"])
-        self.access_token = unpacked["access_token"]
-        self.refresh_token = unpacked.get("refresh_token")
-        self.scopes = unpacked["scope"]
-
-        self.write()
+        with self.lock, self.store.lock(self.name):
+            self.refresh_token = None
+            self.refresh_token_expires_at = None
+            self._update(unpacked)
+            self.write()
         print("Token written to disk successfully.")
 
     def refresh(self, continuous=False):
-        print(f"refreshing {self.name}...")
-        post_data = {"grant_type": "refresh_token", "refresh_token": self.refresh_token}
-        if continuous:
-            post_data["refresh_on"] = True
-        if self.api_config.verbosity >= 2:
-            print("POST", self.api_config.api_uri + "/v5/oauth/token")
-            if self.api_config.verbosity >= 3:
-                self.api_config.credentials_warning()
-                print(post_data)
-        response = requests.post(
-            self.api_config.api_uri + "/v5/oauth/token",
-            headers=self.auth_headers,
-            data=post_data,
-        )
-        unpacked = self.unpack(response)
-        self.access_token = unpacked["access_token"]
-        # save refresh token if it was also refreshed
-        if "refresh_token" in unpacked:
-            self.refresh_token = unpacked["refresh_token"]
+        with self.lock:
+            print(f"refreshing {self.name}...")
+            post_data = {
+                "grant_type": "refresh_token",
+                "refresh_token": self.refresh_token,
+            }
+            if continuous:
+                post_data["refresh_on"] = True
+            if self.api_config.verbosity >= 2:
+                print("POST", self.api_config.api_uri + "/v5/oauth/token")
+                if self.api_config.verbosity >= 3:
+                    self.api_config.credentials_warning()
+                    print(post_data)
+            response = requests.post(
+                self.api_config.api_uri + "/v5/oauth/token",
+                headers=self.auth_headers,
+                data=post_data,
+            )
+            unpacked = self.unpack(response)
+            self._update(unpacked)
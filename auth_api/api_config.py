@@ -1,5 +1,7 @@
 import os
 
+from .token_store import DEFAULT_TOKEN_STORE
+
 DEFAULT_PORT = 8085
 DEFAULT_REDIRECT_URI = "http://localhost:" + str(DEFAULT_PORT) + "/"
 DEFAULT_API_URI = "https://api.pinterest.com"
@@ -23,6 +25,9 @@ class ApiConfig:
         self.oauth_token_dir = (
             os.environ.get("PINTEREST_OAUTH_TOKEN_DIR") or DEFAULT_OAUTH_TOKEN_DIR
         )
+        self.token_store = (
+            os.environ.get("PINTEREST_TOKEN_STORE") or DEFAULT_TOKEN_STORE
+        )
 
         self.oauth_uri = os.environ.get("PINTEREST_OAUTH_URI") or DEFAULT_OAUTH_URI
         self.api_uri = os.environ.get("PINTEREST_API_URI") or DEFAULT_API_URI
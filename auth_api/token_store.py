@@ -0,0 +1,193 @@
+import contextlib
+import json
+import os
+import pathlib
+import sqlite3
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+DEFAULT_TOKEN_STORE = "file"
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive advisory lock on path (created if missing). It
+    excludes other processes as well as other threads, since each holder
+    opens the file itself.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        elif msvcrt:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        elif msvcrt:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+
+def atomic_write_json(path, data):
+    """
+    Replaces path with data as JSON: written to a temporary file in the same
+    directory, flushed to disk, then renamed over path, so readers see the
+    old or the new file and never a partial one, even after a crash.
+    """
+    path = pathlib.Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            # make credential-bearing file as secure as possible
+            if "chmod" in dir(os):
+                os.chmod(f.fileno(), 0o600)
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+    # persist the rename itself (not possible on every platform)
+    with contextlib.suppress(OSError, AttributeError):
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class FileTokenStore:
+    """One <name>.json file per token in a directory."""
+
+    writable = True
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+
+    def __str__(self):
+        return str(self.directory)
+
+    def path(self, name):
+        return self.directory / (name + ".json")
+
+    def load(self, name):
+        """The token record saved as name, or None."""
+        try:
+            with open(self.path(name), "r") as jsonfile:
+                return json.load(jsonfile)
+        except FileNotFoundError:
+            return None
+
+    def save(self, name, data):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(self.path(name), data)
+
+    def lock(self, name):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return file_lock(self.directory / f".{name}.lock")
+
+
+class SQLiteTokenStore:
+    """Token records in the oauth_tokens table of a SQLite database."""
+
+    writable = True
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+
+    def __str__(self):
+        return str(self.path)
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS oauth_tokens ("
+            " name TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        return conn
+
+    def load(self, name):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT data FROM oauth_tokens WHERE name = ?", (name,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def save(self, name, data):
+        conn = self._connect()
+        try:
+            with conn:  # one transaction: the old record or the new one
+                conn.execute(
+                    "INSERT OR REPLACE INTO oauth_tokens (name, data, updated_at)"
+                    " VALUES (?, ?, ?)",
+                    (name, json.dumps(data), time.time()),
+                )
+        finally:
+            conn.close()
+
+    def lock(self, name):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return file_lock(self.path.with_name(self.path.name + ".lock"))
+
+
+class EnvTokenStore:
+    """
+    Read-only store seeded from the process environment: <NAME>_JSON may
+    hold a whole token record (e.g. with a refresh token), <NAME> just the
+    access token. Refreshed tokens are kept in memory only.
+    """
+
+    writable = False
+
+    def __str__(self):
+        return "environment"
+
+    def load(self, name):
+        record = os.environ.get(name.upper() + "_JSON")
+        if record:
+            return json.loads(record)
+        access_token = os.environ.get(name.upper())
+        return {"access_token": access_token} if access_token else None
+
+    def save(self, name, data):
+        raise RuntimeError("the environment token store is read-only")
+
+    def lock(self, name):
+        return contextlib.nullcontext()
+
+
+def open_token_store(spec=None, token_dir="."):
+    """
+    The token store named by spec: "file" (the default; JSON files in
+    token_dir), "sqlite" or "sqlite:<path>" (default path:
+    <token_dir>/oauth_tokens.db) or "env" (read-only).
+    """
+    if not isinstance(spec, str) or not spec:  # e.g. unset on the config
+        spec = DEFAULT_TOKEN_STORE
+    kind, _, arg = spec.partition(":")
+    if kind == "file":
+        return FileTokenStore(arg or token_dir)
+    if kind == "sqlite":
+        return SQLiteTokenStore(arg or os.path.join(token_dir, "oauth_tokens.db"))
+    if kind == "env":
+        return EnvTokenStore()
+    raise ValueError(f"unknown token store: {spec}")
@@ -1,4 +1,5 @@
 import json
+import tempfile
 import unittest
 from unittest import mock
 
@@ -8,6 +9,11 @@ from auth_api.access_token import AccessToken
 
 
 class AccessTokenTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.token_dir = tmp.name
+
     mock_os_environ_access_token = {"ACCESS_TOKEN_FROM_ENV": "access token 42"}
 
     @mock.patch.dict("os.environ", mock_os_environ_access_token, clear=True)
@@ -15,7 +21,7 @@ class AccessTokenTest(unittest.TestCase):
         mock_api_config = mock.Mock()
         mock_api_config.app_id = "test-app-id"
         mock_api_config.app_secret = "test-app-secret"
-        mock_api_config.oauth_token_dir = "test-token-dir"
+        mock_api_config.oauth_token_dir = self.token_dir
 
         # test all of the ways that access tokens can be fetched
 
@@ -43,7 +49,7 @@ class AccessTokenTest(unittest.TestCase):
         mock_api_config = mock.Mock()
         mock_api_config.app_id = "test-app-id"
         mock_api_config.app_secret = "test-app-secret"
-        mock_api_config.oauth_token_dir = "test-token-dir"
+        mock_api_config.oauth_token_dir = self.token_dir
 
         access_token_dict = {
             "name": "access_token_from_file",
@@ -97,7 +103,7 @@ class AccessTokenTest(unittest.TestCase):
         mock_api_config.app_secret = "test-app-secret"
         mock_api_config.api_uri = "https://test-api-uri"
         mock_api_config.redirect_uri = "test-redirect-uri"
-        mock_api_config.oauth_token_dir = "test-token-dir"
+        mock_api_config.oauth_token_dir = self.token_dir
         mock_api_config.verbosity = 2
 
         rm.post(
@@ -0,0 +1,40 @@
+import base64
+import json
+import os
+import tempfile
+import unittest
+
+from agent.pinterest_api import image_base64_body
+from agent.utils import B64_CHUNK_SIZE
+
+
+class Base64BodyTest(unittest.TestCase):
+    def test_streamed_body_equals_the_json_payload(self):
+        # Several read chunks, and a size that needs base64 padding.
+        raw = b"\xff\xd8\xff" + os.urandom(2 * B64_CHUNK_SIZE + 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "pin.jpg")
+            with open(path, "wb") as f:
+                f.write(raw)
+            payload = {"board_id": "123", "title": "Café \"quotes\""}
+            body = image_base64_body(payload, path)
+            sent = b"".join(body)
+            resent = b"".join(body)
+
+        expected = json.dumps(
+            dict(
+                payload,
+                media_source={
+                    "source_type": "image_base64",
+                    "content_type": "image/jpeg",
+                    "data": base64.b64encode(raw).decode("ascii"),
+                },
+            )
+        ).encode("utf-8")
+        self.assertEqual(sent, expected)
+        self.assertEqual(len(body), len(expected))
+        self.assertEqual(resent, sent)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from agent.board_matcher import BoardMatcher
+
+BOARDS = {
+    "k_drama": {"keywords": ["kdrama", "K-Drama", "kdrama quotes", "romance kdrama"]},
+    "lifestyle": {"keywords": ["inspirational quotes", "self care"]},
+    "food": {"keywords": ["healthy recipes", "comfort meals"]},
+}
+
+
+class BoardMatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.matcher = BoardMatcher(BOARDS, {"default_board": "lifestyle"})
+
+    def test_matches_phrases_and_normalized_words(self):
+        cases = [
+            ("Ten Healthy Recipes for Busy Weeks", "", "food"),
+            ("My favourite K-Drama couples", "", "k_drama"),
+            ("Quotes for a slow Sunday", "Inspirational quotes", "lifestyle"),
+            ("Weekend reading", "Comfort meal ideas", "food"),
+        ]
+        for title, description, board in cases:
+            with self.subTest(title=title):
+                key, score, how = self.matcher.match(title, description)
+                self.assertEqual((key, how), (board, "keywords"))
+                self.assertGreater(score, 0)
+
+    def test_specific_phrase_beats_shared_word(self):
+        scores = self.matcher.scores("Kdrama quotes to live by")
+        self.assertGreater(scores["k_drama"], scores["lifestyle"])
+
+    def test_falls_back_to_similar_words_then_default(self):
+        key, _, how = self.matcher.match("Kdramma night")
+        self.assertEqual((key, how), ("k_drama", "fuzzy"))
+        self.assertEqual(
+            self.matcher.match("Tax filing basics"), ("lifestyle", 0.0, "default")
+        )
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from agent.daemon import Daemon, next_run_after
+
+
+class DaemonTest(unittest.TestCase):
+    def test_next_run_is_the_next_run_at_in_utc(self):
+        # 2023-11-14 22:13:20 UTC
+        now = 1_700_000_000
+        self.assertEqual(next_run_after(now, "23:00"), 1_700_002_800)
+        self.assertEqual(next_run_after(now, "10:00"), 1_700_042_400)
+
+    def test_runs_reloads_and_reports_status(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = os.path.join(tmp, "config.yml")
+            with open(config, "w") as f:
+                f.write("a: 1\n")
+            reloads = []
+            daemon = Daemon(
+                lambda: {"default": {"repins": 5, "new_pins": 2}},
+                {"port": 0},
+                watch=[config],
+                reload=lambda: reloads.append(1),
+                extra=lambda: {"active": {}},
+            )
+
+            self.assertFalse(daemon.check_reload())
+            with open(config, "w") as f:
+                f.write("a: 22\n")
+            self.assertTrue(daemon.check_reload())
+            self.assertEqual(reloads, [1])
+
+            daemon.run_once()
+            server = daemon.start_http()
+            try:
+                host, port = server.server_address
+                with urllib.request.urlopen(f"http://{host}:{port}/status") as r:
+                    status = json.load(r)
+                with urllib.request.urlopen(f"http://{host}:{port}/health") as r:
+                    health = json.load(r)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        self.assertTrue(health["ok"])
+        self.assertEqual(status["runs"], 1)
+        self.assertEqual(status["reloads"], 1)
+        self.assertTrue(status["last_run"]["ok"])
+        self.assertEqual(status["last_run"]["result"]["default"]["new_pins"], 2)
+        self.assertEqual(status["active"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
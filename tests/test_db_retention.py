@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from agent import db
+
+
+class RetentionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / "agent_data.db"
+        self.patcher = mock.patch.object(db, "DB_PATH", self.db_path)
+        self.patcher.start()
+        db.init_db()
+        self.now = datetime(2026, 1, 1)
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmpdir.cleanup()
+
+    def insert_pins(self, ages_in_days):
+        conn = db.get_conn()
+        for i, age in enumerate(ages_in_days):
+            conn.execute(
+                "INSERT INTO pinned (pinterest_pin_id, board_key, source_url, created_at)"
+                " VALUES (?, 'k_drama', 'https://example.com', datetime(?, ?))",
+                (f"pin-{i}", "2026-01-01 00:00:00", f"-{age} days"),
+            )
+        conn.commit()
+        conn.close()
+
+    def remaining_pins(self):
+        conn = db.get_conn()
+        rows = conn.execute("SELECT pinterest_pin_id FROM pinned").fetchall()
+        conn.close()
+        return sorted(r["pinterest_pin_id"] for r in rows)
+
+    def test_max_age_archives_old_rows(self):
+        self.insert_pins([1, 10, 400, 500])
+        report = db.run_maintenance(
+            {"tables": {"pinned": {"max_age_days": 365, "max_rows": None}}},
+            now=self.now,
+        )
+        self.assertEqual(report["pruned"]["pinned"], 2)
+        self.assertEqual(self.remaining_pins(), ["pin-0", "pin-1"])
+
+        archived = db.read_archive("pinned")
+        self.assertEqual(
+            sorted(r["pinterest_pin_id"] for r in archived), ["pin-2", "pin-3"]
+        )
+
+    def test_max_rows_never_prunes_protected_recent_rows(self):
+        self.insert_pins([1, 2, 3, 100, 200])
+        report = db.run_maintenance(
+            {
+                "tables": {
+                    "pinned": {"max_age_days": None, "max_rows": 1, "keep_days": 30}
+                }
+            },
+            now=self.now,
+        )
+        # only the rows outside the 30 day window may go, even though
+        # max_rows asks for a single row
+        self.assertEqual(report["pruned"]["pinned"], 2)
+        self.assertEqual(self.remaining_pins(), ["pin-0", "pin-1", "pin-2"])
+
+    def test_blog_pins_are_never_pruned(self):
+        conn = db.get_conn()
+        conn.execute(
+            "INSERT INTO blog_pins (post_url, pinterest_pin_id, created_at)"
+            " VALUES ('https://blog/old-post', 'pin-1', '2020-01-01 00:00:00')"
+        )
+        conn.commit()
+        conn.close()
+        report = db.run_maintenance(
+            {"tables": {"blog_pins": {"max_age_days": 1, "max_rows": 0}}},
+            now=self.now,
+        )
+        self.assertNotIn("blog_pins", report["pruned"])
+        conn = db.get_conn()
+        count = conn.execute("SELECT COUNT(*) FROM blog_pins").fetchone()[0]
+        conn.close()
+        self.assertEqual(count, 1)
+
+    def test_vacuum_runs_on_schedule(self):
+        first = db.run_maintenance(now=self.now)
+        self.assertTrue(first["vacuumed"])
+        second = db.run_maintenance(now=datetime(2026, 1, 3))
+        self.assertFalse(second["vacuumed"])
+        third = db.run_maintenance(now=datetime(2026, 1, 9))
+        self.assertTrue(third["vacuumed"])
+
+    def test_vacuum_shrinks_database(self):
+        self.insert_pins([400] * 2000)
+        report = db.run_maintenance(now=self.now)
+        self.assertEqual(report["pruned"]["pinned"], 2000)
+        self.assertLess(report["size_after"], report["size_before"])
+        self.assertEqual(os.path.getsize(self.db_path), report["size_after"])
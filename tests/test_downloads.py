@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+import requests_mock
+
+from agent.downloads import DownloadError, download
+
+URL = "https://img.test/photo.jpg"
+BODY = b"\xff\xd8\xff" + b"x" * 100
+
+
+class DownloadTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dest = os.path.join(tmp.name, "photo.jpg")
+        # An earlier attempt stopped after 40 bytes of the "v1" version.
+        with open(self.dest + ".part", "wb") as f:
+            f.write(BODY[:40])
+        with open(self.dest + ".part.validator", "w") as f:
+            f.write('"v1"')
+
+    def read_dest(self):
+        with open(self.dest, "rb") as f:
+            return f.read()
+
+    def test_resumes_unchanged_file_with_if_range(self):
+        with requests_mock.Mocker() as m:
+            m.get(
+                URL,
+                status_code=206,
+                content=BODY[40:],
+                headers={"Content-Range": f"bytes 40-{len(BODY) - 1}/{len(BODY)}"},
+            )
+            result = download(URL, self.dest)
+        sent = m.last_request.headers
+        self.assertEqual((sent["Range"], sent["If-Range"]), ("bytes=40-", '"v1"'))
+        self.assertEqual(result["size"], len(BODY))
+        self.assertEqual(self.read_dest(), BODY)
+        self.assertFalse(os.path.exists(self.dest + ".part.validator"))
+
+    def test_changed_file_is_fetched_whole(self):
+        new_body = b"\xff\xd8\xff" + b"y" * 60
+        with requests_mock.Mocker() as m:
+            m.get(URL, status_code=200, content=new_body, headers={"ETag": '"v2"'})
+            result = download(URL, self.dest)
+        self.assertEqual(result["size"], len(new_body))
+        self.assertEqual(self.read_dest(), new_body)
+
+    def assert_refused(self, max_bytes=1000, **response):
+        with requests_mock.Mocker() as m:
+            m.get(URL, **response)
+            with self.assertRaises(DownloadError):
+                download(URL, self.dest, max_bytes=max_bytes)
+        # Nothing is left to resume from, or to mistake for the download.
+        for path in (self.dest, self.dest + ".part", self.dest + ".part.validator"):
+            self.assertFalse(os.path.exists(path), path)
+
+    def test_refuses_too_large_content_length(self):
+        headers = {"ETag": '"v2"', "Content-Length": str(len(BODY))}
+        self.assert_refused(max_bytes=50, content=BODY, headers=headers)
+
+    def test_refuses_body_that_streams_past_max_bytes(self):
+        self.assert_refused(max_bytes=50, content=BODY, headers={"ETag": '"v2"'})
+
+    def test_refuses_non_image_content_type(self):
+        headers = {"ETag": '"v2"', "Content-Type": "text/html; charset=utf-8"}
+        self.assert_refused(content=BODY, headers=headers)
+
+    def test_refuses_body_without_image_magic_bytes(self):
+        headers = {"ETag": '"v2"', "Content-Type": "image/jpeg"}
+        self.assert_refused(content=b"<html>not an image</html>", headers=headers)
+
+    def assert_restarts_after(self, first):
+        full = {"status_code": 200, "content": BODY, "headers": {"ETag": '"v2"'}}
+        with requests_mock.Mocker() as m:
+            m.get(URL, [first, full])
+            result = download(URL, self.dest)
+        ranged, fresh = m.request_history
+        self.assertEqual(ranged.headers["Range"], "bytes=40-")
+        self.assertNotIn("Range", fresh.headers)
+        self.assertEqual(result["size"], len(BODY))
+        self.assertEqual(self.read_dest(), BODY)
+
+    def test_restarts_after_416(self):
+        self.assert_restarts_after({"status_code": 416})
+
+    def test_restarts_after_wrong_content_range(self):
+        self.assert_restarts_after(
+            {
+                "status_code": 206,
+                "content": BODY,
+                "headers": {"Content-Range": f"bytes 0-{len(BODY) - 1}/{len(BODY)}"},
+            }
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
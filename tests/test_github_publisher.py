@@ -0,0 +1,137 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import tempfile
+import unittest
+from unittest import mock
+
+import requests_mock
+
+from agent.github_publisher import GitHubPublisher, PublishError
+
+API = "https://api.github.test"
+REPO = "owner/site"
+
+
+class FakeGitHub:
+    """Just enough of the Git Data API to publish files to one branch."""
+
+    def __init__(self, mocker, races=0):
+        self.blobs = {}
+        self.trees = {"tree0": {}}
+        self.commits = {"head0": {"tree": "tree0", "parents": []}}
+        self.head = "head0"
+        self.races = races
+        self.ref_updates = 0
+        base = f"{API}/repos/{REPO}/git"
+        mocker.post(f"{base}/blobs", json=self.create_blob, status_code=201)
+        mocker.get(f"{base}/ref/heads/gh-pages", json=self.get_ref)
+        mocker.get(re.compile(f"{base}/commits/.+"), json=self.get_commit)
+        mocker.post(f"{base}/trees", json=self.create_tree, status_code=201)
+        mocker.post(f"{base}/commits", json=self.create_commit, status_code=201)
+        mocker.patch(f"{base}/refs/heads/gh-pages", json=self.update_ref)
+
+    def create_blob(self, request, context):
+        body = json.loads(b"".join(request.body))
+        content = base64.b64decode(body["content"])
+        sha = hashlib.sha1(f"blob {len(content)}\0".encode() + content).hexdigest()
+        self.blobs[sha] = content
+        return {"sha": sha}
+
+    def get_ref(self, request, context):
+        return {"object": {"sha": self.head}}
+
+    def get_commit(self, request, context):
+        sha = request.path.rsplit("/", 1)[1]
+        return {"tree": {"sha": self.commits[sha]["tree"]}}
+
+    def create_tree(self, request, context):
+        body = request.json()
+        files = dict(self.trees[body["base_tree"]])
+        files.update({e["path"]: e["sha"] for e in body["tree"]})
+        sha = f"tree{len(self.trees)}"
+        self.trees[sha] = files
+        return {"sha": sha}
+
+    def create_commit(self, request, context):
+        body = request.json()
+        sha = f"commit{len(self.commits)}"
+        self.commits[sha] = {"tree": body["tree"], "parents": body["parents"]}
+        return {"sha": sha}
+
+    def update_ref(self, request, context):
+        body = request.json()
+        if self.races:
+            # Someone else pushed first.
+            self.races -= 1
+            self.head = self.commits[body["sha"]]["parents"][0] + "-other"
+            self.commits[self.head] = {"tree": "tree0", "parents": []}
+            context.status_code = 422
+            return {"message": "Update is not a fast forward"}
+        if self.commits[body["sha"]]["parents"] != [self.head]:
+            context.status_code = 422
+            return {"message": "Update is not a fast forward"}
+        self.head = body["sha"]
+        self.ref_updates += 1
+        return {"object": {"sha": self.head}}
+
+    def files(self):
+        tree = self.trees[self.commits[self.head]["tree"]]
+        return {path: self.blobs[sha] for path, sha in tree.items()}
+
+
+class GitHubPublisherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.tmp.name, f"pin{i}.jpg")
+            with open(path, "wb") as f:
+                f.write(os.urandom(200_000 + i))
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def publish(self, fake_races=0):
+        with requests_mock.Mocker() as m:
+            fake = FakeGitHub(m, races=fake_races)
+            publisher = GitHubPublisher(REPO, token="t", api_url=API)
+            urls = publisher.publish(
+                [(p, f"images/{os.path.basename(p)}") for p in self.paths]
+            )
+            return fake, urls, m.call_count
+
+    def test_single_commit(self):
+        fake, urls, calls = self.publish()
+        self.assertEqual(fake.ref_updates, 1)
+        # 3 blobs + ref, commit, tree, new commit, ref update
+        self.assertEqual(calls, 3 + 5)
+        files = fake.files()
+        for path in self.paths:
+            with open(path, "rb") as f:
+                self.assertEqual(files[f"images/{os.path.basename(path)}"], f.read())
+            self.assertEqual(
+                urls[path],
+                f"https://raw.githubusercontent.com/{REPO}/gh-pages/images/"
+                + os.path.basename(path),
+            )
+
+    @mock.patch("agent.github_publisher.time.sleep")
+    def test_retries_ref_race(self, _sleep):
+        fake, urls, calls = self.publish(fake_races=2)
+        self.assertEqual(fake.ref_updates, 1)
+        self.assertEqual(len(fake.blobs), 3)  # blobs are not uploaded again
+        self.assertEqual(len(fake.files()), 3)
+        self.assertEqual(len(urls), 3)
+
+    @mock.patch("agent.github_publisher.time.sleep")
+    def test_gives_up(self, _sleep):
+        with self.assertRaises(PublishError):
+            self.publish(fake_races=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+import requests_mock
+
+from agent.image_cache import ImageCache
+
+JPEG = b"\xff\xd8\xff" + b"pixels" * 50
+
+
+class ImageCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.cache = ImageCache(root=tmp.name)
+
+    def test_fresh_entry_is_served_without_a_request(self):
+        url = "https://img.test/a.jpg"
+        with requests_mock.Mocker() as m:
+            m.get(url, content=JPEG, headers={"Content-Type": "image/jpeg"})
+            first = self.cache.fetch(url)
+            second = self.cache.fetch(url)
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.get(url), first)
+        self.assertEqual(first.read_bytes(), JPEG)
+
+    def test_same_bytes_under_another_url_share_one_blob(self):
+        urls = ["https://img.test/a.jpg", "https://cdn.test/copy-of-a.jpg"]
+        with requests_mock.Mocker() as m:
+            for url in urls:
+                m.get(url, content=JPEG, headers={"Content-Type": "image/jpeg"})
+            paths = [self.cache.fetch(url) for url in urls]
+        self.assertEqual(paths[0], paths[1])
+        self.assertEqual(len(list(self.cache.blobs_dir.glob("*/*"))), 1)
+
+    def test_304_keeps_the_cached_file(self):
+        cache = ImageCache(root=self.root, revalidate_after=0)
+        url = "https://img.test/a.jpg"
+        with requests_mock.Mocker() as m:
+            m.get(url, content=JPEG, headers={"ETag": '"v1"'})
+            first = cache.fetch(url)
+            m.get(url, status_code=304)
+            again = cache.fetch(url)
+        self.assertEqual(m.last_request.headers["If-None-Match"], '"v1"')
+        self.assertEqual(again, first)
+        self.assertEqual(again.read_bytes(), JPEG)
+
+    def test_evicts_least_recently_used_blobs_past_max_bytes(self):
+        bodies = {name: JPEG + name.encode() for name in ("a", "b", "c")}
+        cache = ImageCache(root=self.root, max_bytes=len(JPEG) * 2 + 10)
+        paths = {}
+        with requests_mock.Mocker() as m:
+            for name, body in bodies.items():
+                m.get(f"https://img.test/{name}.jpg", content=body)
+            for name in ("a", "b"):
+                paths[name] = cache.fetch(f"https://img.test/{name}.jpg")
+            # a was used more recently than b.
+            os.utime(paths["b"], (1_000, 1_000))
+            os.utime(paths["a"], (2_000, 2_000))
+            paths["c"] = cache.fetch("https://img.test/c.jpg")
+        self.assertFalse(paths["b"].exists())
+        self.assertTrue(paths["a"].exists())
+        self.assertTrue(paths["c"].exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import random
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from agent import image_ops
+
+
+def jpeg_bytes(size):
+    out = io.BytesIO()
+    Image.linear_gradient("L").resize(size).convert("RGB").save(out, format="JPEG")
+    return out.getvalue()
+
+
+class LoadScaledTest(unittest.TestCase):
+    def test_draft_decode_stays_at_or_above_target(self):
+        decoded = []
+        to_rgb = image_ops.to_rgb
+
+        def record(img, *args):
+            decoded.append(img.size)  # the size libjpeg actually decoded at
+            return to_rgb(img, *args)
+
+        with mock.patch.object(image_ops, "to_rgb", record):
+            img = image_ops.load_scaled(jpeg_bytes((4000, 3000)), (450, 450))
+
+        self.assertEqual(img.size, (450, 337))
+        draft_w, draft_h = decoded[0]
+        self.assertTrue(450 <= draft_w < 4000 and 337 <= draft_h < 3000, decoded)
+
+
+class EncodeImageTest(unittest.TestCase):
+    def setUp(self):
+        # Noise compresses poorly, so quality makes a real difference in size.
+        rng = random.Random(0)
+        self.img = Image.frombytes(
+            "RGB", (300, 300), bytes(rng.randrange(256) for _ in range(300 * 300 * 3))
+        )
+
+    def test_quality_search_meets_the_budget(self):
+        spec = {"quality": 90, "min_quality": 30}
+        full, _ = image_ops.encode_image(self.img, spec)
+        budget_kb = len(full) * 0.7 / 1024
+        data, info = image_ops.encode_image(self.img, dict(spec, max_kb=budget_kb))
+        self.assertTrue(info["within_budget"])
+        self.assertLessEqual(len(data), budget_kb * 1024)
+        self.assertTrue(30 <= info["quality"] < 90)
+        # The highest quality that fits: one step up no longer does.
+        step_up = dict(spec, quality=info["quality"] + 1)
+        above, _ = image_ops.encode_image(self.img, step_up)
+        self.assertGreater(len(above), budget_kb * 1024)
+
+    def test_falls_back_to_min_quality_when_budget_is_unreachable(self):
+        spec = {"quality": 90, "min_quality": 30, "max_kb": 1}
+        data, info = image_ops.encode_image(self.img, spec)
+        self.assertEqual(info["quality"], 30)
+        self.assertFalse(info["within_budget"])
+        self.assertEqual(info["size"], len(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
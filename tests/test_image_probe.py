@@ -0,0 +1,82 @@
+import unittest
+from io import BytesIO
+
+from bs4 import BeautifulSoup
+from PIL import Image
+
+from agent.image_probe import (
+    collect_image_candidates,
+    parse_image_header,
+    score_image,
+)
+
+
+def encode(fmt, size, **kwargs):
+    out = BytesIO()
+    Image.new("RGB", size, (120, 30, 200)).save(out, format=fmt, **kwargs)
+    return out.getvalue()
+
+
+class ParseImageHeaderTest(unittest.TestCase):
+    def test_formats(self):
+        cases = [
+            ("JPEG", "jpeg", {}),
+            ("JPEG", "jpeg", {"progressive": True}),
+            ("PNG", "png", {}),
+            ("GIF", "gif", {}),
+            ("WEBP", "webp", {}),
+            ("WEBP", "webp", {"lossless": True}),
+            ("BMP", "bmp", {}),
+        ]
+        for pil_format, expected, kwargs in cases:
+            data = encode(pil_format, (1234, 567), **kwargs)
+            self.assertEqual(
+                parse_image_header(data), (expected, 1234, 567), (pil_format, kwargs)
+            )
+
+    def test_incremental(self):
+        # An EXIF block pushes the JPEG SOF marker past the first chunk.
+        exif = Image.Exif()
+        exif[0x010E] = "x" * 5000  # ImageDescription
+        data = encode("JPEG", (800, 1200), exif=exif)
+
+        self.assertIsNone(parse_image_header(data[:4096]))
+        self.assertEqual(parse_image_header(data[:8192]), ("jpeg", 800, 1200))
+
+    def test_invalid(self):
+        self.assertEqual(parse_image_header(b"<!doctype html><html>"), "invalid")
+        self.assertIsNone(parse_image_header(b"\x89PNG"))
+
+
+class CandidatesTest(unittest.TestCase):
+    def test_collect_image_candidates(self):
+        html = """
+        <html><head>
+          <meta property="og:image" content="https://cdn.example.com/og.jpg">
+          <meta name="twitter:image" content="https://cdn.example.com/og.jpg">
+        </head><body>
+          <img src="/sidebar.png">
+          <article>
+            <img src="/a.jpg" srcset="/a-800.jpg 800w, /a-1600.jpg 1600w">
+            <img data-src="b.webp">
+            <img src="/logo.svg">
+            <img src="data:image/gif;base64,R0lGOD">
+          </article>
+        </body></html>
+        """
+        soup = BeautifulSoup(html, "html.parser")
+        self.assertEqual(
+            collect_image_candidates(soup, "https://example.com/2024/post/"),
+            [
+                "https://cdn.example.com/og.jpg",
+                "https://example.com/a.jpg",
+                "https://example.com/a-800.jpg",
+                "https://example.com/a-1600.jpg",
+                "https://example.com/2024/post/b.webp",
+            ],
+        )
+
+    def test_score_prefers_large_portrait(self):
+        self.assertGreater(score_image(1000, 1500), score_image(1500, 1000))
+        self.assertGreater(score_image(1200, 1800), score_image(400, 600))
+        self.assertGreater(score_image(1000, 1500), score_image(3000, 1000))
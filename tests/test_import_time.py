@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous against the ~30 ms measured locally, so slow CI machines pass;
+# importing PIL, requests and bs4 eagerly again costs well over this.
+BUDGET_SECONDS = 0.15
+HEAVY = ("PIL", "bs4", "replicate", "requests", "yaml", "auth_api.access_token")
+
+
+def import_times(module):
+    """{module: cumulative import seconds} from a fresh `python -X importtime`."""
+    env = {
+        k: v for k, v in os.environ.items() if not k.startswith(("PINTEREST_", "SITE_"))
+    }
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    if proc.returncode != 0:
+        raise AssertionError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_entry_points_import_fast_without_environment(self):
+        for module in ("agent.main", "agent.simulate"):
+            with self.subTest(module=module):
+                times = import_times(module)
+                self.assertEqual([m for m in HEAVY if m in times], [])
+                self.assertLess(times[module], BUDGET_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from agent import db, main
+from agent.pipeline import Pipeline, Stage
+
+
+class PipelineTest(unittest.TestCase):
+    def test_stages_batches_and_errors(self):
+        def double(x):
+            if x == 3:
+                raise ValueError("bad item")
+            return x * 2
+
+        batches = []
+
+        def collect(items):
+            batches.append(len(items))
+            return items
+
+        pipeline = Pipeline(
+            [
+                Stage("double", double, workers=3, queue_size=2),
+                Stage("drop_odd", lambda x: x if x % 4 == 0 else None),
+                Stage("collect", collect, queue_size=8, batch_size=4),
+            ]
+        )
+        results = pipeline.run(range(10))
+        self.assertEqual(sorted(results), [0, 4, 8, 12, 16])
+        self.assertTrue(all(n <= 4 for n in batches))
+        self.assertEqual(pipeline.stats["double"]["errors"], 1)
+        self.assertEqual(pipeline.stats["collect"]["in"], 5)
+
+    def test_backpressure_and_stop(self):
+        started = []
+        lock = threading.Lock()
+        pipeline = None
+
+        def fast(x):
+            with lock:
+                started.append(x)
+            return x
+
+        def slow(x):
+            time.sleep(0.05)
+            if x == 2:
+                pipeline.stop()
+            return x
+
+        pipeline = Pipeline(
+            [Stage("fast", fast, queue_size=1), Stage("slow", slow, queue_size=1)]
+        )
+        results = pipeline.run(iter(range(1000)))
+        self.assertIn(2, results)
+        # The fast stage can only run a couple of items ahead of the slow one.
+        self.assertLess(len(started), 10)
+
+    def test_failing_stages_hand_render_slots_back(self):
+        # 2 new pins + 1 lookahead = 3 render slots; the first three renders
+        # and one submit raise, which must not keep their slots. (The mock
+        # account's rng does not shuffle, so posts keep their order.)
+        account = mock.Mock(daily_pins={"new_pins": 2}, site_url="https://blog")
+        account.name = "test"
+        posts = [f"https://blog/post-{i}" for i in range(8)]
+
+        def render(item):
+            if item["post"] in posts[:3]:
+                raise RuntimeError("render failed")
+            return dict(item, image="img", direct=True)
+
+        def submit(item):
+            if item["post"] == posts[3]:
+                raise RuntimeError("submit failed")
+            return "pin-" + item["post"][-1]
+
+        patches = {
+            "sitemap_posts": mock.Mock(return_value=posts),
+            "prepare_post": lambda p, account: {"post": p},
+            "render_post": render,
+            "publish_posts": lambda items: items,
+            "submit_pin": submit,
+        }
+        for name, fn in patches.items():
+            patcher = mock.patch.object(main, name, fn)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Anything that still reaches the DB writes to a scratch copy.
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db_path = mock.patch.object(db, "DB_PATH", Path(tmp.name) / "agent_data.db")
+        db_path.start()
+        self.addCleanup(db_path.stop)
+
+        result = []
+        run = threading.Thread(
+            target=lambda: result.extend(main.run_new_pins(account)), daemon=True
+        )
+        run.start()
+        run.join(timeout=20)
+        self.assertFalse(run.is_alive(), "run_new_pins hung on lost render slots")
+        self.assertEqual(len(result), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import io
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from agent.render_pool import render_batch
+
+
+class RenderBatchTest(unittest.TestCase):
+    def test_renders_jobs_in_worker_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            background = os.path.join(tmp, "background.jpg")
+            Image.new("RGB", (800, 1200), (200, 120, 40)).save(background)
+            jobs = [
+                {
+                    "id": i,
+                    "background": background,
+                    "title": f"Pin number {i}",
+                    "template": "classic",
+                    "output": {
+                        "width": 500,
+                        "height": 750,
+                        "path": os.path.join(tmp, f"pin{i}.jpg"),
+                    },
+                }
+                for i in range(3)
+            ]
+
+            results = {r["id"]: r for r in render_batch(jobs, max_workers=2)}
+
+            self.assertEqual(set(results), {0, 1, 2})
+            for i in range(3):
+                result = results[i]
+                with open(result["path"], "rb") as f:
+                    self.assertEqual(f.read(), result["data"])
+                with Image.open(io.BytesIO(result["data"])) as img:
+                    self.assertEqual(img.size, (500, 750))
+
+
+if __name__ == "__main__":
+    unittest.main()
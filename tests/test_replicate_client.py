@@ -0,0 +1,52 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from agent import replicate_client
+from agent.replicate_client import GenerationClient, LocalBackend
+
+
+class GenerationClientTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def client(self, backend, **kwargs):
+        client = GenerationClient(backend=backend, cache_dir=self.dir, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_timed_out_prediction_is_canceled(self):
+        backend = LocalBackend(latency=60)
+        client = self.client(backend, poll_interval=0.01, timeout=0.05)
+        with self.assertRaisesRegex(RuntimeError, "timed out"):
+            client.generate("a prompt", "some/model")
+        self.assertEqual(backend.canceled, 1)
+
+    def test_cache_evicts_least_recently_used(self):
+        backend = LocalBackend(latency=0, size=(64, 96))
+        client = self.client(backend, poll_interval=0.01)
+        first = Path(client.generate("first", "some/model"))
+        client.max_cache_bytes = first.stat().st_size  # room for one output
+        second = Path(client.generate("second", "some/model"))
+        self.assertFalse(first.exists())
+        self.assertTrue(second.exists())
+
+    def test_reconfiguring_closes_the_old_client(self):
+        previous = replicate_client._default_client
+        self.addCleanup(setattr, replicate_client, "_default_client", previous)
+        settings = {"backend": "local", "cache_dir": str(self.dir)}
+        with mock.patch.dict("os.environ", {"REPLICATE_BACKEND": ""}):
+            old = replicate_client.configure_generation_client(settings)
+            with mock.patch.object(old, "close") as close:
+                new = replicate_client.configure_generation_client(settings)
+        self.addCleanup(old.close)
+        self.addCleanup(new.close)
+        close.assert_called_once_with()
+        self.assertIs(replicate_client.get_generation_client(), new)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import random
+import unittest
+from unittest import mock
+
+import requests
+import requests_mock
+
+from agent import clock
+from agent.clock import VirtualClock
+from agent.pinterest_api import API_BASE, list_pins_on_board
+from agent.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    call_with_retry,
+    classify,
+    reset_breakers,
+)
+from auth_api.api_common import RateLimitException, SpamException
+
+
+def http_error(status, text="", **headers):
+    response = requests.Response()
+    response.status_code = status
+    response._content = text.encode("utf-8")
+    response.headers.update(headers)
+    return requests.HTTPError(f"HTTP {status}", response=response)
+
+
+class RetryTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = clock.get_clock()
+        self.clock = clock.set_clock(VirtualClock(start=1_700_000_000))
+
+    def tearDown(self):
+        clock.set_clock(self.previous)
+        reset_breakers()
+
+    def test_classifies_errors(self):
+        cases = [
+            (http_error(503, **{"Retry-After": "7"}), ("transient", 7.0)),
+            (http_error(404), ("permanent", None)),
+            (http_error(429, **{"Retry-After": "30"}), ("rate_limit", 30.0)),
+            (http_error(429, '{"message": "Flagged as spam"}'), ("spam", None)),
+            (RateLimitException(), ("rate_limit", None)),
+            (SpamException("spam"), ("spam", None)),
+            (requests.ConnectionError("reset"), ("transient", None)),
+            (ConnectionResetError(), ("transient", None)),
+            (requests.Timeout(), ("transient", None)),
+            (ValueError("bad"), ("unknown", None)),
+        ]
+        for exc, expected in cases:
+            with self.subTest(exc=exc):
+                self.assertEqual(classify(exc), expected)
+
+    def test_backs_off_and_honours_retry_after(self):
+        policy = RetryPolicy(attempts=4, base_delay=2, max_delay=5, rng=random.Random(1))
+        errors = [http_error(502), http_error(429, **{"Retry-After": "40"}), None]
+        calls = []
+
+        def flaky():
+            calls.append(self.clock.monotonic())
+            error = errors.pop(0)
+            if error:
+                raise error
+            return "ok"
+
+        self.assertEqual(call_with_retry(flaky, policy=policy), "ok")
+        self.assertTrue(1 <= calls[1] - calls[0] <= 2)
+        self.assertGreaterEqual(calls[2] - calls[1], 40)
+
+        permanent = []
+
+        def not_found():
+            permanent.append(1)
+            raise http_error(404)
+
+        with self.assertRaises(requests.HTTPError):
+            call_with_retry(not_found, policy=policy)
+        self.assertEqual(len(permanent), 1)
+
+    def test_breaker_fails_fast_then_probes(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=60)
+
+        def down():
+            raise requests.ConnectionError("down")
+
+        for _ in range(2):
+            with self.assertRaises(requests.ConnectionError):
+                breaker.call(down)
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(lambda: "unreached")
+
+        self.clock.advance(61)
+        self.assertEqual(breaker.call(lambda: "up"), "up")
+        self.assertEqual(breaker.state, "closed")
+
+    @requests_mock.Mocker()
+    def test_breakers_are_per_account(self, m):
+        a = mock.Mock(access_token="token-a")
+        a.name = "account_a"
+        b = mock.Mock(access_token="token-b")
+        b.name = "account_b"
+        url = f"{API_BASE}/boards/1/pins"
+        m.get(
+            url,
+            request_headers={"Authorization": "Bearer token-a"},
+            status_code=429,
+            json={"message": "Flagged as spam"},
+        )
+        m.get(
+            url,
+            request_headers={"Authorization": "Bearer token-b"},
+            json={"items": [{"id": "2"}]},
+        )
+
+        with self.assertRaises(SpamException):
+            list_pins_on_board("1", token=a)
+        with self.assertRaises(CircuitOpenError):
+            list_pins_on_board("1", token=a)
+        self.assertEqual(list_pins_on_board("1", token=b), [{"id": "2"}])
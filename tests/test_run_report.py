@@ -0,0 +1,57 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from agent import db
+from agent.run_report import RunReport, find_regressions, load_runs
+
+
+class RunReportTest(unittest.TestCase):
+    def test_events_record_outcomes_reasons_and_counters(self):
+        report = RunReport("r1")
+        with report.stage("meta", item="post-1"):
+            report.count("retries")
+            report.fail("extract_post_meta: Timeout")
+            report.skip("no post metadata")  # the first reason sticks
+        with self.assertRaises(ValueError):
+            with report.stage("render", item="post-2"):
+                raise ValueError("bad image")
+        with report.stage("pin", item="post-3"):
+            pass
+        report.count("image_cache.hit", 2)  # outside a stage: run-wide only
+        report.finish(repins=0, new_pins=1)
+
+        data = report.to_dict()
+        meta, render, pin = data["events"]
+        self.assertEqual(meta["outcome"], "fail")
+        self.assertEqual(meta["reason"], "extract_post_meta: Timeout")
+        self.assertEqual(meta["counters"], {"retries": 1})
+        self.assertEqual(render["reason"], "ValueError: bad image")
+        self.assertEqual(pin["outcome"], "ok")
+        self.assertGreaterEqual(pin["wall_seconds"], 0)
+        self.assertEqual(data["counters"], {"retries": 1, "image_cache.hit": 2})
+        self.assertEqual(data["totals"], {"repins": 0, "new_pins": 1})
+
+    def test_runs_are_stored_and_regressions_flagged(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(
+            db, "DB_PATH", Path(tmp) / "agent_data.db"
+        ):
+            db.init_db()
+            conn = db.get_conn()
+            for run_id, render_seconds in (("a", 1.0), ("b", 1.2), ("c", 3.0)):
+                report = RunReport(run_id)
+                with report.stage("render") as event:
+                    pass
+                event["wall_seconds"] = render_seconds
+                report.finish(new_pins=1).save(conn)
+            runs = load_runs(conn, limit=10)
+            conn.close()
+
+        self.assertEqual([r["run_id"] for r in runs], ["a", "b", "c"])
+        self.assertEqual(runs[-1]["totals"], {"new_pins": 1})
+        self.assertEqual(find_regressions(runs), [("render", 3.0, 1.1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+import unittest
+
+from agent.clock import VirtualClock
+from agent.scheduler import (
+    ActionScheduler,
+    DeadlineExceeded,
+    dispatch_time,
+    plan_timeline,
+)
+
+
+class PlanTimelineTest(unittest.TestCase):
+    def test_fits_budget_and_keeps_min_gap(self):
+        rng = random.Random(7)
+        for n, budget in ((7, 330 * 60), (12, 330 * 60), (40, 2 * 3600)):
+            offsets = plan_timeline(n, budget, min_gap=120, rng=rng)
+            self.assertEqual(len(offsets), n)
+            self.assertLessEqual(offsets[-1], budget + 1e-6)
+            gaps = [b - a for a, b in zip(offsets, offsets[1:])]
+            self.assertGreaterEqual(min(gaps), 120 - 1e-6)
+
+
+class ActionSchedulerTest(unittest.TestCase):
+    def test_dispatches_in_order_and_refuses_past_deadline(self):
+        scheduler = ActionScheduler(0.6, min_gap=0.1, first_max=0.05)
+        scheduler.plan(3)
+        started = time.monotonic()
+        futures = [
+            scheduler.submit(lambda i=i: (i, time.monotonic() - started))
+            for i in range(10)
+        ]
+        done, refused = [], 0
+        for f in futures:
+            try:
+                done.append(f.result(timeout=5))
+            except DeadlineExceeded:
+                refused += 1
+        scheduler.close()
+
+        self.assertEqual([i for i, _ in done], list(range(len(done))))
+        self.assertGreaterEqual(len(done), 3)
+        self.assertGreater(refused, 0)
+        times = [t for _, t in done]
+        self.assertTrue(all(b - a >= 0.09 for a, b in zip(times, times[1:])))
+        self.assertLessEqual(times[-1], 0.7)
+
+    def test_virtual_clock_dispatch_times(self):
+        clock = VirtualClock(start=0)
+        scheduler = ActionScheduler(3600, min_gap=120, first_max=60, clock=clock)
+        scheduler.plan(3)
+        futures = [scheduler.submit(dispatch_time) for _ in range(3)]
+        times = [f.result(timeout=10) for f in futures]
+        scheduler.close()
+
+        self.assertIsNone(dispatch_time())
+        self.assertTrue(all(b - a >= 120 for a, b in zip(times, times[1:])))
+        self.assertEqual(clock.monotonic(), times[-1])
+
+
+class VirtualClockTest(unittest.TestCase):
+    def test_concurrent_sleeps_overlap_in_deadline_order(self):
+        clock = VirtualClock(start=0, settle=0.2)  # time for all threads to start
+        woke = []
+
+        def sleeper(seconds):
+            clock.sleep(seconds)
+            woke.append((seconds, clock.monotonic()))
+
+        threads = [threading.Thread(target=sleeper, args=(s,)) for s in (30, 10, 20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+
+        # Each sleeper wakes at its own deadline; the sleeps do not add up.
+        self.assertEqual(woke, [(10, 10.0), (20, 20.0), (30, 30.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
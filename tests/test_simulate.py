@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def simulate(*args):
+    # Runs in a subprocess: the simulation sets env vars and process-wide
+    # clock/config that must not leak into other tests.
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, "report.json")
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "agent.simulate",
+                *args,
+                f"--workdir={tmp}/work",
+                f"--report={report_path}",
+            ],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            timeout=120,
+        )
+        with open(report_path) as f:
+            return json.load(f)
+
+
+class SimulationTest(unittest.TestCase):
+    def test_full_day_on_virtual_clock(self):
+        report = simulate("--seed=5", "--posts=8", "--repins=2", "--new-pins=2")
+
+        self.assertEqual(report["repins"], 2)
+        self.assertEqual(report["new_pins"], 2)
+        actions = report["actions"]
+        self.assertEqual(len(actions), 4)
+        times = [a["at"] for a in actions]
+        self.assertEqual(times, sorted(times))
+        self.assertTrue(all(b - a >= 120 for a, b in zip(times, times[1:])))
+        self.assertLessEqual(report["virtual_seconds"], report["deadline_seconds"])
+        # Hours of pacing replayed in well under a minute of compute.
+        self.assertGreater(report["virtual_seconds"], 600)
+        self.assertLess(report["compute_seconds"], 60)
+
+    def test_accounts_keep_their_own_token_and_pacing(self):
+        report = simulate(
+            "--seed=3", "--posts=8", "--repins=2", "--new-pins=1", "--accounts=2"
+        )
+
+        self.assertEqual(report["repins"], 4)
+        self.assertEqual(report["new_pins"], 2)
+        for token in ("sim1-token", "sim2-token"):
+            times = [a["at"] for a in report["actions"] if a["token"] == token]
+            self.assertEqual(len(times), 3)
+            # Writes are recorded at the scheduler's dispatch time, so the
+            # minimum gap holds exactly, however the threads interleave.
+            self.assertTrue(all(b - a >= 120 for a, b in zip(times, times[1:])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from agent.generator import compose_pin
+from agent.templates import box_layer, get_template, static_layer
+
+
+class TemplatesTest(unittest.TestCase):
+    def test_resolves_names_and_dicts(self):
+        self.assertEqual(get_template("card")["box"]["radius"], 36)
+        self.assertEqual(get_template("no-such-template"), get_template("classic"))
+
+        custom = get_template({"margin": 10, "box": {"radius": 5}})
+        self.assertEqual(custom["margin"], 10)
+        self.assertEqual(custom["box"]["radius"], 5)
+        # Everything not overridden comes from the default template.
+        self.assertEqual(custom["box"]["padding"], 40)
+        self.assertEqual(custom["font"], get_template("classic")["font"])
+
+    def test_layers_are_cached_or_none(self):
+        gradient = get_template("soft_gradient")
+        classic = get_template("classic")
+        first = static_layer(gradient, 100, 150)
+        self.assertIs(static_layer(gradient, 100, 150), first)
+        self.assertIs(box_layer(classic, 100, 50), box_layer(classic, 100, 50))
+        self.assertIsNone(static_layer(classic, 100, 150))
+        self.assertIsNone(box_layer(gradient, 100, 50))
+
+    def test_semi_transparent_box_blends_with_background(self):
+        canvas = Image.new("RGB", (400, 600), (255, 0, 0))
+        layout = mock.Mock(height=20)  # draws no text
+        # classic: black box at alpha 180, 40px padding, 150px above the bottom.
+        out = compose_pin(canvas, layout, get_template("classic"))
+        box_y = 600 - (20 + 2 * 40) - 150
+        r, g, b = out.getpixel((200, box_y + 10))
+        self.assertAlmostEqual(r, 255 * (255 - 180) / 255, delta=1)
+        self.assertEqual((g, b), (0, 0))
+        self.assertEqual(out.getpixel((200, 100)), (255, 0, 0))
+        self.assertEqual(out.getpixel((20, box_y + 10)), (255, 0, 0))  # margin
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from unittest import mock
+
+from agent import text_layout
+from agent.text_layout import FontMetrics, get_font, get_metrics, layout_text
+
+TITLE = "Cozy autumn recipes for a slow weekend at home with friends"
+
+
+class TextLayoutTest(unittest.TestCase):
+    def test_shrinks_to_fit_but_not_below_min_size(self):
+        sizes = {"font_size": 80, "min_font_size": 20}
+        fits = layout_text(TITLE, 400, max_height=200, **sizes)
+        self.assertLess(fits.font_size, 80)
+        self.assertGreaterEqual(fits.font_size, 20)
+        self.assertLessEqual(fits.height, 200)
+
+        floor = layout_text(TITLE * 4, 400, max_height=50, **sizes)
+        self.assertEqual(floor.font_size, 20)
+        self.assertGreater(floor.height, 50)  # still too tall; min size wins
+
+    def test_second_layout_is_served_from_the_caches(self):
+        first = layout_text(TITLE, 500, font_size=40)
+        metrics = get_metrics(get_font(40))
+        # Any new measurement would now fail.
+        with mock.patch.object(metrics, "font") as font:
+            font.getlength.side_effect = AssertionError("measured again")
+            font.getbbox.side_effect = AssertionError("measured again")
+            again = layout_text(TITLE, 500, font_size=40)
+        self.assertEqual(again.texts, first.texts)
+
+    def test_word_cache_is_bounded_lru(self):
+        metrics = FontMetrics(get_font(24), max_words=3)
+        for word in ("alpha", "beta", "gamma"):
+            metrics.word_width(word)
+        metrics.word_width("alpha")  # now the most recently used
+        metrics.word_width("delta")
+        self.assertEqual(list(metrics._words), ["gamma", "alpha", "delta"])
+
+    def test_metrics_are_kept_for_a_bounded_number_of_fonts(self):
+        first = get_metrics(get_font(30))
+        for size in range(31, 31 + text_layout.FONT_CACHE_SIZE):
+            get_metrics(get_font(size))
+        self.assertEqual(len(text_layout._METRICS), text_layout.FONT_CACHE_SIZE)
+        self.assertNotIn(first.font, text_layout._METRICS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests_mock
+
+from auth_api.access_token import AccessToken
+from auth_api.token_store import EnvTokenStore, open_token_store
+
+RECORD = {
+    "name": "access_token",
+    "access_token": "old-token",
+    "refresh_token": "refresh-token",
+    "scopes": "pins:read",
+}
+
+
+class TokenStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.api_config = mock.Mock(
+            app_id="test-app-id",
+            app_secret="test-app-secret",
+            api_uri="https://test-api-uri",
+            oauth_token_dir=self.dir,
+            token_store="file",
+            verbosity=0,
+        )
+
+    def test_file_and_sqlite_stores_round_trip(self):
+        for spec in ("file", "sqlite"):
+            with self.subTest(spec=spec):
+                store = open_token_store(spec, self.dir)
+                self.assertIsNone(store.load("access_token"))
+                store.save("access_token", RECORD)
+                store.save("access_token", dict(RECORD, access_token="new-token"))
+                saved = store.load("access_token")
+                self.assertEqual(saved["access_token"], "new-token")
+
+        path = os.path.join(self.dir, "access_token.json")
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+        leftovers = [f for f in os.listdir(self.dir) if f.endswith(".tmp")]
+        self.assertEqual(leftovers, [])
+
+    def test_stores_create_their_directory(self):
+        for spec in ("file", "sqlite"):
+            with self.subTest(spec=spec):
+                store = open_token_store(spec, os.path.join(self.dir, spec, "new"))
+                with store.lock("access_token"):
+                    store.save("access_token", RECORD)
+                self.assertEqual(store.load("access_token"), RECORD)
+
+    @mock.patch.dict("os.environ", {"ACCESS_TOKEN": "env-token"}, clear=True)
+    def test_env_store_is_read_only(self):
+        store = EnvTokenStore()
+        self.assertEqual(store.load("access_token"), {"access_token": "env-token"})
+        self.assertIsNone(store.load("access_token_other"))
+        with self.assertRaises(RuntimeError):
+            store.save("access_token", RECORD)
+
+    def test_concurrent_refreshes_share_one_round_trip(self):
+        open_token_store("file", self.dir).save("access_token", RECORD)
+        # Separate objects, as in separate processes: only the store's lock
+        # file is shared between them.
+        tokens = [AccessToken(self.api_config) for _ in range(4)]
+        for token in tokens:
+            token.read()
+        barrier = threading.Barrier(len(tokens))
+        results = []
+
+        def on_401(token):
+            barrier.wait()
+            results.append(token.refresh_if_stale(seen="old-token"))
+
+        with requests_mock.Mocker() as rm:
+            rm.post(
+                "https://test-api-uri/v5/oauth/token",
+                json={"access_token": "new-token", "expires_in": 3600, "scope": "x"},
+            )
+            threads = [threading.Thread(target=on_401, args=(t,)) for t in tokens]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(timeout=10)
+
+        self.assertEqual(rm.call_count, 1)
+        self.assertEqual(results, [True] * len(tokens))
+        self.assertEqual({t.access_token for t in tokens}, {"new-token"})
+        with open(os.path.join(self.dir, "access_token.json")) as f:
+            saved = json.load(f)
+        self.assertEqual(saved["access_token"], "new-token")
+        self.assertGreater(saved["expires_at"], time.time())
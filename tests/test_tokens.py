@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import requests_mock
+
+from agent import pinterest_api
+from agent.retry import reset_breakers
+from auth_api.access_token import AccessToken
+
+TOKEN_URL = "https://test-api-uri/v5/oauth/token"
+
+
+class TokenTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.api_config = mock.Mock(
+            app_id="test-app-id",
+            app_secret="test-app-secret",
+            api_uri="https://test-api-uri",
+            oauth_token_dir=tmp.name,
+            verbosity=0,
+        )
+        self.path = os.path.join(tmp.name, "access_token.json")
+
+    def write_token(self, expires_in):
+        with open(self.path, "w") as f:
+            json.dump(
+                {
+                    "name": "access_token",
+                    "access_token": "old-token",
+                    "refresh_token": "refresh-token",
+                    "scopes": "pins:read",
+                    "expires_at": time.time() + expires_in,
+                },
+                f,
+            )
+
+    @mock.patch.dict("os.environ", {}, clear=True)
+    def test_fetch_refreshes_only_near_expiry(self):
+        with requests_mock.Mocker() as rm:
+            rm.post(
+                TOKEN_URL,
+                json={
+                    "access_token": "new-token",
+                    "expires_in": 30 * 24 * 3600,
+                    "scope": "pins:read",
+                },
+            )
+            self.write_token(expires_in=7 * 24 * 3600)
+            token = AccessToken(self.api_config)
+            token.fetch(margin=24 * 3600)
+            self.assertEqual((token.access_token, rm.call_count), ("old-token", 0))
+
+            self.write_token(expires_in=3600)
+            token = AccessToken(self.api_config)
+            token.fetch(margin=24 * 3600)
+            self.assertEqual((token.access_token, rm.call_count), ("new-token", 1))
+            self.assertGreater(token.expires_in(), 29 * 24 * 3600)
+
+        with open(self.path) as f:
+            saved = json.load(f)
+        self.assertEqual(saved["access_token"], "new-token")
+        self.assertEqual(saved["refresh_token"], "refresh-token")
+
+    @mock.patch.dict("os.environ", {}, clear=True)
+    def test_request_retried_once_after_401_refresh(self):
+        reset_breakers()
+        self.write_token(expires_in=7 * 24 * 3600)
+        token = AccessToken(self.api_config)
+        token.fetch()
+        url = f"{pinterest_api.API_BASE}/search/boards"
+        with requests_mock.Mocker() as rm:
+            rm.post(TOKEN_URL, json={"access_token": "new-token", "scope": "x"})
+            rm.get(
+                url,
+                request_headers={"Authorization": "Bearer old-token"},
+                status_code=401,
+                json={"message": "Authentication failed."},
+            )
+            rm.get(
+                url,
+                request_headers={"Authorization": "Bearer new-token"},
+                json={"items": [{"id": "b1"}]},
+            )
+            boards = pinterest_api.search_boards("kdrama", token=token)
+        self.assertEqual(boards, [{"id": "b1"}])
+        self.assertEqual(
+            [r.method for r in rm.request_history], ["GET", "POST", "GET"]
+        )
@@ -0,0 +1,49 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from agent.generator import render_variants, write_variants
+
+VARIANTS = [
+    {"name": "pin", "width": 200, "height": 300, "fit": "letterbox"},
+    {"name": "square", "width": 150, "height": 150, "fit": "crop"},
+]
+
+
+def jpeg_bytes(size):
+    out = io.BytesIO()
+    Image.linear_gradient("L").resize(size).convert("RGB").save(out, format="JPEG")
+    return out.getvalue()
+
+
+class VariantsTest(unittest.TestCase):
+    def test_renders_and_writes_each_variant(self):
+        results = render_variants(jpeg_bytes((400, 300)), "Weekend soup", VARIANTS)
+        for (_, data, _), spec in zip(results, VARIANTS):
+            with Image.open(io.BytesIO(data)) as img:
+                self.assertEqual(img.size, (spec["width"], spec["height"]))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            outfile = os.path.join(tmp, "pin_1.jpg")
+            manifest = write_variants(results, outfile)
+            square = os.path.join(tmp, "pin_1_square.jpg")
+            self.assertEqual([e["path"] for e in manifest], [outfile, square])
+            with Image.open(square) as img:
+                self.assertEqual(img.size, (150, 150))
+            with open(os.path.join(tmp, "pin_1.manifest.json")) as f:
+                self.assertEqual(json.load(f), manifest)
+
+        self.assertEqual(
+            [(e["name"], e["width"], e["height"], e["fit"]) for e in manifest],
+            [("pin", 200, 300, "letterbox"), ("square", 150, 150, "crop")],
+        )
+        for entry, (_, data, _) in zip(manifest, results):
+            self.assertEqual((entry["format"], entry["size"]), ("JPEG", len(data)))
+
+
+if __name__ == "__main__":
+    unittest.main()